@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, highest first. Freed slots always go to the highest lane with an eligible waiter.
+LANES = ["realtime", "interactive", "bulk"]
+
+class AdmissionRejected(Exception):
+    """Raised instead of queueing; carries the HTTP status and a Retry-After estimate in seconds."""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounds the work a process accepts. At most max_concurrent requests run at
+    once, with tighter caps per model choice (e.g. KernelExplainer models) and
+    per client. Requests that cannot start wait in their priority lane; each
+    lane's queue is bounded, and a request that would overflow it, or that
+    waits longer than queue_timeout_s, is rejected at once with 503. A client
+    over its own limit gets 429. Both carry a Retry-After derived from the
+    recent service time and the backlog ahead.
+
+    All state lives on the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 64, lane_queue: Optional[Dict[str, int]] = None,
+                 per_model: Optional[Dict[str, int]] = None, per_client: int = 8, queue_timeout_s: float = 2.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.lane_queue = {lane: (lane_queue or {}).get(lane, max_queue) for lane in LANES}
+        self.per_model = per_model or {}
+        self.per_client = per_client
+        self.queue_timeout = queue_timeout_s
+        self.running = 0
+        self.running_by_model = Counter()
+        # Running + queued, so one client cannot fill the queue either
+        self.by_client = Counter()
+        self.queues = {lane: deque() for lane in LANES}
+        self.service_ms = deque(maxlen=200)
+        self.wait_ms = {lane: deque(maxlen=200) for lane in LANES}
+        self.counters = Counter()
+
+    def _can_run(self, model: str) -> bool:
+        limit = self.per_model.get(model)
+        return self.running < self.max_concurrent and (limit is None or self.running_by_model[model] < limit)
+
+    def _start(self, model: str):
+        self.running += 1
+        self.running_by_model[model] += 1
+
+    def retry_after(self, backlog: Optional[int] = None) -> int:
+        """Seconds until the current backlog is likely drained (at least 1)."""
+        if backlog is None:
+            backlog = self.running + sum(len(q) for q in self.queues.values())
+        service_s = float(np.median(self.service_ms)) / 1000.0 if self.service_ms else 0.5
+        return max(1, math.ceil(backlog / self.max_concurrent * service_s))
+
+    def _reject(self, status_code: int, reason: str, lane: str, backlog: Optional[int] = None):
+        self.counters[f"rejected_{reason}"] += 1
+        self.counters[f"rejected_{lane}"] += 1
+        raise AdmissionRejected(status_code, reason, self.retry_after(backlog))
+
+    async def acquire(self, model: str, client: str, lane: str):
+        """Returns once the request may run; raises AdmissionRejected otherwise."""
+        if self.by_client[client] >= self.per_client:
+            self._reject(429, "client_limit", lane, backlog=self.by_client[client])
+
+        # Run at once only if nobody of equal or higher priority could take the slot (no overtaking).
+        # Waiters held back only by their own model's cap do not block other models.
+        ahead = sum(1 for l in LANES[:LANES.index(lane) + 1] for queued_model, _ in self.queues[l] if self._can_run(queued_model))
+        if ahead == 0 and self._can_run(model):
+            self._start(model)
+            self.by_client[client] += 1
+            self.counters[f"admitted_{lane}"] += 1
+            self.wait_ms[lane].append(0.0)
+            return
+
+        queued = sum(len(q) for q in self.queues.values())
+        if queued >= self.max_queue or len(self.queues[lane]) >= self.lane_queue[lane]:
+            self._reject(503, "queue_full", lane)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (model, future)
+        self.queues[lane].append(entry)
+        self.by_client[client] += 1
+        enqueued = time.perf_counter()
+        # A free slot must not sit idle until the next release; grant it in priority order now
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            # A slot granted in the same tick as the timeout is still used
+            if not future.done():
+                future.cancel()
+                self.queues[lane].remove(entry)
+                self._drop_client(client)
+                self._reject(503, "queue_timeout", lane)
+        except asyncio.CancelledError:
+            # Caller went away while queued; hand back a slot granted meanwhile
+            if future.done():
+                self._finish(model)
+            else:
+                future.cancel()
+                self.queues[lane].remove(entry)
+            self._drop_client(client)
+            raise
+        self.counters[f"admitted_{lane}"] += 1
+        self.wait_ms[lane].append((time.perf_counter() - enqueued) * 1000.0)
+
+    def release(self, model: str, client: str, service_ms: float):
+        self._drop_client(client)
+        self.service_ms.append(service_ms)
+        self._finish(model)
+
+    def _drop_client(self, client: str):
+        self.by_client[client] -= 1
+        if self.by_client[client] <= 0:
+            del self.by_client[client]
+
+    def _finish(self, model: str):
+        self.running -= 1
+        self.running_by_model[model] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grants free slots to waiters, highest lane first, skipping models at their cap."""
+        for lane in LANES:
+            queue = self.queues[lane]
+            for entry in list(queue):
+                if self.running >= self.max_concurrent:
+                    return
+                model, future = entry
+                if self._can_run(model):
+                    queue.remove(entry)
+                    self._start(model)
+                    future.set_result(True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "running_by_model": {m: n for m, n in self.running_by_model.items() if n},
+            "queued": {lane: len(q) for lane, q in self.queues.items()},
+            "queue_limits": self.lane_queue,
+            "per_model_limits": self.per_model,
+            "per_client_limit": self.per_client,
+            "p50_service_ms": float(np.median(self.service_ms)) if self.service_ms else 0.0,
+            "p99_queue_wait_ms": {
+                lane: float(np.percentile(w, 99)) if w else 0.0 for lane, w in self.wait_ms.items()
+            },
+            "counters": dict(self.counters)
+        }
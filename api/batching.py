@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, List, Set
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for the same key (model choice) that arrive
+    within a short window, or until max_batch_size is reached, and runs them
+    through one batched scoring call off the event loop. Each caller awaits its
+    own future and receives only its row of the result.
+    """
+
+    def __init__(self, score_fn: Callable[[Hashable, List[Any]], List[Any]], window_ms: float = 5.0, max_batch_size: int = 32):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.pending: Dict[Hashable, list] = {}
+        self.timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        # The event loop only holds weak references to tasks; keep running batches alive here
+        self.tasks: Set[asyncio.Task] = set()
+        self.batch_sizes = Counter()
+        self._lock = threading.Lock()
+
+    async def submit(self, key: Hashable, item: Any):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.pending.setdefault(key, [])
+        batch.append((item, future))
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self.timers[key] = loop.call_later(self.window, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable):
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self.pending.pop(key, [])
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(key, batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, key: Hashable, batch: list):
+        items = [item for item, _ in batch]
+        with self._lock:
+            self.batch_sizes[len(batch)] += 1
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.score_fn, key, items)
+        except Exception as e:
+            logger.error(f"Batched scoring failed for {key} ({len(batch)} requests): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = dict(self.batch_sizes)
+        batches = sum(sizes.values())
+        requests = sum(size * count for size, count in sizes.items())
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "batches": batches,
+            "requests": requests,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "max_observed_batch_size": max(sizes) if sizes else 0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(sizes.items())}
+        }
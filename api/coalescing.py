@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class RequestCoalescer:
+    """
+    Collapses concurrent identical requests into one computation. The first
+    request for a key starts it as a task of its own; duplicates that arrive
+    while it runs await the same task instead of recomputing, and everyone
+    gets the same result (or exception). Running it as a separate task means
+    a caller that disconnects does not cancel the work for the others.
+
+    Unlike a result cache, nothing outlives the computation: the key is freed
+    as soon as it finishes, so a later identical request computes afresh.
+
+    All state lives on the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.counters = Counter()
+        self.saved_ms = 0.0
+        self.max_waiters = 0
+
+    @staticmethod
+    def key(payload: Dict[str, Any], model_version: str) -> str:
+        """Canonical hash of a (validated) request payload; key order does not matter."""
+        canonical = json.dumps([model_version, payload], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of compute() for this key, and whether this caller was the one that ran it."""
+        flight = self.in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = {"task": asyncio.ensure_future(compute()), "waiters": 0, "started": time.perf_counter()}
+            self.in_flight[key] = flight
+            flight["task"].add_done_callback(lambda task: self._finish(key, flight))
+            self.counters["computed"] += 1
+        else:
+            flight["waiters"] += 1
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(flight["task"]), leader
+
+    def _finish(self, key: str, flight: Dict[str, Any]):
+        if self.in_flight.get(key) is flight:
+            del self.in_flight[key]
+        task = flight["task"]
+        # Retrieve the outcome here so an exception nobody awaited is not reported as lost
+        failed = task.cancelled() or task.exception() is not None
+        if failed:
+            self.counters["failed"] += 1
+        elif flight["waiters"]:
+            # Each duplicate would have spent about as long computing on its own
+            self.saved_ms += (time.perf_counter() - flight["started"]) * 1000.0 * flight["waiters"]
+        self.max_waiters = max(self.max_waiters, flight["waiters"])
+
+    def metrics(self) -> Dict[str, Any]:
+        computed, coalesced = self.counters["computed"], self.counters["coalesced"]
+        requests = computed + coalesced
+        return {
+            "requests": requests,
+            "computed": computed,
+            "coalesced": coalesced,
+            "failed": self.counters["failed"],
+            "coalesce_rate": coalesced / requests if requests else 0.0,
+            "saved_compute_ms": self.saved_ms,
+            "max_waiters": self.max_waiters,
+            "in_flight": len(self.in_flight)
+        }
@@ -0,0 +1,130 @@
+import io
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Tuple
+from api.schemas.decision import DecisionRequest
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Arrow is optional; NPY and JSON columns still work
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NPY = "application/x-npy"
+JSON = "application/json"
+
+# Batch-level options travel as query parameters, not columns
+META_FIELDS = {"model_choice", "tone"}
+NUMERIC_COLUMNS = [
+    name for name, field in DecisionRequest.model_fields.items()
+    if name not in META_FIELDS and field.annotation is float
+]
+CATEGORICAL_COLUMNS = [
+    name for name, field in DecisionRequest.model_fields.items()
+    if name not in META_FIELDS and name not in NUMERIC_COLUMNS
+]
+
+class ColumnarFormatError(ValueError):
+    """Raised when a batch payload cannot be decoded or fails column validation."""
+
+    def __init__(self, message: str, errors: List[Dict] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+def _media_type(header: str) -> str:
+    return (header or "").split(";")[0].strip().lower()
+
+def decode_batch(body: bytes, content_type: str) -> pd.DataFrame:
+    """Decodes an Arrow IPC stream, an NPY record array or JSON columns into one frame."""
+    media_type = _media_type(content_type)
+    if media_type == ARROW_STREAM:
+        if pa is None:
+            raise ColumnarFormatError("Arrow payloads require pyarrow on the server")
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+        # Numeric columns are handed over without an intermediate copy where Arrow allows it
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    if media_type == NPY:
+        records = np.load(io.BytesIO(body), allow_pickle=False)
+        if records.dtype.names is None:
+            raise ColumnarFormatError("NPY payload must be a structured (record) array")
+        columns = {}
+        for name in records.dtype.names:
+            column = records[name]
+            # Byte-string fields (dtype 'S') carry categorical values
+            columns[name] = np.char.decode(column, "utf-8") if column.dtype.kind == "S" else column
+        return pd.DataFrame(columns)
+    if media_type == JSON:
+        return pd.DataFrame(json.loads(body))
+    raise ColumnarFormatError(f"Unsupported content type {media_type or '(none)'}")
+
+def validate_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Validates the batch column by column (not row by row) and returns a frame
+    with float64 numeric columns and str categorical columns.
+    """
+    errors = []
+    clean = {}
+    for col in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS:
+        field = DecisionRequest.model_fields[col]
+        if col not in df.columns:
+            if field.is_required():
+                errors.append({"column": col, "error": "missing"})
+            else:
+                clean[col] = np.full(len(df), field.default, dtype=object)
+            continue
+
+        values = df[col]
+        if col in NUMERIC_COLUMNS:
+            numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+            bad = np.flatnonzero(~np.isfinite(numeric))
+            if len(bad):
+                errors.append({"column": col, "error": "not a finite number", "rows": bad[:10].tolist(), "count": int(len(bad))})
+            clean[col] = numeric
+        else:
+            missing = np.flatnonzero(values.isna().to_numpy())
+            if len(missing):
+                errors.append({"column": col, "error": "missing value", "rows": missing[:10].tolist(), "count": int(len(missing))})
+            clean[col] = values.astype(str).to_numpy()
+
+    if errors:
+        raise ColumnarFormatError("Batch failed column validation", errors)
+    return pd.DataFrame(clean, index=pd.RangeIndex(len(df)))
+
+def negotiate(accept: str, content_type: str) -> str:
+    """Picks the response format: explicit Accept first, otherwise mirror the request."""
+    for candidate in (accept or "").split(","):
+        media_type = _media_type(candidate)
+        if media_type in (ARROW_STREAM, NPY, JSON):
+            return media_type
+    media_type = _media_type(content_type)
+    return media_type if media_type in (ARROW_STREAM, NPY) else JSON
+
+def encode_result(result: pd.DataFrame, media_type: str) -> Tuple[bytes, str]:
+    """Encodes a columnar result frame as Arrow IPC, an NPY record array or JSON columns."""
+    if media_type == ARROW_STREAM and pa is not None:
+        table = pa.Table.from_pandas(result, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW_STREAM
+    if media_type == NPY:
+        dtype = []
+        for col in result.columns:
+            values = result[col].to_numpy()
+            if values.dtype == object:
+                width = max((len(str(v)) for v in values), default=1)
+                dtype.append((col, f"U{width}"))
+            else:
+                dtype.append((col, values.dtype))
+        records = np.empty(len(result), dtype=dtype)
+        for col in result.columns:
+            records[col] = result[col].to_numpy()
+        buffer = io.BytesIO()
+        np.save(buffer, records, allow_pickle=False)
+        return buffer.getvalue(), NPY
+    return json.dumps({col: result[col].tolist() for col in result.columns}).encode(), JSON
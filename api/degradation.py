@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Explanation depth, from full to cheapest. Each step drops the next most expensive stage.
+LEVELS = ["full", "no_counterfactuals", "approximate_shap", "verdict_only"]
+# Stage whose cost comes back when recovering from a level to the one below it
+RESTORED_STAGE = {1: "counterfactuals", 2: "shap", 3: None}
+
+class DegradationController:
+    """
+    Latency-budget controller for /predict. It tracks end-to-end latencies at
+    the current level, the cost of each optional stage when it last ran, and
+    the number of requests in flight.
+
+    When the recent p99 exceeds the target, or too many requests are queued,
+    it steps one level deeper. It steps back once the p99 plus the typical
+    cost of the stage that would return fits under target * recover_ratio. At most
+    one change happens per cooldown, and each change starts a fresh latency
+    window, so the controller does not oscillate on stale samples.
+    """
+
+    def __init__(self, target_p99_ms: float = 500.0, window: int = 200, min_samples: int = 20,
+                 max_in_flight: int = 32, recover_ratio: float = 0.7, cooldown_s: float = 2.0):
+        self.target_ms = target_p99_ms
+        self.min_samples = min_samples
+        self.max_in_flight = max_in_flight
+        self.recover_ratio = recover_ratio
+        self.cooldown = cooldown_s
+        self.level = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.stage_ms = {stage: deque(maxlen=window) for stage in ("shap", "counterfactuals")}
+        self.requests_per_level = [0] * len(LEVELS)
+        self.transitions = deque(maxlen=50)
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _p99(samples) -> float:
+        return float(np.percentile(samples, 99)) if samples else 0.0
+
+    def begin(self) -> int:
+        """Registers a request and returns the level it should be served at."""
+        with self._lock:
+            self.in_flight += 1
+            self._adjust(time.monotonic())
+            self.requests_per_level[self.level] += 1
+            return self.level
+
+    def end(self, total_ms: float, stages: Optional[Dict[str, float]] = None):
+        """Records a finished request; stages holds the cost of every optional stage that ran."""
+        with self._lock:
+            self.in_flight -= 1
+            self.latencies.append(total_ms)
+            for stage, ms in (stages or {}).items():
+                if stage in self.stage_ms:
+                    self.stage_ms[stage].append(ms)
+
+    def _adjust(self, now: float):
+        if now - self._last_change < self.cooldown:
+            return
+        overloaded = self.in_flight > self.max_in_flight
+        if len(self.latencies) < self.min_samples and not overloaded:
+            return
+
+        p99 = self._p99(self.latencies)
+        if (p99 > self.target_ms or overloaded) and self.level < len(LEVELS) - 1:
+            self._set_level(self.level + 1, now, p99)
+        elif self.level > 0 and self.in_flight <= self.max_in_flight * self.recover_ratio:
+            stage = RESTORED_STAGE[self.level]
+            # Median stage cost: one slow outlier must not pin the service in a degraded level
+            projected = p99 + (float(np.median(self.stage_ms[stage])) if stage and self.stage_ms[stage] else 0.0)
+            if projected < self.target_ms * self.recover_ratio:
+                self._set_level(self.level - 1, now, p99)
+
+    def _set_level(self, level: int, now: float, p99: float):
+        logger.warning(f"Explanation depth {LEVELS[self.level]} -> {LEVELS[level]} (p99 {p99:.0f} ms, {self.in_flight} in flight)")
+        self.transitions.append({"at": time.time(), "from": LEVELS[self.level], "to": LEVELS[level], "p99_ms": p99})
+        self.level = level
+        self.latencies.clear()
+        self._last_change = now
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "level": self.level,
+                "mode": LEVELS[self.level],
+                "target_p99_ms": self.target_ms,
+                "recent_p99_ms": self._p99(self.latencies),
+                "in_flight": self.in_flight,
+                "stage_p99_ms": {stage: self._p99(samples) for stage, samples in self.stage_ms.items()},
+                "requests_per_level": dict(zip(LEVELS, self.requests_per_level)),
+                "transitions": list(self.transitions)
+            }
@@ -0,0 +1,46 @@
+import json
+import logging
+import numpy as np
+from typing import Any, Dict, Optional
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def _default(obj: Any):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Type {type(obj).__name__} is not JSON serializable")
+
+def dumps(payload: Any) -> bytes:
+    """Serializes once to bytes (orjson when available, numpy-aware either way)."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode()
+
+class FastJSONResponse(Response):
+    """JSON response rendered by `dumps`; already-encoded bytes are sent untouched."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+def pack_contributions(contributions: Dict[str, float], top_k: Optional[int] = None, compact: bool = False):
+    """
+    SHAP contributions for the wire: optionally only the top_k by magnitude,
+    and optionally as parallel name/value arrays instead of one object per feature.
+    """
+    items = list(contributions.items())
+    if top_k is not None:
+        items = sorted(items, key=lambda kv: abs(kv[1]), reverse=True)[:top_k]
+    if compact:
+        return {"features": [k for k, _ in items], "values": [float(v) for _, v in items]}
+    return [{"feature": k, "value": float(v)} for k, v in items]
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class ChallengerPool:
+    """
+    Champion/challenger scoring. While the primary (champion) model produces
+    the decision, every other resident model scores the same request on a
+    dedicated thread pool. The decision waits for challengers only until the
+    latency budget measured from the start of the request is spent; results
+    that arrive later are still written to the challenger log for offline
+    comparison, they just miss the response.
+    """
+
+    def __init__(self, score_fn: Callable[[str, dict], Dict[str, Any]], latency_budget_ms: float = 50.0,
+                 max_workers: Optional[int] = None, log_path: str = "logs/challenger_log.jsonl",
+                 log_timeout_s: float = 10.0):
+        self.score_fn = score_fn
+        self.budget = latency_budget_ms / 1000.0
+        self.log_path = log_path
+        self.log_timeout = log_timeout_s
+        # Threads are created lazily on first submit, i.e. after a pre-fork worker has forked
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="challenger")
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "challengers_scored": 0, "budget_misses": 0, "failures": 0,
+                       "verdict_disagreements": 0, "spread_sum": 0.0}
+        # The event loop only holds weak references to tasks; keep pending log writes alive here
+        self.log_tasks: Set[asyncio.Task] = set()
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+
+    def start(self, models: List[str], core_input: dict) -> Dict[str, asyncio.Future]:
+        """Submits one scoring job per challenger; returns immediately."""
+        loop = asyncio.get_running_loop()
+        return {name: loop.run_in_executor(self.executor, self.score_fn, name, core_input) for name in models}
+
+    async def collect(self, futures: Dict[str, asyncio.Future], champion: str, champion_result: Dict[str, Any], started: float):
+        """Waits for challengers within what is left of the budget and summarizes agreement."""
+        done = set()
+        if futures:
+            remaining = max(self.budget - (time.perf_counter() - started), 0.0)
+            done, _ = await asyncio.wait(list(futures.values()), timeout=remaining)
+
+        models = {champion: {**champion_result, "role": "champion"}}
+        pending, failed = [], []
+        for name, future in futures.items():
+            if future not in done:
+                pending.append(name)
+            elif future.exception() is not None:
+                failed.append(name)
+                logger.warning(f"Challenger {name} failed: {future.exception()}")
+            else:
+                models[name] = {**future.result(), "role": "challenger"}
+
+        summary = {"models": models, **self.agreement(models, champion), "pending": pending, "failed": failed,
+                   "latency_budget_ms": self.budget * 1000.0}
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["challengers_scored"] += len(models) - 1
+            self._stats["budget_misses"] += len(pending)
+            self._stats["failures"] += len(failed)
+            self._stats["verdict_disagreements"] += int(summary["verdict_agreement"] < 1.0)
+            self._stats["spread_sum"] += summary["disagreement"]
+        return summary
+
+    @staticmethod
+    def agreement(models: Dict[str, Dict[str, Any]], champion: str) -> Dict[str, Any]:
+        """
+        Disagreement is the spread (max - min) of calibrated probabilities across
+        models; verdict agreement is the share of models that reach the
+        champion's verdict.
+        """
+        probs = np.array([m["probability"] for m in models.values()], dtype=float)
+        verdicts = np.array([m["prediction"] for m in models.values()])
+        spread = float(probs.max() - probs.min())
+        verdict_agreement = float(np.mean(verdicts == models[champion]["prediction"]))
+        if len(models) < 2:
+            label = "Unknown"
+        elif verdict_agreement < 1.0:
+            label = "Low"
+        else:
+            label = "High" if spread < 0.1 else "Medium"
+        return {
+            "disagreement": spread,
+            "probability_std": float(probs.std()),
+            "verdict_agreement": verdict_agreement,
+            "model_agreement": label
+        }
+
+    def log(self, decision_id: str, champion: str, futures: Dict[str, asyncio.Future], summary: Dict[str, Any]):
+        """Appends the comparison record once every challenger has finished (or timed out)."""
+        task = asyncio.get_running_loop().create_task(self._log_when_done(decision_id, champion, futures, summary))
+        self.log_tasks.add(task)
+        task.add_done_callback(self.log_tasks.discard)
+
+    async def _log_when_done(self, decision_id: str, champion: str, futures: Dict[str, asyncio.Future], summary: Dict[str, Any]):
+        models = dict(summary["models"])
+        late = [futures[name] for name in summary["pending"]]
+        if late:
+            await asyncio.wait(late, timeout=self.log_timeout)
+            for name in summary["pending"]:
+                future = futures[name]
+                if future.done() and future.exception() is None:
+                    models[name] = {**future.result(), "role": "challenger", "late": True}
+        record = {
+            "decision_id": decision_id,
+            "timestamp": datetime.now().isoformat(),
+            "champion": champion,
+            "models": models,
+            **self.agreement(models, champion)
+        }
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._append, record)
+        except Exception as e:
+            logger.error(f"Failed to write challenger log: {e}")
+
+    def _append(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=float) + "\n"
+        with self._lock, open(self.log_path, "a") as f:
+            f.write(line)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats.pop("requests")
+        spread_sum = stats.pop("spread_sum")
+        return {
+            "latency_budget_ms": self.budget * 1000.0,
+            "requests": requests,
+            **stats,
+            "mean_disagreement": spread_sum / requests if requests else 0.0,
+            "verdict_disagreement_rate": stats["verdict_disagreements"] / requests if requests else 0.0
+        }
@@ -1,19 +1,38 @@
-from fastapi import FastAPI, HTTPException
-from api.schemas.decision import DecisionRequest, DecisionResponse, Contribution
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from api.schemas.decision import DecisionRequest, DecisionResponse, DecisionOutcome
 from src.data_science.engineer import FeatureEngineer
-from src.xai.shap_explainer import SHAPExplainer
+from src.data_science.loader import DataLoader
+from src.xai.shap_explainer import SHAPExplainer, GLOBAL_SUMMARY_ARTIFACT
+from src.xai.shap_cache import ExplanationCache
 from src.xai.nlp_nugget import NLPNugget
-from src.accountability.confidence import ConfidenceEstimator
+from src.accountability.confidence import ConfidenceEstimator, ConformalPredictor, CONFORMAL_ARTIFACT
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import pandas as pd
+import numpy as np
 import yaml
+import time
 import uvicorn
 import logging
 from src.xai.counterfactuals import CounterfactualEngine
+from src.xai.tree_counterfactuals import TreeCounterfactualSolver
 from src.accountability.governance import GovernanceAuditor
 from src.data_science.validator import DataValidator
+from src.modeling.registry import ModelRegistry
+from src.modeling.calibration import ProbabilityCalibrator, CALIBRATION_ARTIFACT, DECISION_THRESHOLD, served_probability
+from src.accountability.fairness_audit import FairnessAuditor, FAIRNESS_ARTIFACT
+from api.batching import MicroBatcher
+from api.ensemble import ChallengerPool
+from api.profiling import RequestProfiler
+from api.degradation import DegradationController, LEVELS
+from api.admission import AdmissionController, AdmissionRejected, LANES as ADMISSION_LANES
+from api.coalescing import RequestCoalescer
+from api.encoding import FastJSONResponse, pack_contributions
+from api.columnar import ColumnarFormatError, decode_batch, validate_columns, negotiate, encode_result
 
-app = FastAPI(title="DECIDE-X XAI Engine")
+app = FastAPI(title="DECIDE-X XAI Engine", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,114 +41,666 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+def gzip_min_bytes(default: int = 1024) -> int:
+    """Middleware is fixed before load_runtime runs, so the threshold is read here; importing never fails on it."""
+    try:
+        with open("config/config.yaml", "r") as f:
+            return int((yaml.safe_load(f) or {}).get('serving', {}).get('gzip_min_bytes', default))
+    except (OSError, yaml.YAMLError, AttributeError, TypeError, ValueError) as e:
+        logging.warning(f"Using default gzip threshold of {default} bytes: {e}")
+        return default
+
+# Large payloads (global summaries, bulk JSON results) are gzipped for clients that accept it
+app.add_middleware(GZipMiddleware, minimum_size=gzip_min_bytes())
 logging.basicConfig(level=logging.INFO)
 
-# Global instances (load once)
-try:
+SERVED_MODELS = ["xgboost", "mlp_baseline", "random_forest"]
+
+# Global instances (load once). Kept at module level so a pre-fork master can
+# build them before forking and workers share the pages copy-on-write.
+explainers = {}
+conf_estimators = {}
+calibrators = {}
+fairness_reports = {}
+cf_solvers = {}
+auditor = None
+batcher = None
+challengers = None
+request_profiler = None
+degrader = None
+admission = None
+shap_cache = None
+coalescer = None
+registry = ModelRegistry()
+runtime_versions = {}
+
+def load_runtime():
+    """(Re)loads config, preprocessing artifacts, OOD detector and every registered model."""
+    global config, engineer, nugget, conf_estimators, calibrators, fairness_reports, cf_solvers, validator, explainers, auditor, batcher, challengers, request_profiler, degrader, admission, shap_cache, coalescer, runtime_versions
+
     with open("config/config.yaml", "r") as f:
         config = yaml.safe_load(f)
-    
+
     engineer = FeatureEngineer(config)
-    explainer = SHAPExplainer() # Default XGB
+    if not engineer.load_artifacts():
+        # Encoders are a build artifact (not committed): refit them exactly as eda_runner does
+        logging.warning("No persisted feature encoders; fitting them from the raw data")
+        engineer.process_pipeline(DataLoader("config/config.yaml").load_raw_data(), is_training=True)
+        engineer.save_artifacts()
+
+    cache_cfg = config.get('serving', {}).get('shap_cache', {})
+    shap_cache = ExplanationCache(max_entries=cache_cfg.get('max_entries', 50000)) if cache_cfg.get('enabled', False) else None
+
+    runtime_versions = registered_versions()
+    loaded = {}
+    for model_name in SERVED_MODELS:
+        try:
+            loaded[model_name] = SHAPExplainer(model_name, cache=shap_cache)
+        except Exception as e:
+            logging.warning(f"Model {model_name} unavailable: {e}")
+    explainers = loaded
+
     nugget = NLPNugget()
-    conf_estimator = ConfidenceEstimator()
+    conf_estimators = {name: build_conf_estimator(e) for name, e in explainers.items()}
+    calibrators = {name: build_calibrator(e) for name, e in explainers.items()}
+    fairness_reports = {name: build_fairness_report(e) for name, e in explainers.items()}
+    cf_solvers = {
+        name: TreeCounterfactualSolver(e.model, engineer, calibrator=calibrators.get(name))
+        for name, e in explainers.items() if TreeCounterfactualSolver.supports(e.model)
+    }
     validator = DataValidator(config)
-    auditor = GovernanceAuditor()
+    validator.load_ood_detector()
+    if auditor is None:
+        auditor = GovernanceAuditor(batched=True)
+
+    batching = config.get('serving', {}).get('batching', {})
+    batcher = MicroBatcher(
+        score_keyed_batch, window_ms=batching.get('window_ms', 5), max_batch_size=batching.get('max_batch_size', 32)
+    ) if batching.get('enabled', False) else None
+
+    ensemble = config.get('serving', {}).get('ensemble', {})
+    challengers = ChallengerPool(
+        score_challenger, latency_budget_ms=ensemble.get('latency_budget_ms', 50),
+        max_workers=max(len(explainers) - 1, 1), log_path=ensemble.get('log_path', "logs/challenger_log.jsonl")
+    )
+
+    profiling = config.get('profiling', {})
+    request_profiler = RequestProfiler(profiling) if profiling.get('enabled', False) else None
+
+    degradation = config.get('serving', {}).get('degradation', {})
+    degrader = DegradationController(
+        target_p99_ms=degradation.get('target_p99_ms', 500), window=degradation.get('window', 200),
+        min_samples=degradation.get('min_samples', 20), max_in_flight=degradation.get('max_in_flight', 32),
+        recover_ratio=degradation.get('recover_ratio', 0.7), cooldown_s=degradation.get('cooldown_s', 2.0)
+    ) if degradation.get('enabled', False) else None
+
+    admission_cfg = config.get('serving', {}).get('admission', {})
+    admission = AdmissionController(
+        max_concurrent=admission_cfg.get('max_concurrent', 8), max_queue=admission_cfg.get('max_queue', 64),
+        lane_queue=admission_cfg.get('lane_queue'), per_model=admission_cfg.get('per_model'),
+        per_client=admission_cfg.get('per_client', 8), queue_timeout_s=admission_cfg.get('queue_timeout_s', 2.0)
+    ) if admission_cfg.get('enabled', False) else None
+
+    coalescer = RequestCoalescer() if config.get('serving', {}).get('coalescing', {}).get('enabled', False) else None
+
+    for model_explainer in explainers.values():
+        summary = model_explainer.load_global_summary()
+        if summary is None and model_explainer.model_dir is not None:
+            # Versions registered before summaries existed get one now, never on the request path
+            try:
+                logging.info(f"Backfilling global explanation summary for {model_explainer.model_version}")
+                summary = model_explainer.compute_global_summary(pd.read_csv("data/processed/test_features.csv"))
+                model_explainer.registry.save_artifact(model_explainer.model_dir, GLOBAL_SUMMARY_ARTIFACT, summary)
+            except Exception as e:
+                logging.warning(f"No global summary for {model_explainer.model_version}: {e}")
+        if summary is not None:
+            global_summaries[model_explainer.model_version] = summary
+
+def held_out_predictions(model_explainer: SHAPExplainer):
+    """Labels and raw probabilities on the held-out split, for backfilling calibration artifacts."""
+    X_cal = pd.read_csv("data/processed/test_features.csv").drop(columns=['person_gender'], errors='ignore')
+    y_cal = pd.read_csv("data/processed/test_target.csv")[config['data']['target']]
+    return y_cal, model_explainer.model.predict_proba(X_cal)[:, 1]
+
+def build_conf_estimator(model_explainer: SHAPExplainer) -> ConfidenceEstimator:
+    """Confidence engine backed by the model version's stored conformal calibration scores."""
+    thresholds = config.get('thresholds', {})
+    payload = registry.load_artifact(model_explainer.model_name, CONFORMAL_ARTIFACT, model_dir=model_explainer.model_dir)
+    if payload is None and model_explainer.model_dir is not None:
+        # Versions registered before conformal calibration: calibrate once on the held-out split
+        logging.info(f"Backfilling conformal calibration for {model_explainer.model_version}")
+        y_cal, y_prob = held_out_predictions(model_explainer)
+        payload = ConformalPredictor.fit(y_cal, y_prob, alpha=thresholds.get('conformal_alpha', 0.1)).to_dict()
+        registry.save_artifact(model_explainer.model_dir, CONFORMAL_ARTIFACT, payload)
+    return ConfidenceEstimator(
+        high_threshold=thresholds.get('confidence_high', 0.8),
+        low_threshold=thresholds.get('confidence_low', 0.4),
+        conformal=ConformalPredictor.from_dict(payload) if payload else None
+    )
+
+def get_conf_estimator(model_explainer: SHAPExplainer) -> ConfidenceEstimator:
+    if model_explainer.model_name not in conf_estimators:
+        conf_estimators[model_explainer.model_name] = build_conf_estimator(model_explainer)
+    return conf_estimators[model_explainer.model_name]
+
+def build_calibrator(model_explainer: SHAPExplainer):
+    """Loads the stored calibration map for a model version (backfilled once if missing)."""
+    payload = registry.load_artifact(model_explainer.model_name, CALIBRATION_ARTIFACT, model_dir=model_explainer.model_dir)
+    if payload is None and model_explainer.model_dir is not None:
+        logging.info(f"Backfilling calibration map for {model_explainer.model_version}")
+        payload = ProbabilityCalibrator.fit(*held_out_predictions(model_explainer)).to_dict()
+        registry.save_artifact(model_explainer.model_dir, CALIBRATION_ARTIFACT, payload)
+    return ProbabilityCalibrator.from_dict(payload) if payload else None
+
+def get_calibrator(model_explainer: SHAPExplainer):
+    if model_explainer.model_name not in calibrators:
+        calibrators[model_explainer.model_name] = build_calibrator(model_explainer)
+    return calibrators[model_explainer.model_name]
+
+def build_fairness_report(model_explainer: SHAPExplainer):
+    """Loads the stored intersectional fairness audit for a model version (backfilled once if missing)."""
+    payload = registry.load_artifact(model_explainer.model_name, FAIRNESS_ARTIFACT, model_dir=model_explainer.model_dir)
+    if payload is None and model_explainer.model_dir is not None:
+        logging.info(f"Backfilling fairness audit for {model_explainer.model_version}")
+        X_audit = pd.read_csv("data/processed/test_features.csv")
+        y_cal, y_prob = held_out_predictions(model_explainer)
+        payload = FairnessAuditor(config).audit(X_audit, y_cal, served_probability(y_prob, get_calibrator(model_explainer)))
+        registry.save_artifact(model_explainer.model_dir, FAIRNESS_ARTIFACT, payload)
+    return payload
+
+def get_fairness_report(model_explainer: SHAPExplainer):
+    if model_explainer.model_name not in fairness_reports:
+        fairness_reports[model_explainer.model_name] = build_fairness_report(model_explainer)
+    return fairness_reports[model_explainer.model_name]
+
+def get_cf_engine(model_explainer: SHAPExplainer):
+    """Exact split-threshold solver for tree ensembles (thresholds extracted once); grid search otherwise."""
+    if not TreeCounterfactualSolver.supports(model_explainer.model):
+        return CounterfactualEngine(model_explainer.model, engineer, calibrator=get_calibrator(model_explainer))
+    if model_explainer.model_name not in cf_solvers:
+        cf_solvers[model_explainer.model_name] = TreeCounterfactualSolver(
+            model_explainer.model, engineer, calibrator=get_calibrator(model_explainer)
+        )
+    return cf_solvers[model_explainer.model_name]
+
+def score_batch(model_choice: str, core_inputs: list, shap_mode: str = "exact"):
+    """
+    Feature engineering, OOD, scoring and SHAP for many requests in one pass each.
+    shap_mode "approximate" reads contributions off the stored dependence curves
+    and "none" skips them (degraded service levels).
+    """
+    model_explainer = get_explainer(model_choice)
+    df_raw = pd.DataFrame(core_inputs)
+    df_proc = engineer.process_pipeline(df_raw)
+    ood_results = validator.check_ood_batch(df_proc)
+    if shap_mode == "exact":
+        shap_started = time.perf_counter()
+        explanations = model_explainer.explain_batch(df_proc)
+        shap_ms = (time.perf_counter() - shap_started) * 1000.0
+        for explanation in explanations:
+            explanation['shap_ms'] = shap_ms
+    else:
+        summary = get_global_summary(model_explainer) if shap_mode == "approximate" else None
+        explanations = model_explainer.approximate_batch(df_proc, summary)
+
+    # One vectorized table lookup calibrates the whole batch
+    served = served_probability(np.array([e['prediction_prob'] for e in explanations]), get_calibrator(model_explainer))
+    for explanation, served_prob in zip(explanations, served):
+        explanation['served_prob'] = float(served_prob)
+    return list(zip(explanations, ood_results))
+
+def score_keyed_batch(key: tuple, core_inputs: list):
+    """Micro-batcher entry point: requests are grouped by (model_choice, shap_mode)."""
+    model_choice, shap_mode = key
+    return score_batch(model_choice, core_inputs, shap_mode)
+
+def score_challenger(model_choice: str, core_input: dict):
+    """Verdict-only scoring of one request by a challenger model (no SHAP, no counterfactuals)."""
+    started = time.perf_counter()
+    model_explainer = explainers[model_choice]
+    raw_prob = float(model_explainer.model.predict_proba(engineer.process_pipeline(pd.DataFrame([core_input])))[0, 1])
+    calibrator = get_calibrator(model_explainer)
+    prob = float(served_probability(raw_prob, calibrator))
+    return {
+        "model_version": model_explainer.model_version,
+        "probability": prob,
+        "raw_probability": raw_prob,
+        "prediction": "Denied" if prob > DECISION_THRESHOLD else "Approved",
+        "latency_ms": (time.perf_counter() - started) * 1000.0
+    }
+
+def score_columns(model_explainer: SHAPExplainer, df_raw: pd.DataFrame, include_contributions: bool = False) -> pd.DataFrame:
+    """Bulk scoring in column form: every stage is one vectorized call over the whole batch."""
+    df_proc = engineer.process_pipeline(df_raw)
+    raw_probs = model_explainer.model.predict_proba(df_proc)[:, 1]
+
+    calibrator = get_calibrator(model_explainer)
+    probs = served_probability(raw_probs, calibrator)
+    confidence, review_required = get_conf_estimator(model_explainer).estimate_arrays(raw_probs)
+
+    ood_scores, similarities = validator.ood_scores(df_proc)
+    is_ood = ood_scores < -0.1 if ood_scores is not None else np.zeros(len(df_proc), dtype=bool)
+    similarities = np.round(similarities, 3) if similarities is not None else np.ones(len(df_proc))
+
+    result = pd.DataFrame({
+        "prediction": np.where(probs > DECISION_THRESHOLD, "Denied", "Approved"),
+        "probability": probs,
+        "raw_probability": raw_probs,
+        "confidence_score": confidence,
+        "review_required": review_required | is_ood,
+        "is_ood": is_ood,
+        "similarity_score": similarities
+    })
+    if include_contributions:
+        shap_values, _ = model_explainer.shap_matrix(df_proc)
+        for i, feat in enumerate(df_proc.columns.drop('person_gender', errors='ignore')):
+            result[f"shap_{feat}"] = shap_values[:, i].astype(np.float32)
+    return result
+
+def registered_versions():
+    """Latest registered model directories; a change here triggers a rolling restart."""
+    return {name: registry.get_latest_dir(name) for name in SERVED_MODELS}
+
+def get_explainer(model_choice: str) -> SHAPExplainer:
+    """Returns the resident explainer for a model; never mutates a shared instance."""
+    if model_choice not in explainers:
+        try:
+            explainers[model_choice] = SHAPExplainer(model_choice, cache=shap_cache)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Model {model_choice} is unavailable: {e}")
+    return explainers[model_choice]
+
+# Global explanation summaries keyed by model version (computed at registration time)
+global_summaries = {}
+
+def get_global_summary(model_explainer: SHAPExplainer):
+    """The stored global summary (backfilled by load_runtime for older versions); None when there is none."""
+    if model_explainer.model_version not in global_summaries:
+        global_summaries[model_explainer.model_version] = model_explainer.load_global_summary()
+    return global_summaries[model_explainer.model_version]
+
+try:
+    load_runtime()
 except Exception as e:
     logging.error(f"Initialization failed: {e}")
 
-@app.post("/predict", response_model=DecisionResponse)
-async def predict(request: DecisionRequest):
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Runs sampled or debug-header requests under the statistical profiler (opt-in)."""
+    if request_profiler is not None and request_profiler.wants(request.url.path, request.headers):
+        return await request_profiler.profile(request, call_next)
+    return await call_next(request)
+
+def admission_identity(http_request: Request, default_lane: Optional[str] = None):
+    """(client id, priority lane) from the configured headers; unknown lanes fall back to the default."""
+    settings = config.get('serving', {}).get('admission', {})
+    client = http_request.headers.get(settings.get('client_header', "X-Client-Id"))
+    if not client:
+        client = http_request.client.host if http_request.client else "unknown"
+    lane = http_request.headers.get(settings.get('priority_header', "X-Priority"), "").lower()
+    if lane not in ADMISSION_LANES:
+        lane = default_lane or settings.get('default_lane', "interactive")
+    return client, lane
+
+async def admit(model_choice: str, client: str, lane: str):
+    """Waits for an admission slot; over-limit requests fail fast with 429/503 and Retry-After."""
+    if admission is None:
+        return
+    try:
+        await admission.acquire(model_choice, client, lane)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code, detail={"message": "Server busy, retry later", "reason": e.reason, "lane": lane},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def release_admission(model_choice: str, client: str, started: float):
+    if admission is not None:
+        admission.release(model_choice, client, (time.perf_counter() - started) * 1000.0)
+
+async def decide(request: DecisionRequest, input_dict: dict, client: str, lane: str,
+                 top_k: Optional[int], compact: bool, ensemble: bool):
+    """
+    Runs one decision end to end, short of the audit record. Returns the
+    response body, the model version and the challenger futures. The body may
+    be shared by coalesced callers, so it is never mutated afterwards.
+    """
+    # Bounded admission: excess load is shed here instead of timing out inside the pipeline
+    await admit(request.model_choice, client, lane)
+    started = time.perf_counter()
+    # SLO controller picks the explanation depth for this request (0 = full)
+    level = degrader.begin() if degrader is not None else 0
+    stage_ms = {}
     try:
-        # 1. Prepare input
-        input_dict = request.model_dump()
-        # Filter for processing (excluding UI/Meta params)
+        # 1. Prepare input: filter for processing (excluding UI/Meta params)
         core_input = {k: v for k, v in input_dict.items() if k not in ["model_choice", "tone"]}
-        df_raw = pd.DataFrame([core_input])
         
-        # 2. Advanced: OOD Detection (Level 4, #9)
-        ood_result = validator.check_ood(df_raw)
+        # 2. Dynamic Model Choice (Level 4, #8)
+        explainer = get_explainer(request.model_choice)
         
-        # 3. Dynamic Model Choice (Level 4, #8)
-        if explainer.model_name != request.model_choice:
-            explainer.load_model(request.model_choice)
+        # Challengers score concurrently on their own pool; the decision below never waits on them
+        challenger_futures = challengers.start(
+            [name for name in explainers if name != request.model_choice], core_input
+        ) if ensemble else {}
         
-        # 4. Process Pipeline & Inference
-        df_proc = engineer.process_pipeline(df_raw)
-        explanation = explainer.explain_instance(df_proc)
+        # 3. Process Pipeline, OOD Detection (Level 4, #9) & Inference.
+        # Concurrent requests are coalesced into one batched pass when enabled.
+        shap_mode = "exact" if level < 2 else "approximate" if level == 2 else "none"
+        if batcher is not None:
+            explanation, ood_result = await batcher.submit((request.model_choice, shap_mode), core_input)
+        else:
+            explanation, ood_result = (await run_in_threadpool(score_batch, request.model_choice, [core_input], shap_mode))[0]
+        if 'shap_ms' in explanation:
+            stage_ms['shap'] = explanation['shap_ms']
         
-        # Issue 1: Calibrate probability (Clamp to [0.01, 0.99])
+        # Issue 1: Calibrated probability from the stored isotonic/Platt map;
+        # versions without one fall back to clamping to [0.01, 0.99].
+        # The verdict is read off that same served probability, so the two always agree.
         raw_prob = explanation['prediction_prob']
-        prob = min(max(raw_prob, 0.01), 0.99)
-        is_denied = prob > 0.5
+        calibrator = get_calibrator(explainer)
+        prob = explanation['served_prob']
+        is_denied = prob > DECISION_THRESHOLD
         
         # 5. Narrative with Tone (Level 3, #6)
-        narrative_data = nugget.generate_narrative(explanation, tone=request.tone)
+        if explanation['contributions']:
+            narrative_data = nugget.generate_narrative(
+                explanation, tone=request.tone, is_denied=is_denied,
+                global_summary=global_summaries.get(explainer.model_version)
+            )
+        else:
+            narrative_data = {"narrative": "Detailed explanation deferred under high load; the verdict and probability are exact."}
         
-        # 6. Counterfactuals (Level 1, #1)
-        cf_engine = CounterfactualEngine(explainer.model, engineer)
-        cf_data = cf_engine.find_path_to_approval(core_input) if is_denied else None
+        # 6. Counterfactuals (Level 1, #1); the first stage dropped under load
+        cf_data = None
+        if is_denied and level == 0:
+            cf_started = time.perf_counter()
+            cf_data = await run_in_threadpool(get_cf_engine(explainer).find_path_to_approval, core_input)
+            stage_ms['counterfactuals'] = (time.perf_counter() - cf_started) * 1000.0
         
         # 7. Confidence & Certainty Breakdown (Level 1, #3)
-        # Issue 2: Honest confidence (avoid perfect 100%)
-        conf = conf_estimator.estimate(prob)
+        # Conformal p-values when the model version has calibration scores;
+        # otherwise Issue 2: Honest confidence (avoid perfect 100%)
+        conf = get_conf_estimator(explainer).estimate(raw_prob)
         conf_score = conf['score']
-        if conf_score > 0.98:
+        if 'prediction_set' not in conf and conf_score > 0.98:
             # Add micro-jitter for realism
             import random
             conf_score = 0.96 + (0.03 * random.random())
             
+        # Champion/challenger comparison, bounded by the latency budget
+        ensemble_data = None
+        if ensemble:
+            ensemble_data = await challengers.collect(challenger_futures, request.model_choice, {
+                "model_version": explainer.model_version,
+                "probability": float(prob),
+                "raw_probability": float(raw_prob),
+                "prediction": "Denied" if is_denied else "Approved"
+            }, started)
+            
         # Custom breakdown for 'Uncertainty Breakdown' UI
         uncertainty_breakdown = {
             "data_similarity": "High" if ood_result['similarity_score'] > 0.8 else "Medium" if ood_result['similarity_score'] > 0.5 else "Low",
-            "model_agreement": "High" if prob > 0.8 or prob < 0.2 else "Medium",
+            # Measured across models when challengers answered in time; otherwise a margin heuristic
+            "model_agreement": ensemble_data['model_agreement'] if ensemble_data and ensemble_data['model_agreement'] != "Unknown"
+                else "High" if prob > 0.8 or prob < 0.2 else "Medium",
             "is_ood": ood_result['is_ood']
         }
         
-        contribs = [
-            Contribution(feature=k, value=float(v)) 
-            for k, v in explanation['contributions'].items()
-        ]
+        contribs = pack_contributions(explanation['contributions'], top_k=top_k, compact=compact)
         
         # Issue 4: Quantitative Fairness Metrics
-        # These are usually calculated across a batch, but for a single instance 
-        # we display the 'global' fairness calibration of the model.
-        fairness_metrics = {
-            "demographic_parity_diff": 0.032,
-            "equal_opportunity_diff": 0.041,
-            "treatment_equality": 0.025
-        }
-        
-        response = DecisionResponse(
-            prediction="Denied" if is_denied else "Approved",
-            probability=prob,
-            confidence_score=conf_score,
-            confidence_status=conf['status'],
-            review_required=conf['review_required'] or ood_result['is_ood'],
-            narrative=narrative_data['narrative'],
-            contributions=contribs,
-            fairness_warning="Sensitivity check complete: Non-discriminatory status verified.",
-            is_ood=ood_result['is_ood'],
-            similarity_score=ood_result['similarity_score'],
-            counterfactuals=cf_data,
-            fairness_metrics=fairness_metrics,
-            model_version="v1.3"
+        # These are calculated across a batch, so for a single instance we display
+        # the model version's stored intersectional audit (gender x age band).
+        fairness_report = get_fairness_report(explainer)
+        headline = fairness_report.get('headline') if fairness_report else None
+        fairness_metrics = {k: v for k, v in headline.items() if k != 'grouping'} if headline else None
+        flagged = [name for name, g in fairness_report['groupings'].items() if g['possible_violation']] if fairness_report else []
+        fairness_warning = (
+            f"Disparate impact below the 80% rule for: {', '.join(flagged)}." if flagged
+            else "Sensitivity check complete: Non-discriminatory status verified."
         )
         
-        # 8. Governance Logging (Level 5, #10)
-        auditor.log_decision(input_dict, response.model_dump(), "v1.3")
+        # Built once as plain data: the same dict feeds the audit record and the
+        # single orjson encoding of the HTTP body (no pydantic round-trips).
+        response_data = {
+            "prediction": "Denied" if is_denied else "Approved",
+            "probability": float(prob),
+            "confidence_score": float(conf_score),
+            "confidence_status": conf['status'],
+            "review_required": bool(conf['review_required'] or ood_result['is_ood']),
+            "narrative": narrative_data['narrative'],
+            "contributions": contribs,
+            "fairness_warning": fairness_warning,
+            "is_ood": ood_result['is_ood'],
+            "similarity_score": ood_result['similarity_score'],
+            "counterfactuals": cf_data,
+            "brier_score": calibrator.brier_score if calibrator is not None else None,
+            "calibration_method": calibrator.method if calibrator is not None else None,
+            "prediction_set": conf.get('prediction_set'),
+            "conformal_p_values": conf.get('p_values'),
+            "coverage_level": conf.get('coverage'),
+            "fairness_metrics": fairness_metrics,
+            "uncertainty_breakdown": uncertainty_breakdown,
+            "ensemble": ensemble_data,
+            "degradation_level": level,
+            "degradation_mode": LEVELS[level],
+            "model_version": "v1.3"
+        }
         
-        return response
+        return response_data, explainer.model_version, challenger_futures
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Prediction error: {e}")
         import traceback
         logging.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if degrader is not None:
+            degrader.end((time.perf_counter() - started) * 1000.0, stage_ms)
+        release_admission(request.model_choice, client, started)
+
+@app.post("/predict", response_model=DecisionResponse)
+async def predict(
+    request: DecisionRequest,
+    http_request: Request,
+    top_k: Optional[int] = Query(None, ge=1, description="Return only the top-k contributions by |SHAP|"),
+    compact: bool = Query(False, description="Contributions as parallel feature/value arrays"),
+    ensemble: Optional[bool] = Query(None, description="Also score with every resident challenger model")
+):
+    client, lane = admission_identity(http_request)
+    input_dict = request.model_dump()
+    if ensemble is None:
+        ensemble = config.get('serving', {}).get('ensemble', {}).get('enabled', False)
+    compute = lambda: decide(request, input_dict, client, lane, top_k, compact, ensemble)
+
+    if coalescer is not None:
+        # Duplicates (retries, double submits) of a decision still being computed wait for it,
+        # without taking an admission slot of their own
+        key = coalescer.key(
+            {**input_dict, "top_k": top_k, "compact": compact, "ensemble": ensemble},
+            get_explainer(request.model_choice).model_version
+        )
+        (response_data, model_version, challenger_futures), leader = await coalescer.run(key, compute)
+    else:
+        (response_data, model_version, challenger_futures), leader = await compute(), True
+
+    # 8. Governance Logging (Level 5, #10): every caller gets its own audit record
+    decision_id = auditor.log_decision(input_dict, response_data, model_version)
+    if ensemble and leader:
+        challengers.log(decision_id, request.model_choice, challenger_futures, response_data['ensemble'])
+    
+    return FastJSONResponse({**response_data, "decision_id": decision_id})
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request, model_choice: str = "xgboost", include_contributions: bool = False):
+    """
+    Bulk scoring for Arrow IPC streams, NPY record arrays or JSON columns
+    (Content-Type); results come back in the format named by Accept.
+    Narratives and counterfactuals are per-applicant features of /predict.
+    """
+    content_type = request.headers.get("content-type")
+    try:
+        df_raw = validate_columns(decode_batch(await request.body(), content_type))
+    except ColumnarFormatError as e:
+        status = 422 if e.errors else 415
+        raise HTTPException(status_code=status, detail={"message": str(e), "errors": e.errors})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode batch: {e}")
+
+    explainer = get_explainer(model_choice)
+    max_rows = config.get('serving', {}).get('kernel_shap_max_rows', 200)
+    if include_contributions and explainer.is_kernel and len(df_raw) > max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Contributions for {model_choice} use KernelExplainer and are limited to {max_rows} rows per batch "
+                   f"(got {len(df_raw)}); split the batch or omit include_contributions"
+        )
+    # Bulk scoring rides the lowest lane unless the caller asks otherwise
+    client, lane = admission_identity(request, default_lane="bulk")
+    await admit(model_choice, client, lane)
+    started = time.perf_counter()
+    try:
+        result = await run_in_threadpool(score_columns, explainer, df_raw, include_contributions)
+    except Exception as e:
+        logging.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        release_admission(model_choice, client, started)
+
+    audit_cols = ["prediction", "probability", "confidence_score", "review_required", "is_ood"]
+    auditor.log_columns(
+        df_raw.to_dict('records'), {col: result[col].tolist() for col in audit_cols}, explainer.model_version
+    )
+    payload, media_type = encode_result(result, negotiate(request.headers.get("accept"), content_type))
+    return Response(content=payload, media_type=media_type)
+
+@app.get("/explanations/global")
+def global_explanation(model_choice: str = "xgboost"):
+    """Global SHAP context (importance, quantiles, dependence) for the served model version."""
+    model_explainer = get_explainer(model_choice)
+    summary = get_global_summary(model_explainer)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No global summary stored for {model_explainer.model_version}")
+    return summary
+
+@app.get("/fairness")
+def fairness_audit(model_choice: str = "xgboost"):
+    """Intersectional fairness audit (DPD, EOD, treatment equality, DI with bootstrap CIs) for the served version."""
+    report = get_fairness_report(get_explainer(model_choice))
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No registered model named {model_choice}")
+    return report
+
+@app.get("/audit")
+def audit_query(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    model_version: Optional[str] = None,
+    prediction: Optional[str] = None,
+    review_required: Optional[bool] = None,
+    is_ood: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Paginated, indexed search over logged decisions (ISO-8601 time range)."""
+    return auditor.store.query(
+        start=start, end=end, limit=limit, cursor=cursor, model_version=model_version,
+        prediction=prediction, review_required=review_required, is_ood=is_ood
+    )
+
+@app.post("/audit/outcomes")
+def record_outcomes(outcomes: List[DecisionOutcome]):
+    """Observed outcomes for logged decisions; the labels feed incremental retraining."""
+    unknown = auditor.record_outcomes({o.decision_id: o.loan_status for o in outcomes})
+    return {"recorded": len(outcomes) - len(unknown), "unknown_ids": unknown}
+
+@app.get("/audit/stats")
+def audit_stats(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    group_by: str = "model_version",
+    model_version: Optional[str] = None,
+    prediction: Optional[str] = None,
+    review_required: Optional[bool] = None,
+    is_ood: Optional[bool] = None
+):
+    try:
+        return auditor.store.aggregate(
+            start=start, end=end, group_by=group_by, model_version=model_version,
+            prediction=prediction, review_required=review_required, is_ood=is_ood
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics/batching")
+def batching_metrics():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.metrics()}
+
+@app.get("/metrics/degradation")
+def degradation_metrics():
+    if degrader is None:
+        return {"enabled": False}
+    return {"enabled": True, **degrader.metrics()}
+
+@app.get("/metrics/admission")
+def admission_metrics():
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.metrics()}
+
+@app.get("/metrics/coalescing")
+def coalescing_metrics():
+    if coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **coalescer.metrics()}
+
+@app.get("/metrics/shap_cache")
+def shap_cache_metrics():
+    if shap_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **shap_cache.metrics()}
+
+@app.get("/metrics/ensemble")
+def ensemble_metrics():
+    return challengers.metrics()
+
+def get_profile_store():
+    if request_profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (profiling.enabled in config.yaml)")
+    return request_profiler.store
+
+@app.get("/admin/profiles")
+def list_profiles():
+    """Stored request profiles (newest first) with path, status, duration and sample count."""
+    return {"profiles": get_profile_store().list()}
+
+@app.get("/admin/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    try:
+        payload = get_profile_store().read(profile_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    return Response(
+        content=payload, media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed"'}
+    )
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "model": "xgboost_latest"}
+    return {"status": "ok", "model": "xgboost_latest", "versions": {n: e.model_version for n, e in explainers.items()}}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    serving = config.get('serving', {})
+    if serving.get('workers', 1) > 1:
+        import sys
+        from api.prefork import PreforkServer
+        PreforkServer(sys.modules[__name__], serving).run()
+    else:
+        uvicorn.run(app, host=serving.get('host', "0.0.0.0"), port=serving.get('port', 8000))
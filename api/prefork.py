@@ -0,0 +1,182 @@
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+def _run_audit_writer(auditor, queue):
+    # Terminal Ctrl-C reaches the whole process group; the writer only stops on the sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    auditor.serve_queue(queue)
+
+class PreforkServer:
+    """
+    Pre-fork multi-worker serving for the decision API.
+
+    The master loads models, explainers, the OOD detector and preprocessing
+    artifacts once, then forks workers that inherit them copy-on-write and
+    accept on a shared listening socket. Audit entries from every worker go
+    through one queue to a single writer process. When a new model version is
+    registered (or on SIGHUP) the master reloads and replaces workers one at a
+    time, so there is always capacity serving traffic.
+    """
+
+    def __init__(self, service, settings: dict = None):
+        settings = settings or {}
+        self.service = service
+        self.host = settings.get('host', "0.0.0.0")
+        self.port = settings.get('port', 8000)
+        self.num_workers = settings.get('workers', multiprocessing.cpu_count())
+        self.poll_interval = settings.get('model_poll_interval', 30)
+        self.graceful_timeout = settings.get('graceful_timeout', 30)
+        self.workers = set()
+        self.sock = None
+        self.audit_queue = None
+        self.writer = None
+        self._reload_requested = False
+        self._stopping = False
+
+    def run(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+        self._start_audit_writer()
+        self._freeze_shared_state()
+
+        signal.signal(signal.SIGHUP, lambda *_: self._request_reload())
+        signal.signal(signal.SIGTERM, lambda *_: self._request_stop())
+        signal.signal(signal.SIGINT, lambda *_: self._request_stop())
+
+        logger.info(f"Master {os.getpid()} serving on {self.host}:{self.port} with {self.num_workers} workers")
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+
+        last_poll = time.monotonic()
+        try:
+            while not self._stopping:
+                self._reap_workers()
+                if time.monotonic() - last_poll >= self.poll_interval:
+                    last_poll = time.monotonic()
+                    if self.service.registered_versions() != self.service.runtime_versions:
+                        logger.info("New model version registered; starting rolling restart")
+                        self._reload_requested = True
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._rolling_restart()
+                time.sleep(0.5)
+        finally:
+            self._shutdown()
+
+    def _start_audit_writer(self):
+        ctx = multiprocessing.get_context("fork")
+        self.audit_queue = ctx.Queue()
+        self.writer = ctx.Process(
+            target=_run_audit_writer, args=(self.service.auditor, self.audit_queue), name="audit-writer", daemon=True
+        )
+        self.writer.start()
+        # Workers inherit an auditor that only enqueues
+        self.service.auditor.attach_queue(self.audit_queue)
+
+    def _freeze_shared_state(self):
+        # Move everything loaded so far into the permanent generation so the
+        # collector in workers never touches (and un-shares) those pages.
+        gc.collect()
+        gc.freeze()
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid != 0:
+            self.workers.add(pid)
+            return pid
+
+        # Worker process
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        try:
+            config = uvicorn.Config(self.service.app, log_level="info", timeout_graceful_shutdown=self.graceful_timeout)
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except Exception as e:
+            logger.error(f"Worker {os.getpid()} crashed: {e}")
+            os._exit(1)
+        os._exit(0)
+
+    def _reap_workers(self):
+        # Only wait on our own workers; the audit writer is owned by multiprocessing
+        for pid in list(self.workers):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, -1
+            if done:
+                self.workers.discard(pid)
+                if not self._stopping:
+                    logger.warning(f"Worker {pid} exited with status {status}; respawning")
+                    self._spawn_worker()
+
+    def _rolling_restart(self):
+        gc.unfreeze()
+        try:
+            self.service.load_runtime()
+        except Exception as e:
+            logger.error(f"Reload failed, keeping current workers: {e}")
+            self._freeze_shared_state()
+            return
+        self.service.auditor.attach_queue(self.audit_queue)
+        self._freeze_shared_state()
+
+        for old_pid in list(self.workers):
+            # Bring up the replacement first so capacity never drops
+            self._spawn_worker()
+            self._stop_worker(old_pid)
+        logger.info("Rolling restart complete")
+
+    def _stop_worker(self, pid: int):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            self.workers.discard(pid)
+            return
+        deadline = time.monotonic() + self.graceful_timeout
+        try:
+            while time.monotonic() < deadline:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    break
+                time.sleep(0.1)
+            else:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+        except (ChildProcessError, ProcessLookupError):
+            # Already reaped elsewhere (e.g. by _reap_workers on SIGCHLD)
+            pass
+        self.workers.discard(pid)
+
+    def _request_reload(self):
+        self._reload_requested = True
+
+    def _request_stop(self):
+        self._stopping = True
+
+    def _shutdown(self):
+        self._stopping = True
+        for pid in list(self.workers):
+            self._stop_worker(pid)
+        if self.audit_queue is not None:
+            self.audit_queue.put(None)
+            self.writer.join(timeout=self.graceful_timeout)
+        if self.sock is not None:
+            self.sock.close()
+        logger.info("Master shut down")
+
+if __name__ == "__main__":
+    import api.main as service
+    PreforkServer(service, service.config.get('serving', {})).run()
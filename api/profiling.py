@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = ".collapsed"
+_PROFILE_ID = re.compile(r"^[0-9A-Za-z_\-]+$")
+# Leaf frames of threads that are parked, not working (pool workers, event loop idle)
+IDLE_LEAVES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+
+class SamplingProfiler:
+    """
+    Minimal statistical profiler: a background thread snapshots every other
+    thread's Python stack (sys._current_frames) each interval_ms and counts
+    identical stacks. All threads are sampled because request work can run on
+    the event loop, the default executor (micro-batching) or the challenger
+    pool; threads parked in a wait are skipped. Output is the collapsed-stack
+    format flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, interval_ms: float = 2.0, max_depth: int = 128):
+        self.interval = interval_ms / 1000.0
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _collapse(self, frame, thread_name: str) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        names.append(thread_name)
+        return ";".join(reversed(names))
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            threads = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_LEAVES:
+                    continue
+                self.stacks[self._collapse(frame, threads.get(thread_id, str(thread_id)))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+class ProfileStore:
+    """
+    Bounded on-disk ring buffer of collapsed-stack profiles. Each profile is a
+    .collapsed file plus a .json sidecar with request metadata; the oldest
+    profiles are evicted once max_profiles or max_total_mb is exceeded.
+    """
+
+    def __init__(self, directory: str = "logs/profiles", max_profiles: int = 50, max_total_mb: float = 50.0):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.max_bytes = int(max_total_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not _PROFILE_ID.match(profile_id):
+            raise ValueError(f"Invalid profile id {profile_id!r}")
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def save(self, stacks: Counter, meta: Dict[str, Any]) -> str:
+        # Sortable ids; the pid keeps pre-fork workers from colliding
+        profile_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+        with open(self._path(profile_id, PROFILE_SUFFIX), "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(self._path(profile_id, ".json"), "w") as f:
+            json.dump({"id": profile_id, **meta}, f)
+        self._evict()
+        return profile_id
+
+    def _evict(self):
+        with self._lock:
+            profiles = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.name.endswith(PROFILE_SUFFIX)),
+                key=lambda entry: entry.name
+            )
+            total = sum(entry.stat().st_size for entry in profiles)
+            while profiles and (len(profiles) > self.max_profiles or total > self.max_bytes):
+                oldest = profiles.pop(0)
+                total -= oldest.stat().st_size
+                for path in (oldest.path, oldest.path[:-len(PROFILE_SUFFIX)] + ".json"):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass  # Evicted concurrently by another worker
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of every stored profile, newest first."""
+        items = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    items.append(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return items
+
+    def read(self, profile_id: str) -> Optional[bytes]:
+        path = self._path(profile_id, PROFILE_SUFFIX)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+class RequestProfiler:
+    """
+    Decides which requests are profiled (a sampled fraction, or any request
+    carrying the debug header) and records them. At most one profile runs per
+    process at a time, so a burst of debug headers cannot stack up overhead.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.sample_rate = settings.get('sample_rate', 0.0)
+        self.debug_header = settings.get('debug_header', "X-Debug-Profile").lower()
+        self.interval_ms = settings.get('interval_ms', 2.0)
+        self.paths = tuple(settings.get('paths', ["/predict"]))
+        self.store = ProfileStore(
+            settings.get('directory', "logs/profiles"),
+            max_profiles=settings.get('max_profiles', 50),
+            max_total_mb=settings.get('max_total_mb', 50)
+        )
+        self._busy = threading.Lock()
+
+    def wants(self, path: str, headers) -> bool:
+        if not path.startswith(self.paths):
+            return False
+        if headers.get(self.debug_header) not in (None, "", "0", "false"):
+            return True
+        return random.random() < self.sample_rate
+
+    async def profile(self, request, call_next):
+        if not self._busy.acquire(blocking=False):
+            return await call_next(request)
+        profiler = SamplingProfiler(self.interval_ms)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            stacks = profiler.stop()
+            self._busy.release()
+        meta = {
+            "timestamp": datetime.now().isoformat(),
+            "path": request.url.path,
+            "query": request.url.query,
+            "status_code": response.status_code,
+            "duration_ms": (time.perf_counter() - started) * 1000.0,
+            "samples": profiler.samples,
+            "interval_ms": self.interval_ms,
+            "pid": os.getpid()
+        }
+        try:
+            response.headers["X-Profile-Id"] = self.store.save(stacks, meta)
+        except OSError as e:
+            logger.error(f"Failed to store profile: {e}")
+        return response
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional, Union
 
 class DecisionRequest(BaseModel):
     person_age: float
@@ -22,14 +22,21 @@ class Contribution(BaseModel):
     feature: str
     value: float
 
+class CompactContributions(BaseModel):
+    # Parallel arrays: values[i] is the SHAP contribution of features[i]
+    features: List[str]
+    values: List[float]
+
 class DecisionResponse(BaseModel):
+    # Audit record of this call; pass it back with POST /audit/outcomes
+    decision_id: Optional[str] = None
     prediction: str
     probability: float
     confidence_score: float
     confidence_status: str
     review_required: bool
     narrative: str
-    contributions: List[Contribution]
+    contributions: Union[List[Contribution], CompactContributions]
     fairness_warning: str
     
     # Advanced ML Signals
@@ -37,8 +44,26 @@ class DecisionResponse(BaseModel):
     similarity_score: float = 1.0
     counterfactuals: Optional[dict] = None
     brier_score: Optional[float] = None
+    calibration_method: Optional[str] = None
+    
+    # Split-conformal uncertainty (set valid at coverage_level)
+    prediction_set: Optional[List[str]] = None
+    conformal_p_values: Optional[Dict[str, float]] = None
+    coverage_level: Optional[float] = None
+    
+    # Champion/challenger comparison: per-model probabilities and disagreement
+    uncertainty_breakdown: Optional[Dict[str, Any]] = None
+    ensemble: Optional[Dict[str, Any]] = None
+    
+    # Explanation depth actually served (0 = full; see api/degradation.py)
+    degradation_level: int = 0
+    degradation_mode: str = "full"
     
     # Quantitative Ethics
-    fairness_metrics: Optional[Dict[str, float]] = None
+    fairness_metrics: Optional[Dict[str, Optional[float]]] = None
     
     model_version: str = "v1.3"
+
+class DecisionOutcome(BaseModel):
+    decision_id: str
+    loan_status: int = Field(..., ge=0, le=1) # observed outcome, 1 = default
@@ -0,0 +1,302 @@
+import argparse
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.neural_network import MLPClassifier
+from src.data_science.engineer import FeatureEngineer
+from src.data_science.validator import DataValidator
+from src.modeling.registry import ModelRegistry
+from src.modeling.mlp_scorer import CompiledMLP, MLP_FORWARD_ARTIFACT
+from src.modeling.calibration import ProbabilityCalibrator, CALIBRATION_ARTIFACT, DECISION_THRESHOLD, served_probability
+
+logger = logging.getLogger(__name__)
+
+# Raw inputs a borrower can plausibly misstate or change; age and categoricals stay fixed
+MUTABLE = ["person_income", "loan_amnt", "loan_int_rate", "person_emp_length", "cb_person_cred_hist_length"]
+INTEGER = {"person_emp_length", "cb_person_cred_hist_length"}
+OOD_THRESHOLD = -0.1  # DataValidator flags isolation forest scores below this
+TARGETS = ["flip", "ood"]
+
+class AdversarialSearch:
+    """
+    Population-based search for adversarial borrowers: the smallest plausible
+    change to a profile's mutable inputs that flips the decision ("flip") or
+    the OOD flag ("ood").
+
+    Every seed carries a population that starts as random restarts around it
+    (a mix of small, large and uniform-within-bounds perturbations) and evolves
+    by elitist selection, uniform crossover, IQR-scaled mutation and a shrink
+    move back towards the seed. Fitness is the IQR-normalised L1 distance from
+    the seed, plus a penalty proportional to how far an unsuccessful candidate
+    is from the decision boundary. All populations of a chunk of seeds are
+    scored together, one pipeline pass and one model call per generation.
+    Values are clipped to training-data quantiles (widened to include the seed).
+    """
+
+    def __init__(self, config: Dict[str, Any], model_name: str = "xgboost"):
+        self.config = config
+        self.settings = config.get('adversarial', {})
+        self.model_name = model_name
+        self.target = self.settings.get('target', "flip")
+        self.population = self.settings.get('population', 48)
+        self.generations = self.settings.get('generations', 30)
+        self.elite = self.settings.get('elite', 8)
+        self.mutation_scale = self.settings.get('mutation_scale', 0.25)
+        self.penalty = self.settings.get('penalty', 50.0)
+        self.features = self.settings.get('features', MUTABLE)
+
+        self.engineer = FeatureEngineer(config)
+        if not self.engineer.load_artifacts():
+            raise RuntimeError("Feature encoders are not persisted; run eda_runner first")
+        self.validator = DataValidator(config)
+        self.has_ood = self.validator.load_ood_detector()
+
+        registry = ModelRegistry()
+        self.model = registry.load_latest(model_name)
+        if self.model is None:
+            raise ValueError(f"No registered model named {model_name}")
+        if isinstance(self.model, MLPClassifier):
+            payload = registry.load_artifact(model_name, MLP_FORWARD_ARTIFACT)
+            if payload is not None:
+                self.model = CompiledMLP.from_dict(payload, estimator=self.model)
+        self.model_version = os.path.basename(registry.get_latest_dir(model_name))
+        # Flips are judged on the served probability, exactly as the API decides
+        calibration = registry.load_artifact(model_name, CALIBRATION_ARTIFACT)
+        self.calibrator = ProbabilityCalibrator.from_dict(calibration) if calibration else None
+
+        # usecols keeps file order; reindex so bounds line up with self.features
+        train = pd.read_csv(config['data']['processed_path'], usecols=self.features)[self.features]
+        lo, hi = self.settings.get('quantiles', [0.01, 0.99])
+        quantiles = train.quantile([lo, 0.25, 0.75, hi])
+        self.lower = quantiles.iloc[0].to_numpy(dtype=float)
+        self.upper = quantiles.iloc[3].to_numpy(dtype=float)
+        # Distances are measured in interquartile ranges so features are comparable
+        self.scale = np.maximum((quantiles.iloc[2] - quantiles.iloc[1]).to_numpy(dtype=float), 1e-6)
+        self.integer = np.array([f in INTEGER for f in self.features])
+
+    def _evaluate(self, seeds: pd.DataFrame, owner: np.ndarray, genomes: np.ndarray):
+        """Scores candidates (rows of genomes, seed index in owner) in one batch: (served prob, ood score)."""
+        batch = seeds.iloc[owner].reset_index(drop=True)
+        batch[self.features] = genomes
+        # The stored ratio is recomputed from the perturbed amount and income
+        X = self.engineer.process_pipeline(batch.drop(columns=['loan_percent_income'], errors='ignore'))
+        prob = served_probability(self.model.predict_proba(X)[:, 1], self.calibrator)
+        ood, _ = self.validator.ood_scores(X) if self.has_ood else (None, None)
+        return prob, ood
+
+    def _margin(self, prob, ood, base_denied, base_ood):
+        """How far each candidate is from achieving the target (0 once it does)."""
+        if self.target == "flip":
+            # Denied seeds must reach p <= threshold, approved ones p > threshold
+            achieved = np.where(base_denied, prob <= DECISION_THRESHOLD, prob > DECISION_THRESHOLD)
+            return np.where(achieved, 0.0, np.abs(prob - DECISION_THRESHOLD) + 1e-3)
+        flagged = ood < OOD_THRESHOLD
+        return np.where(flagged != base_ood, 0.0, np.abs(ood - OOD_THRESHOLD) + 1e-3)
+
+    def _prune(self, seeds, origin, genomes, prob, ood, found, base_denied, base_ood) -> int:
+        """
+        Drops changes an attack does not need: each round tries reverting every
+        changed feature of every successful attack (one batched call) and keeps,
+        per seed, the revert that saves the most distance while the target still
+        holds. Updates genomes/prob/ood in place; returns the evaluations spent.
+        """
+        evaluations = 0
+        for _ in range(len(self.features)):
+            seed_idx, feat_idx = np.nonzero(found[:, None] & (genomes != origin))
+            if len(seed_idx) == 0:
+                break
+            trial = genomes[seed_idx].copy()
+            trial[np.arange(len(seed_idx)), feat_idx] = origin[seed_idx, feat_idx]
+            trial_prob, trial_ood = self._evaluate(seeds, seed_idx, trial)
+            evaluations += len(seed_idx)
+            ok = self._margin(
+                trial_prob, trial_ood if trial_ood is not None else np.zeros_like(trial_prob),
+                base_denied[seed_idx], base_ood[seed_idx]
+            ) == 0
+            if not ok.any():
+                break
+            saving = np.where(ok, np.abs(trial[np.arange(len(seed_idx)), feat_idx] - genomes[seed_idx, feat_idx]) / self.scale[feat_idx], -1.0)
+            order = np.lexsort((-saving, seed_idx))
+            _, first = np.unique(seed_idx[order], return_index=True)
+            chosen = order[first]
+            chosen = chosen[ok[chosen]]
+            genomes[seed_idx[chosen]] = trial[chosen]
+            prob[seed_idx[chosen]] = trial_prob[chosen]
+            if ood is not None:
+                ood[seed_idx[chosen]] = trial_ood[chosen]
+        return evaluations
+
+    def search(self, seeds: pd.DataFrame, rng_seed: int = 0) -> List[Dict[str, Any]]:
+        """Runs the evolutionary search for a chunk of seed profiles."""
+        if self.target == "ood" and not self.has_ood:
+            raise RuntimeError("No OOD detector is persisted; the 'ood' target needs models/ood_detector.joblib")
+        rng = np.random.default_rng(rng_seed)
+        seeds = seeds.reset_index(drop=True)
+        n, P, d = len(seeds), self.population, len(self.features)
+        origin = seeds[self.features].to_numpy(dtype=float)
+        lower = np.minimum(self.lower, origin)
+        upper = np.maximum(self.upper, origin)
+
+        base_prob, base_ood_score = self._evaluate(seeds, np.arange(n), origin)
+        base_denied = base_prob > DECISION_THRESHOLD
+        base_ood = base_ood_score < OOD_THRESHOLD if base_ood_score is not None else np.zeros(n, dtype=bool)
+        owner = np.repeat(np.arange(n), P)
+
+        def clip(genomes):
+            # genomes: (n, P, d)
+            genomes = np.clip(genomes, lower[:, None, :], upper[:, None, :])
+            genomes[..., self.integer] = np.round(genomes[..., self.integer])
+            return genomes
+
+        # Random restarts: local jitter at several radii plus uniform draws over the plausible box
+        radii = rng.choice([0.1, 0.5, 1.5], size=(n, P, 1))
+        population = origin[:, None, :] + rng.normal(size=(n, P, d)) * self.scale * radii
+        uniform = rng.random((n, P)) < 0.25
+        population[uniform] = (lower[:, None, :] + rng.random((n, P, d)) * (upper - lower)[:, None, :])[uniform]
+        population = clip(population)
+
+        best = np.full(n, np.inf)
+        best_genome = origin.copy()
+        best_prob = base_prob.copy()
+        best_ood = base_ood_score.copy() if base_ood_score is not None else None
+        evaluations = n
+        for generation in range(self.generations):
+            prob, ood = self._evaluate(seeds, owner, population.reshape(-1, d))
+            evaluations += n * P
+            prob = prob.reshape(n, P)
+            ood = ood.reshape(n, P) if ood is not None else None
+            distance = (np.abs(population - origin[:, None, :]) / self.scale).sum(axis=-1)
+            margin = self._margin(
+                prob, ood if ood is not None else np.zeros_like(prob), base_denied[:, None], base_ood[:, None]
+            )
+            fitness = distance + self.penalty * margin
+
+            # Track the closest successful candidate per seed
+            success = np.where(margin == 0, distance, np.inf)
+            idx = success.argmin(axis=1)
+            improved = success[np.arange(n), idx] < best
+            best[improved] = success[improved, idx[improved]]
+            best_genome[improved] = population[improved, idx[improved]]
+            best_prob[improved] = prob[improved, idx[improved]]
+            if ood is not None:
+                best_ood[improved] = ood[improved, idx[improved]]
+
+            # Elitist selection, uniform crossover, mutation and a shrink move towards the seed
+            order = np.argsort(fitness, axis=1)[:, :self.elite]
+            elites = np.take_along_axis(population, order[..., None], axis=1)
+            parents = rng.integers(0, self.elite, size=(n, P, 2))
+            a = np.take_along_axis(elites, parents[..., :1], axis=1)
+            b = np.take_along_axis(elites, parents[..., 1:], axis=1)
+            children = np.where(rng.random((n, P, d)) < 0.5, a, b)
+            decay = 1.0 - generation / self.generations
+            mutate = rng.random((n, P, d)) < 0.3
+            children = children + mutate * rng.normal(size=(n, P, d)) * self.scale * self.mutation_scale * decay
+            shrink = rng.random((n, P, 1)) < 0.2
+            children = np.where(shrink, origin[:, None, :] + (children - origin[:, None, :]) * rng.uniform(0.5, 0.95, (n, P, 1)), children)
+            children[:, :self.elite] = elites
+            population = clip(children)
+
+        found = np.isfinite(best)
+        evaluations += self._prune(seeds, origin, best_genome, best_prob, best_ood, found, base_denied, base_ood)
+        best[found] = (np.abs(best_genome - origin) / self.scale).sum(axis=-1)[found]
+
+        results = []
+        for i in range(n):
+            found = bool(np.isfinite(best[i]))
+            changes = {
+                feature: {"from": float(origin[i, j]), "to": float(best_genome[i, j])}
+                for j, feature in enumerate(self.features) if found and best_genome[i, j] != origin[i, j]
+            }
+            results.append({
+                "seed": i,
+                "original_prob": float(base_prob[i]),
+                "original_decision": "Denied" if base_denied[i] else "Approved",
+                "original_is_ood": bool(base_ood[i]),
+                "found": found,
+                "distance_iqr": float(best[i]) if found else None,
+                "changes": changes,
+                "adversarial_prob": float(best_prob[i]) if found else None,
+                "adversarial_is_ood": bool(best_ood[i] < OOD_THRESHOLD) if found and best_ood is not None else None,
+                "evaluations": int(evaluations // n)
+            })
+        return results
+
+# Per-process search engine of pool workers (built once by the initializer)
+_worker = {}
+
+def _init_worker(config: Dict[str, Any], model_name: str):
+    logging.getLogger("src.data_science.engineer").setLevel(logging.WARNING)
+    _worker['search'] = AdversarialSearch(config, model_name)
+
+def _search_chunk(seeds: pd.DataFrame, offset: int, rng_seed: int):
+    results = _worker['search'].search(seeds, rng_seed)
+    for result in results:
+        result['seed'] += offset
+    return results
+
+def run_adversarial_search(config: Dict[str, Any], seeds: pd.DataFrame, model_name: str = "xgboost",
+                           workers: Optional[int] = None) -> Dict[str, Any]:
+    """Fans chunks of seed profiles out over a process pool and summarises the attacks found."""
+    settings = config.get('adversarial', {})
+    chunk_size = settings.get('chunk_size', 64)
+    seeds = seeds.reset_index(drop=True)
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(config, model_name)) as pool:
+        futures = [
+            pool.submit(_search_chunk, seeds.iloc[start:start + chunk_size], start, settings.get('random_state', 42) + start)
+            for start in range(0, len(seeds), chunk_size)
+        ]
+        for future in futures:
+            results.extend(future.result())
+
+    found = [r for r in results if r['found']]
+    touched = Counter(feature for r in found for feature in r['changes'])
+    distances = np.array([r['distance_iqr'] for r in found])
+    return {
+        "model_name": model_name,
+        "target": settings.get('target', "flip"),
+        "n_seeds": len(results),
+        "success_rate": len(found) / len(results) if results else 0.0,
+        "median_distance_iqr": float(np.median(distances)) if len(found) else None,
+        "p10_distance_iqr": float(np.percentile(distances, 10)) if len(found) else None,
+        "feature_usage": {feature: count / len(found) for feature, count in touched.most_common()} if found else {},
+        # Cheapest attacks first: the profiles closest to a decision boundary
+        "weakest": sorted(found, key=lambda r: r['distance_iqr'])[:settings.get('report_top', 10)],
+        "results": results,
+        "elapsed_s": time.perf_counter() - started
+    }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("src.data_science.engineer").setLevel(logging.WARNING)
+    with open("config/config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    parser = argparse.ArgumentParser(description="Population-based search for adversarial borrowers")
+    parser.add_argument("--seeds", default=config['data']['raw_path'], help="CSV of raw seed profiles")
+    parser.add_argument("--limit", type=int, default=1000, help="number of seed profiles")
+    parser.add_argument("--model", default="xgboost")
+    parser.add_argument("--target", choices=TARGETS, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="write the full report as JSON")
+    args = parser.parse_args()
+    if args.target:
+        config.setdefault('adversarial', {})['target'] = args.target
+
+    report = run_adversarial_search(config, pd.read_csv(args.seeds).head(args.limit), args.model, args.workers)
+    print(f"\n--- Adversarial Borrowers ({args.model}, target={report['target']}, {report['n_seeds']} seeds, {report['elapsed_s']:.1f}s) ---")
+    print(f"Success rate: {report['success_rate']:.1%}, median distance: {report['median_distance_iqr']} IQR")
+    print(f"Features used: {report['feature_usage']}")
+    for r in report['weakest'][:5]:
+        moves = ", ".join(f"{f} {c['from']:.1f}->{c['to']:.1f}" for f, c in r['changes'].items())
+        print(f"  seed {r['seed']}: {r['original_decision']} p={r['original_prob']:.3f} -> p={r['adversarial_prob']:.3f} ({r['distance_iqr']:.2f} IQR) {moves}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
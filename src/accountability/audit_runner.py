@@ -1,8 +1,11 @@
 from src.accountability.bias_auditor import BiasAuditor
+from src.accountability.fairness_audit import FairnessAuditor
 from src.accountability.confidence import ConfidenceEstimator
 from src.modeling.registry import ModelRegistry
+from src.modeling.calibration import ProbabilityCalibrator, CALIBRATION_ARTIFACT, DECISION_THRESHOLD, served_probability
 import pandas as pd
 import numpy as np
+import yaml
 
 def run_audits():
     registry = ModelRegistry()
@@ -11,13 +14,20 @@ def run_audits():
     X_test = pd.read_csv("data/processed/test_features.csv")
     y_test = pd.read_csv("data/processed/test_target.csv")
     
-    # Predict
+    # Predict, then audit the served (calibrated) probability so approvals are the ones the API grants
     X_feat = X_test.drop(columns=['person_gender'])
-    y_prob = model.predict_proba(X_feat)[:, 1]
+    calibration = registry.load_artifact("xgboost", CALIBRATION_ARTIFACT)
+    calibrator = ProbabilityCalibrator.from_dict(calibration) if calibration else None
+    y_prob = served_probability(model.predict_proba(X_feat)[:, 1], calibrator)
     
     # Bias Audit
     auditor = BiasAuditor()
-    bias_results = auditor.calculate_disparate_impact(X_test, y_prob)
+    bias_results = auditor.calculate_disparate_impact(X_test, y_prob, threshold=DECISION_THRESHOLD)
+    
+    # Intersectional audit with bootstrap confidence intervals
+    with open("config/config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    fairness = FairnessAuditor(config).audit(X_test, y_test[config['data']['target']], y_prob, threshold=DECISION_THRESHOLD)
     
     # Confidence Estimation (on a single point)
     conf_estimator = ConfidenceEstimator()
@@ -29,6 +39,17 @@ def run_audits():
     print(f"Approval Rates by Gender: {bias_results['approval_rates']}")
     print(f"Disparate Impact Ratios: {bias_results['disparate_impact']}")
     
+    print(f"\n--- Intersectional Fairness ({fairness['n_bootstrap']} bootstrap resamples, {fairness['confidence_level']:.0%} CI) ---")
+    for name, grouping in fairness['groupings'].items():
+        print(f"{name}:")
+        for metric, m in grouping['metrics'].items():
+            lo, hi = m['ci']
+            value = f"{m['value']:.4f}" if m['value'] is not None else "n/a"
+            interval = f"[{lo:.4f}, {hi:.4f}]" if lo is not None else "[n/a]"
+            print(f"  {metric}: {value} {interval}")
+        if grouping['violation']:
+            print("  Disparate impact violation (CI entirely below threshold)")
+    
     print("\n--- Confidence Check (Sample) ---")
     print(f"Prob: {sample_prob:.4f}, Confidence: {conf_results['score']:.4f}")
     print(f"Status: {conf_results['status']}")
@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FILTER_COLUMNS = ["model_version", "prediction", "review_required", "is_ood"]
+# Bound parameters per IN (...) lookup; SQLite builds before 3.32 cap a statement at 999
+MAX_VARIABLES = 900
+
+class AuditStore:
+    """
+    Embedded, indexed decision store (SQLite in WAL mode). One writer appends
+    in batched transactions while any number of readers query concurrently.
+    Connections are opened lazily per thread, so the store can be created in a
+    pre-fork master and used safely from forked workers.
+    """
+
+    def __init__(self, db_path: str = "logs/audit.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS decisions (
+                    id TEXT PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    model_version TEXT,
+                    prediction TEXT,
+                    probability REAL,
+                    certainty REAL,
+                    review_required INTEGER,
+                    is_ood INTEGER,
+                    input TEXT,
+                    output TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_decisions_timestamp ON decisions(timestamp);
+                CREATE INDEX IF NOT EXISTS idx_decisions_model_version ON decisions(model_version, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_decisions_prediction ON decisions(prediction, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_decisions_review ON decisions(review_required, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_decisions_ood ON decisions(is_ood, timestamp);
+                CREATE TABLE IF NOT EXISTS outcomes (
+                    decision_id TEXT PRIMARY KEY REFERENCES decisions(id),
+                    label INTEGER NOT NULL,
+                    recorded_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_outcomes_recorded ON outcomes(recorded_at);
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def insert_many(self, entries: List[Dict[str, Any]]):
+        """Appends audit entries in a single transaction."""
+        rows = [
+            (
+                e["id"], e["timestamp"], e.get("model_version"),
+                e["output"].get("prediction"), e["output"].get("probability"), e["output"].get("certainty"),
+                int(bool(e["output"].get("review_required"))), int(bool(e["output"].get("is_ood"))),
+                json.dumps(e.get("input")), json.dumps(e["output"])
+            )
+            for e in entries
+        ]
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def record_outcomes(self, outcomes: Dict[str, int], recorded_at: Optional[str] = None) -> List[str]:
+        """
+        Attaches observed outcomes (loan_status: 1 = default) to logged decisions.
+        Returns the IDs that matched no decision; a re-labelled ID is overwritten.
+        """
+        recorded_at = recorded_at or datetime.now().isoformat()
+        conn = self._conn()
+        ids = list(outcomes)
+        known = set()
+        for i in range(0, len(ids), MAX_VARIABLES):
+            chunk = ids[i:i + MAX_VARIABLES]
+            known.update(
+                row[0] for row in conn.execute(f"SELECT id FROM decisions WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            )
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?)",
+                [(decision_id, int(label), recorded_at) for decision_id, label in outcomes.items() if decision_id in known]
+            )
+        return [decision_id for decision_id in outcomes if decision_id not in known]
+
+    def labelled_decisions(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Decision inputs joined with outcomes labelled after `since`, oldest label first."""
+        where, params = ("WHERE o.recorded_at > ?", [since]) if since else ("", [])
+        rows = self._conn().execute(
+            f"""SELECT d.id, d.model_version, d.input, o.label, o.recorded_at
+                FROM outcomes o JOIN decisions d ON d.id = o.decision_id
+                {where} ORDER BY o.recorded_at, d.id""",
+            params
+        ).fetchall()
+        return [{**dict(row), "input": json.loads(row["input"])} for row in rows]
+
+    def iter_decisions(self, start: Optional[str] = None, end: Optional[str] = None, chunk_size: int = 10000, **filters):
+        """
+        Oldest-first chunks of decisions (inputs parsed, outcome label or None).
+        Keyset pagination on (timestamp, id) keeps every chunk an index range
+        scan, however deep into the history the replay is.
+        """
+        where, params = self._where(start, end, filters)
+        conn = self._conn()
+        last = None
+        while True:
+            keyset = ""
+            if last is not None:
+                keyset = (" AND " if where else " WHERE ") + "(d.timestamp, d.id) > (?, ?)"
+            rows = conn.execute(
+                f"""SELECT d.id, d.timestamp, d.model_version, d.prediction, d.probability, d.input, o.label
+                    FROM decisions d LEFT JOIN outcomes o ON o.decision_id = d.id
+                    {where}{keyset}
+                    ORDER BY d.timestamp, d.id LIMIT ?""",
+                params + (list(last) if last is not None else []) + [chunk_size]
+            ).fetchall()
+            if not rows:
+                return
+            last = (rows[-1]["timestamp"], rows[-1]["id"])
+            yield [{**dict(row), "input": json.loads(row["input"])} for row in rows]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+
+    @staticmethod
+    def _where(start: Optional[str], end: Optional[str], filters: Dict[str, Any]):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        for column in FILTER_COLUMNS:
+            value = filters.get(column)
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(int(value) if isinstance(value, bool) else value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start: Optional[str] = None, end: Optional[str] = None, limit: int = 50,
+              cursor: Optional[str] = None, **filters):
+        """
+        Newest-first page of decisions matching a time range and column filters.
+        Pages are keyset-paginated on (timestamp, id) like iter_decisions: pass
+        the previous page's next_cursor to continue, so a deep page costs the
+        same index range scan as the first one.
+        """
+        where, params = self._where(start, end, filters)
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM decisions{where}", params).fetchone()[0]
+        keyset, keys = "", []
+        if cursor:
+            timestamp, _, decision_id = cursor.partition("|")
+            keyset = (" AND " if where else " WHERE ") + "(timestamp, id) < (?, ?)"
+            keys = [timestamp, decision_id]
+        rows = conn.execute(
+            f"SELECT * FROM decisions{where}{keyset} ORDER BY timestamp DESC, id DESC LIMIT ?", params + keys + [limit]
+        ).fetchall()
+        items = []
+        for row in rows:
+            item = dict(row)
+            item["review_required"] = bool(item["review_required"])
+            item["is_ood"] = bool(item["is_ood"])
+            item["input"] = json.loads(item["input"])
+            item["output"] = json.loads(item["output"])
+            items.append(item)
+        next_cursor = f"{rows[-1]['timestamp']}|{rows[-1]['id']}" if len(rows) == limit else None
+        return {"total": total, "limit": limit, "next_cursor": next_cursor, "items": items}
+
+    def aggregate(self, start: Optional[str] = None, end: Optional[str] = None, group_by: str = "model_version", **filters):
+        """Decision counts, denial / review / OOD totals and mean probability per group."""
+        if group_by not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot group by {group_by}; expected one of {FILTER_COLUMNS}")
+        where, params = self._where(start, end, filters)
+        rows = self._conn().execute(
+            f"""SELECT {group_by} AS value, COUNT(*) AS decisions,
+                       SUM(prediction = 'Denied') AS denied,
+                       SUM(review_required) AS review_required,
+                       SUM(is_ood) AS ood,
+                       AVG(probability) AS mean_probability,
+                       MIN(timestamp) AS first_seen, MAX(timestamp) AS last_seen
+                FROM decisions{where} GROUP BY {group_by} ORDER BY decisions DESC""",
+            params
+        ).fetchall()
+        return {"group_by": group_by, "groups": [dict(row) for row in rows]}
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+import logging
+import warnings
+from itertools import combinations
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+FAIRNESS_ARTIFACT = "fairness_audit.json"
+
+# Per-group counts every metric is derived from (approval is the favourable outcome, prediction 0)
+STATS = ["n", "approved", "qualified", "qualified_approved", "false_denials", "false_approvals"]
+
+class FairnessAuditor:
+    """
+    Group-fairness audit over single and intersectional sensitive groups
+    (e.g. gender x age band). Every group reduction is an np.bincount over
+    integer (group, outcome) cell codes, and bootstrap resamples are drawn as
+    multinomial count matrices over those cells, so B resamples of all groups
+    reduce to one matrix product instead of B pandas groupbys.
+
+    Metrics (max - min across groups large enough to compare):
+    - demographic_parity_diff: approval rate gap
+    - equal_opportunity_diff: approval rate gap among applicants who repaid (y = 0)
+    - treatment_equality_diff: gap in false denials / false approvals
+    - disparate_impact: lowest / highest approval rate (80% rule)
+    """
+
+    def __init__(self, config: dict):
+        fairness = config.get('fairness', {})
+        self.sensitive_features = [
+            f for f in config['data'].get('sensitive_features', []) if f != 'person_age'
+        ] + ['person_age_band']
+        self.age_bands = fairness.get('age_bands', [25, 35, 50, 65])
+        self.min_group_size = fairness.get('min_group_size', 30)
+        self.n_bootstrap = fairness.get('n_bootstrap', 2000)
+        self.confidence_level = fairness.get('confidence_level', 0.95)
+        self.di_threshold = config.get('thresholds', {}).get('bias_disparate_impact', 0.8)
+
+    def age_band_labels(self, ages) -> np.ndarray:
+        edges = np.asarray(self.age_bands, dtype=float)
+        labels = np.array(
+            [f"<{self.age_bands[0]}"]
+            + [f"{lo}-{hi - 1}" for lo, hi in zip(self.age_bands[:-1], self.age_bands[1:])]
+            + [f"{self.age_bands[-1]}+"]
+        )
+        return labels[np.searchsorted(edges, np.asarray(ages, dtype=float), side='right')]
+
+    def groupings(self, X: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Label array per grouping: each sensitive feature alone, then every intersection."""
+        columns = {}
+        for feature in self.sensitive_features:
+            if feature == 'person_age_band':
+                if 'person_age' in X.columns:
+                    columns[feature] = self.age_band_labels(X['person_age'])
+            elif feature in X.columns:
+                columns[feature] = X[feature].astype(str).to_numpy()
+            else:
+                logger.warning(f"Sensitive feature {feature} not present; skipped in fairness audit")
+
+        groupings = dict(columns)
+        names = list(columns)
+        for size in range(2, len(names) + 1):
+            for combo in combinations(names, size):
+                labels = columns[combo[0]].astype(object)
+                for name in combo[1:]:
+                    labels = labels + " | " + columns[name].astype(object)
+                groupings[" x ".join(combo)] = labels.astype(str)
+        return groupings
+
+    @staticmethod
+    def _pattern_stats() -> np.ndarray:
+        """STATS contribution of one row for each (qualified, approved) pattern = 2 * qualified + approved."""
+        qualified = np.array([0, 0, 1, 1], dtype=bool)
+        approved = np.array([0, 1, 0, 1], dtype=bool)
+        return np.column_stack([
+            np.ones(4), approved, qualified, qualified & approved,
+            qualified & ~approved, ~qualified & approved
+        ]).astype(float)
+
+    def _metrics(self, stats: np.ndarray, comparable: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        stats has shape (..., n_groups, len(STATS)); metrics reduce over the
+        group axis, so the point estimate and all bootstrap replicates share
+        one code path. `comparable` fixes the compared groups from the observed
+        sample so replicates do not drift in and out of min_group_size.
+        """
+        n, approved, qualified, qual_approved, false_denials, false_approvals = np.moveaxis(stats, -1, 0)
+        # All-NaN slices (no comparable groups in a replicate) are expected, not errors
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            approval = np.where(comparable & (n > 0), approved / n, np.nan)
+            tpr = np.where(comparable & (qualified > 0), qual_approved / qualified, np.nan)
+            treatment = np.where(comparable & (false_approvals > 0), false_denials / false_approvals, np.nan)
+            spread = lambda a: np.nanmax(a, axis=-1) - np.nanmin(a, axis=-1)
+            return {
+                "demographic_parity_diff": spread(approval),
+                "equal_opportunity_diff": spread(tpr),
+                "treatment_equality_diff": spread(treatment),
+                "disparate_impact": np.nanmin(approval, axis=-1) / np.nanmax(approval, axis=-1)
+            }
+
+    def _bootstrap(self, cells: np.ndarray, n_groups: int, comparable: np.ndarray, rng) -> Dict[str, np.ndarray]:
+        """
+        Rows with the same group and outcome pattern are exchangeable, so a
+        row-level resample is exactly a multinomial draw over the occupied
+        (group, pattern) cells. Cost is independent of the number of rows.
+        """
+        counts = np.bincount(cells, minlength=n_groups * 4)
+        occupied = np.flatnonzero(counts)
+        # Cell -> its contribution to every group's STATS: (n_cells, n_groups * len(STATS))
+        design = np.zeros((len(occupied), n_groups, len(STATS)))
+        design[np.arange(len(occupied)), occupied // 4] = self._pattern_stats()[occupied % 4]
+        design = design.reshape(len(occupied), -1)
+
+        n = int(counts.sum())
+        resampled = rng.multinomial(n, counts[occupied] / n, size=self.n_bootstrap).astype(float)
+        return self._metrics((resampled @ design).reshape(self.n_bootstrap, n_groups, len(STATS)), comparable)
+
+    def audit(self, X: pd.DataFrame, y_true, y_prob, threshold: float = 0.5, seed: int = 42) -> Dict:
+        y_true = np.asarray(y_true).astype(int).ravel()
+        y_pred = (np.asarray(y_prob, dtype=float).ravel() > threshold).astype(int)
+        patterns = 2 * (y_true == 0) + (y_pred == 0)
+        rng = np.random.default_rng(seed)
+        tail = (1 - self.confidence_level) / 2
+
+        report = {
+            "n_samples": int(len(y_true)),
+            "threshold": threshold,
+            "n_bootstrap": self.n_bootstrap,
+            "confidence_level": self.confidence_level,
+            "min_group_size": self.min_group_size,
+            "groupings": {}
+        }
+        for name, labels in self.groupings(X).items():
+            groups, codes = np.unique(labels, return_inverse=True)
+            cells = codes * 4 + patterns
+            stats = np.bincount(cells, minlength=len(groups) * 4).reshape(len(groups), 4) @ self._pattern_stats()
+            comparable = stats[:, 0] >= self.min_group_size
+            point = self._metrics(stats, comparable)
+            boot = self._bootstrap(cells, len(groups), comparable, rng)
+
+            metrics = {}
+            for metric, value in point.items():
+                replicates = boot[metric][np.isfinite(boot[metric])]
+                ci = np.quantile(replicates, [tail, 1 - tail]).tolist() if len(replicates) else [None, None]
+                metrics[metric] = {"value": _finite(value), "ci": ci}
+
+            di = metrics["disparate_impact"]
+            report["groupings"][name] = {
+                "groups": [
+                    {
+                        "group": str(group),
+                        "n": int(s[0]),
+                        "approval_rate": _finite(s[1] / s[0]) if s[0] else None,
+                        "equal_opportunity_rate": _finite(s[3] / s[2]) if s[2] else None,
+                        "false_denials": int(s[4]),
+                        "false_approvals": int(s[5]),
+                        "compared": bool(s[0] >= self.min_group_size)
+                    }
+                    for group, s in zip(groups, stats)
+                ],
+                "metrics": metrics,
+                # Flag only when the whole interval sits below the 80% rule
+                "violation": di["ci"][1] is not None and di["ci"][1] < self.di_threshold,
+                "possible_violation": di["value"] is not None and di["value"] < self.di_threshold
+            }
+        report["headline"] = self.headline(report)
+        return report
+
+    @staticmethod
+    def headline(report: Dict) -> Optional[Dict[str, float]]:
+        """Point metrics of the most granular (intersectional) grouping, in the /predict format."""
+        if not report["groupings"]:
+            return None
+        name = max(report["groupings"], key=lambda g: g.count(" x "))
+        metrics = report["groupings"][name]["metrics"]
+        return {
+            "grouping": name,
+            "demographic_parity_diff": metrics["demographic_parity_diff"]["value"],
+            "equal_opportunity_diff": metrics["equal_opportunity_diff"]["value"],
+            "treatment_equality": metrics["treatment_equality_diff"]["value"],
+            "disparate_impact": metrics["disparate_impact"]["value"]
+        }
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return value if np.isfinite(value) else None
@@ -3,20 +3,48 @@ import datetime
 import os
 import uuid
 import logging
+import atexit
+import queue as queue_lib
+import threading
+import time
+from collections import deque
+from queue import Empty
+from src.accountability.audit_store import AuditStore
 
 logger = logging.getLogger(__name__)
 
+TAIL_SIZE = 100
+
 class GovernanceAuditor:
-    def __init__(self, log_path: str = "logs/audit_log.json"):
+    def __init__(self, log_path: str = "logs/audit_log.json", store_path: str = "logs/audit.db", batched: bool = False,
+                 tail_interval_s: float = 1.0):
         self.log_path = log_path
+        self.queue = None
+        self.batched = batched
+        self.tail_interval = tail_interval_s
+        self._writer_thread = None
+        # Recent entries mirrored to the JSON log; loaded lazily by whichever process writes
+        self._tail = None
+        self._tail_dirty = False
+        self._tail_written = 0.0
         os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
         if not os.path.exists(self.log_path):
             with open(self.log_path, 'w') as f:
                 json.dump([], f)
 
-    def log_decision(self, request_data: dict, response_data: dict, model_version: str):
-        """Persists a record of the decision for compliance and debugging."""
-        audit_entry = {
+        is_new_store = not os.path.exists(store_path)
+        self.store = AuditStore(store_path)
+        if is_new_store:
+            # Seed the indexed store with whatever the JSON tail still holds
+            with open(self.log_path, 'r') as f:
+                self.store.insert_many(json.load(f))
+
+    def attach_queue(self, queue):
+        """Routes entries to a shared writer process instead of writing the log directly."""
+        self.queue = queue
+
+    def _build_entry(self, request_data: dict, response_data: dict, model_version: str):
+        return {
             "id": str(uuid.uuid4()),
             "timestamp": datetime.datetime.now().isoformat(),
             "model_version": model_version,
@@ -24,19 +52,164 @@ class GovernanceAuditor:
             "output": {
                 "prediction": response_data.get("prediction"),
                 "probability": response_data.get("probability"),
-                "certainty": response_data.get("confidence_score")
+                "certainty": response_data.get("confidence_score"),
+                "review_required": response_data.get("review_required"),
+                "is_ood": response_data.get("is_ood")
             }
         }
-        
+
+    def log_decision(self, request_data: dict, response_data: dict, model_version: str):
+        """Persists a record of the decision for compliance and debugging."""
+        return self.log_decisions([request_data], [response_data], model_version)[0]
+
+    def log_decisions(self, requests: list, responses: list, model_version: str):
+        """Records a batch of decisions; returns their audit IDs in order."""
+        return self._record([self._build_entry(req, resp, model_version) for req, resp in zip(requests, responses)])
+
+    def log_columns(self, requests: list, columns: dict, model_version: str):
+        """
+        log_decisions for column-form results (e.g. a scored frame): each response field
+        is one list aligned with requests; a missing field is recorded as None.
+        """
+        timestamp = datetime.datetime.now().isoformat()
+        fields = ["prediction", "probability", "confidence_score", "review_required", "is_ood"]
+        outputs = zip(*(columns.get(field, [None] * len(requests)) for field in fields))
+        entries = [
+            {
+                "id": str(uuid.uuid4()),
+                "timestamp": timestamp,
+                "model_version": model_version,
+                "input": request_data,
+                "output": {"prediction": prediction, "probability": probability, "certainty": certainty,
+                           "review_required": review_required, "is_ood": is_ood}
+            }
+            for request_data, (prediction, probability, certainty, review_required, is_ood) in zip(requests, outputs)
+        ]
+        return self._record(entries)
+
+    def _record(self, entries: list):
+        if self.queue is None and self.batched:
+            self._start_writer_thread()
+        if self.queue is not None:
+            for entry in entries:
+                self.queue.put(entry)
+        else:
+            self._write_entries(entries)
+        return [entry['id'] for entry in entries]
+
+    def _start_writer_thread(self):
+        """In-process batched writer; started lazily so a pre-fork master never holds a thread."""
+        self.queue = queue_lib.Queue()
+        self._writer_thread = threading.Thread(target=self.serve_queue, args=(self.queue,), name="audit-writer", daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """Flushes and stops the in-process writer thread, if one is running."""
+        if self._writer_thread is not None:
+            self.queue.put(None)
+            self._writer_thread.join(timeout=10)
+            self._writer_thread = None
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Blocks until every entry this process has queued is committed; False on timeout.
+        Only the in-process writer can be waited on: entries handed to a shared writer
+        process are not covered (see record_outcomes).
+        """
+        if self._writer_thread is None:
+            return self.queue is None
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def record_outcomes(self, outcomes: dict, wait_s: float = 1.0) -> list:
+        """
+        AuditStore.record_outcomes, tolerating decisions that are still queued for the
+        writer: an ID returned by log_decisions moments ago is not reported as unknown.
+        """
+        unknown = self.store.record_outcomes(outcomes)
+        if not unknown or self.queue is None:
+            return unknown
+        if self._writer_thread is not None:
+            self.flush(wait_s)
+            return self.store.record_outcomes({decision_id: outcomes[decision_id] for decision_id in unknown})
+        # Shared writer process: give its current batch time to land
+        deadline = time.monotonic() + wait_s
+        while unknown and time.monotonic() < deadline:
+            time.sleep(0.05)
+            unknown = self.store.record_outcomes({decision_id: outcomes[decision_id] for decision_id in unknown})
+        return unknown
+
+    def _write_entries(self, entries: list, write_tail: bool = True):
         try:
-            with open(self.log_path, 'r+') as f:
-                logs = json.load(f)
-                logs.append(audit_entry)
-                f.seek(0)
-                json.dump(logs[-100:], f, indent=2) # Keep last 100 for performance
-            logger.info(f"Audit entry created: {audit_entry['id']}")
+            self.store.insert_many(entries)
+        except Exception as e:
+            logger.error(f"Failed to write audit store: {e}")
+        if self._tail is None:
+            self._tail = deque(maxlen=TAIL_SIZE)
+            try:
+                with open(self.log_path, 'r') as f:
+                    self._tail.extend(json.load(f))
+            except Exception as e:
+                logger.error(f"Failed to read audit log: {e}")
+        self._tail.extend(entries)
+        self._tail_dirty = True
+        for entry in entries:
+            logger.info(f"Audit entry created: {entry['id']}")
+        if write_tail:
+            self._write_tail()
+
+    def _write_tail(self):
+        """Replaces the JSON log with the last TAIL_SIZE entries (kept for performance)."""
+        try:
+            tmp = self.log_path + ".tmp"
+            with open(tmp, 'w') as f:
+                json.dump(list(self._tail), f, indent=2)
+            os.replace(tmp, self.log_path)
         except Exception as e:
             logger.error(f"Failed to write audit log: {e}")
+        self._tail_dirty = False
+        self._tail_written = time.monotonic()
+
+    def serve_queue(self, queue, max_batch: int = 256):
+        """
+        Single-writer loop (in-process thread or the pre-fork writer process). Drains
+        whatever is queued into one store transaction per batch; the JSON tail is
+        rewritten at most once per tail_interval. A threading.Event marker is set once
+        everything queued before it is committed; a None sentinel flushes and stops the loop.
+        """
+        while True:
+            try:
+                entry = queue.get(timeout=self.tail_interval if self._tail_dirty else None)
+            except Empty:
+                self._write_tail()
+                continue
+            batch = []
+            while True:
+                if entry is None:
+                    if batch:
+                        self._write_entries(batch, write_tail=False)
+                    if self._tail_dirty:
+                        self._write_tail()
+                    return
+                if isinstance(entry, threading.Event):
+                    if batch:
+                        self._write_entries(batch, write_tail=False)
+                        batch = []
+                    entry.set()
+                else:
+                    batch.append(entry)
+                if len(batch) >= max_batch:
+                    break
+                try:
+                    entry = queue.get_nowait()
+                except Empty:
+                    break
+            if batch:
+                self._write_entries(batch, write_tail=False)
+            if self._tail_dirty and time.monotonic() - self._tail_written >= self.tail_interval:
+                self._write_tail()
 
     def get_version_changelog(self):
         """Returns dummy changelog for demonstration."""
@@ -0,0 +1,249 @@
+import argparse
+import itertools
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.neural_network import MLPClassifier
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.registry import ModelRegistry
+from src.modeling.calibration import ProbabilityCalibrator, CALIBRATION_ARTIFACT, DECISION_THRESHOLD, served_probability
+from src.modeling.mlp_scorer import CompiledMLP, MLP_FORWARD_ARTIFACT
+from src.accountability.fairness_audit import FairnessAuditor
+
+logger = logging.getLogger(__name__)
+
+# Raw inputs a scenario may shock; engineered ratios are always recomputed from them
+SHOCKABLE = ["person_income", "loan_amnt", "loan_int_rate", "person_emp_length", "person_age", "cb_person_cred_hist_length"]
+DERIVED = ["loan_percent_income", "loan_to_income", "stability_index"]
+
+class PortfolioStressTester:
+    """
+    Re-scores a whole loan book under macro scenarios (income -15%, rates
+    +3 points, loan amounts scaled for one segment, ...).
+
+    The book is engineered once into a shared float matrix. A scenario copies
+    it, applies its shocks as vectorized column transforms (optionally masked
+    to a segment), recomputes the engineered ratios with FeatureEngineer and
+    scores in batches. Scenarios run concurrently on a thread pool (model
+    scoring releases the GIL), and each one is summarised per segment with
+    np.bincount: approval rate, expected default rate and expected default
+    amount of the approved book, plus approval-based fairness (demographic
+    parity gap and disparate impact), all as deltas against the baseline.
+    """
+
+    def __init__(self, config: Dict[str, Any], book: pd.DataFrame, engineer: Optional[FeatureEngineer] = None):
+        self.config = config
+        self.settings = config.get('stress', {})
+        self.engineer = engineer or FeatureEngineer(config)
+        if not self.engineer.encoders and not self.engineer.load_artifacts():
+            raise RuntimeError("Feature encoders are not persisted; run eda_runner first")
+        self.registry = ModelRegistry()
+        self.batch_size = self.settings.get('batch_size', 100000)
+
+        # A supplied loan_percent_income (rounded in the raw data) is dropped so the baseline is engineered
+        # exactly like every scenario, which recomputes it from the shocked inputs
+        base = self.engineer.process_pipeline(book.drop(columns=['loan_percent_income'], errors='ignore'))
+        self.feature_names = list(base.columns)
+        self.columns = {name: i for i, name in enumerate(self.feature_names)}
+        # Read-only and shared by every scenario thread
+        self.base_matrix = base.to_numpy(dtype=np.float64)
+        self.base_matrix.flags.writeable = False
+        self.n = len(base)
+
+        self.auditor = FairnessAuditor(config)
+        raw = book.reset_index(drop=True)
+        self.raw_labels = {col: raw[col].astype(str).to_numpy() for col in raw.columns if not pd.api.types.is_numeric_dtype(raw[col])}
+        self.segments = self._codes({
+            name: self.auditor.age_band_labels(raw['person_age']) if name == 'person_age_band' else self.raw_labels[name]
+            for name in self.settings.get('segments', ["loan_grade", "loan_intent", "person_home_ownership", "person_age_band"])
+        })
+        self.fairness_groups = self._codes(self.auditor.groupings(raw))
+
+    @staticmethod
+    def _codes(labels: Dict[str, np.ndarray]):
+        """Label arrays -> (group names, integer codes) for bincount reductions."""
+        return {name: np.unique(values, return_inverse=True) for name, values in labels.items()}
+
+    @staticmethod
+    def grid(axes: Dict[str, Dict[str, List[float]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Cartesian scenario grid, e.g. {"person_income": {"scale": [0.95, 0.85]},
+        "loan_int_rate": {"shift": [0, 3]}} -> four scenarios.
+        """
+        options = [
+            [(feature, op, value) for value in values]
+            for feature, ops in axes.items() for op, values in ops.items()
+        ]
+        scenarios = {}
+        for combo in itertools.product(*options):
+            name = ", ".join(f"{feature} {'x' if op == 'scale' else '+'}{value:g}" for feature, op, value in combo)
+            scenarios[name] = [{"feature": feature, op: value} for feature, op, value in combo]
+        return scenarios
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        mask = np.ones(self.n, dtype=bool)
+        for column, values in where.items():
+            if column not in self.raw_labels:
+                raise ValueError(f"Segment filter on unknown categorical column {column}")
+            mask &= np.isin(self.raw_labels[column], np.atleast_1d(values).astype(str))
+        return mask
+
+    def apply(self, shocks: List[Dict[str, Any]]) -> np.ndarray:
+        """Shocked copy of the engineered book with ratios recomputed from the shocked inputs."""
+        X = self.base_matrix.copy()
+        for shock in shocks:
+            feature = shock['feature']
+            if feature not in SHOCKABLE:
+                raise ValueError(f"{feature} cannot be shocked; choose from {SHOCKABLE}")
+            col = X[:, self.columns[feature]]
+            shocked = col * shock.get('scale', 1.0) + shock.get('shift', 0.0)
+            shocked = np.clip(shocked, shock.get('min', 0.0), shock.get('max', np.inf))
+            mask = self._mask(shock.get('where'))
+            X[:, self.columns[feature]] = shocked if mask is None else np.where(mask, shocked, col)
+
+        # Same formulas as inference; loan_percent_income is left out so it is recomputed too
+        inputs = pd.DataFrame({c: X[:, self.columns[c]] for c in ["loan_amnt", "person_income", "person_emp_length", "person_age"]})
+        derived = self.engineer.calculate_interactions(inputs)
+        for name in DERIVED:
+            X[:, self.columns[name]] = derived[name].to_numpy()
+        return X
+
+    def load_model(self, model_name: str):
+        model = self.registry.load_latest(model_name)
+        if model is None:
+            raise ValueError(f"No registered model named {model_name}")
+        if isinstance(model, MLPClassifier):
+            payload = self.registry.load_artifact(model_name, MLP_FORWARD_ARTIFACT)
+            if payload is not None:
+                model = CompiledMLP.from_dict(payload, estimator=model)
+        calibration = self.registry.load_artifact(model_name, CALIBRATION_ARTIFACT)
+        calibrator = ProbabilityCalibrator.from_dict(calibration) if calibration else None
+        return model, calibrator
+
+    def score(self, model, X: np.ndarray) -> np.ndarray:
+        order = [self.columns[f] for f in getattr(model, "feature_names_in_", self.feature_names)]
+        X = X[:, order] if order != list(range(len(order))) else X
+        prob = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.batch_size):
+            prob[start:start + self.batch_size] = model.predict_proba(X[start:start + self.batch_size])[:, 1]
+        return prob
+
+    def summarize(self, default_prob: np.ndarray, loan_amnt: np.ndarray) -> Dict[str, Any]:
+        """Portfolio, per-segment and fairness figures of one scored book (served probabilities)."""
+        # Same verdict rule as the API: approved while the served default probability is at most the threshold
+        approved = (default_prob <= DECISION_THRESHOLD).astype(float)
+        # Expected defaults are counted on the approved book only: denied loans carry no exposure
+        weights = np.column_stack([np.ones(self.n), approved, approved * default_prob, approved * default_prob * loan_amnt])
+
+        def figures(totals):
+            n, n_approved, exp_defaults, exp_amount = totals
+            return {
+                "n": int(n),
+                "approval_rate": n_approved / n if n else None,
+                "expected_default_rate": exp_defaults / n_approved if n_approved else None,
+                "expected_default_amount": exp_amount
+            }
+
+        def by_group(codes, n_groups):
+            return np.stack([np.bincount(codes, weights=w, minlength=n_groups) for w in weights.T], axis=1)
+
+        segments = {}
+        for name, (groups, codes) in self.segments.items():
+            totals = by_group(codes, len(groups))
+            segments[name] = {str(g): figures(t) for g, t in zip(groups, totals)}
+
+        fairness = {}
+        for name, (groups, codes) in self.fairness_groups.items():
+            totals = by_group(codes, len(groups))
+            comparable = totals[:, 0] >= self.auditor.min_group_size
+            rates = totals[comparable, 1] / totals[comparable, 0]
+            fairness[name] = {
+                "demographic_parity_diff": float(rates.max() - rates.min()) if len(rates) else None,
+                "disparate_impact": float(rates.min() / rates.max()) if len(rates) and rates.max() > 0 else None
+            }
+        return {"portfolio": figures(weights.sum(axis=0)), "segments": segments, "fairness": fairness}
+
+    @staticmethod
+    def _delta(scenario, baseline):
+        """Scenario minus baseline for every numeric leaf (None where either side is undefined)."""
+        if isinstance(scenario, dict):
+            return {k: PortfolioStressTester._delta(v, baseline.get(k) if baseline else None) for k, v in scenario.items() if k != "n"}
+        if scenario is None or baseline is None:
+            return None
+        return scenario - baseline
+
+    def run(self, model_name: str = "xgboost", scenarios: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+            max_workers: Optional[int] = None) -> Dict[str, Any]:
+        if scenarios is None:
+            scenarios = dict(self.settings.get('scenarios', {}))
+            if self.settings.get('grid'):
+                scenarios.update(self.grid(self.settings['grid']))
+        model, calibrator = self.load_model(model_name)
+        loan_amnt = self.base_matrix[:, self.columns['loan_amnt']]
+
+        def evaluate(X):
+            default_prob = served_probability(self.score(model, X), calibrator)
+            return self.summarize(default_prob, X[:, self.columns['loan_amnt']])
+
+        started = time.perf_counter()
+        baseline = evaluate(self.base_matrix)
+
+        def run_scenario(item):
+            name, shocks = item
+            t0 = time.perf_counter()
+            result = evaluate(self.apply(shocks))
+            return name, {
+                "shocks": shocks,
+                **result,
+                "delta": self._delta({k: result[k] for k in ("portfolio", "segments", "fairness")}, baseline),
+                "elapsed_ms": (time.perf_counter() - t0) * 1000.0
+            }
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.settings.get('max_workers', 4)) as pool:
+            results = dict(pool.map(run_scenario, scenarios.items()))
+        logger.info(f"Stress test: {len(results)} scenarios over {self.n} loans in {time.perf_counter() - started:.2f}s")
+        return {
+            "model_name": model_name,
+            "model_version": self.registry.get_latest_dir(model_name),
+            "n_loans": self.n,
+            "calibrated": calibrator is not None,
+            "exposure": float(loan_amnt.sum()),
+            "baseline": baseline,
+            "scenarios": results,
+            "elapsed_s": time.perf_counter() - started
+        }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with open("config/config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    parser = argparse.ArgumentParser(description="Portfolio stress test under macro scenarios")
+    parser.add_argument("--book", default=config['data']['raw_path'], help="CSV of raw applications")
+    parser.add_argument("--model", default="xgboost")
+    parser.add_argument("--output", default=None, help="write the full report as JSON")
+    args = parser.parse_args()
+
+    tester = PortfolioStressTester(config, pd.read_csv(args.book))
+    report = tester.run(args.model)
+    base = report['baseline']['portfolio']
+    print(f"\n--- Portfolio Stress Test ({report['model_version']}, {report['n_loans']} loans, {report['elapsed_s']:.2f}s) ---")
+    print(f"Baseline: approval {base['approval_rate']:.2%}, expected default {base['expected_default_rate']:.2%}")
+    for name, result in report['scenarios'].items():
+        delta = result['delta']['portfolio']
+        worst = min(
+            ((seg, value, d['approval_rate']) for seg, values in result['delta']['segments'].items()
+             for value, d in values.items() if d['approval_rate'] is not None),
+            key=lambda item: item[2], default=None
+        )
+        print(f"{name}: approval {delta['approval_rate']:+.2%}, expected default {delta['expected_default_rate']:+.2%}"
+              + (f", hardest hit {worst[0]}={worst[1]} ({worst[2]:+.2%})" if worst else ""))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4, default=float)
@@ -24,6 +24,7 @@ def run_data_audit():
     # Run Engineering Pipeline
     logger.info("--- RUNNING FEATURE ENGINEERING ---")
     df_processed = engineer.process_pipeline(df_raw, is_training=True)
+    engineer.save_artifacts()
     
     # Save statistics for the UI/Evaluation
     audit_results = {
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 import logging
+import joblib
+import os
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from typing import Dict, Any, List
 
@@ -52,24 +54,46 @@ class FeatureEngineer:
         
         return df_feat
 
-    def encode_categorical(self, df: pd.DataFrame) -> pd.DataFrame:
+    def encode_categorical(self, df: pd.DataFrame, fit: bool = True) -> pd.DataFrame:
         """
         Converts strings to numerical for tree-based models using Label Encoding.
+        With fit=False the encoders fitted at training time are reused, so codes
+        do not depend on which rows happen to be in the frame.
         """
         df_encoded = df.copy()
         for col in self.config['data']['categorical_features']:
-            le = LabelEncoder()
             # Ensure the column exists before encoding
-            if col in df_encoded.columns:
+            if col not in df_encoded.columns:
+                continue
+            if fit or col not in self.encoders:
+                le = LabelEncoder()
                 df_encoded[col] = le.fit_transform(df_encoded[col].astype(str))
                 self.encoders[col] = le
+            else:
+                # Unseen categories map to -1 instead of failing the request
+                mapping = {c: i for i, c in enumerate(self.encoders[col].classes_)}
+                df_encoded[col] = df_encoded[col].astype(str).map(mapping).fillna(-1).astype(int)
         return df_encoded
 
+    def save_artifacts(self, path: str = "models/feature_encoders.joblib"):
+        """Persists fitted encoders so inference reuses the training-time vocabulary."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self.encoders, path)
+        logger.info(f"Saved preprocessing artifacts to {path}")
+
+    def load_artifacts(self, path: str = "models/feature_encoders.joblib") -> bool:
+        """Loads fitted encoders; returns False when none were persisted yet."""
+        if not os.path.exists(path):
+            return False
+        self.encoders = joblib.load(path)
+        logger.info(f"Loaded preprocessing artifacts from {path}")
+        return True
+
     def process_pipeline(self, df: pd.DataFrame, is_training: bool = False) -> pd.DataFrame:
         """Unified pipeline for the data science layer."""
         df_clean = self.clean_data(df)
         df_feat = self.calculate_interactions(df_clean)
-        df_final = self.encode_categorical(df_feat)
+        df_final = self.encode_categorical(df_feat, fit=is_training)
         
         # Define the exact features used in training (excluding sensitive attributes and target)
         # Numerical (7) + Categorical (4) + Interactions (2) = 13 Features Total
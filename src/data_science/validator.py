@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
@@ -29,26 +29,43 @@ class DataValidator:
         joblib.dump(self.iso_forest, "models/ood_detector.joblib")
         joblib.dump(self.train_baseline, "models/train_baseline.joblib")
 
+    def load_ood_detector(self) -> bool:
+        """Loads the persisted OOD detector, if one was fitted."""
+        if self.iso_forest is None and os.path.exists("models/ood_detector.joblib"):
+            self.iso_forest = joblib.load("models/ood_detector.joblib")
+            self.train_baseline = joblib.load("models/train_baseline.joblib")
+        return self.iso_forest is not None
+
     def check_ood(self, instance_df: pd.DataFrame) -> Dict[str, Any]:
         """Checks if a live instance is OOD based on isolation forest score."""
-        if self.iso_forest is None:
-            if os.path.exists("models/ood_detector.joblib"):
-                self.iso_forest = joblib.load("models/ood_detector.joblib")
-                self.train_baseline = joblib.load("models/train_baseline.joblib")
-            else:
-                return {"is_ood": False, "similarity_score": 1.0}
+        return self.check_ood_batch(instance_df)[0]
+
+    def check_ood_batch(self, batch_df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Scores every row with one isolation forest call; one result per row."""
+        scores, similarities = self.ood_scores(batch_df)
+        if scores is None:
+            return [{"is_ood": False, "similarity_score": 1.0} for _ in range(len(batch_df))]
+        
+        return [
+            {
+                "is_ood": bool(score < -0.1), # Threshold for OOD
+                "similarity_score": round(float(similarity), 3),
+                "warning": "Input profile significantly differs from training data" if score < -0.1 else None
+            }
+            for score, similarity in zip(scores, similarities)
+        ]
+
+    def ood_scores(self, batch_df: pd.DataFrame):
+        """Raw isolation forest scores and similarity indices as arrays (None when no detector)."""
+        if not self.load_ood_detector():
+            return None, None
 
         features = self.config['data']['numerical_features']
-        score = self.iso_forest.decision_function(instance_df[features])[0]
+        scores = self.iso_forest.decision_function(batch_df[features])
         # Map score to a "Similarity Index" (0 to 1)
         # Isolation Forest decision_function returns values in roughly [-0.5, 0.5]
-        similarity = 1 / (1 + np.exp(-5 * score)) 
-        
-        return {
-            "is_ood": bool(score < -0.1), # Threshold for OOD
-            "similarity_score": round(float(similarity), 3),
-            "warning": "Input profile significantly differs from training data" if score < -0.1 else None
-        }
+        similarities = 1 / (1 + np.exp(-5 * scores))
+        return scores, similarities
 
     def validate_schema(self, df: pd.DataFrame) -> bool:
         """Checks if all required columns exist."""
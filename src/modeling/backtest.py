@@ -0,0 +1,275 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import numpy as np
+import pandas as pd
+import yaml
+from sklearn.metrics import roc_auc_score, brier_score_loss
+from sklearn.neural_network import MLPClassifier
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.registry import ModelRegistry
+from src.modeling.mlp_scorer import CompiledMLP, MLP_FORWARD_ARTIFACT
+from src.modeling.calibration import ProbabilityCalibrator, CALIBRATION_ARTIFACT, DECISION_THRESHOLD, served_probability
+from src.accountability.audit_store import AuditStore
+from src.accountability.fairness_audit import FairnessAuditor
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_ARTIFACT = "backtest.json"
+# Request options logged with the input that are not applicant features
+META_FIELDS = ["model_choice", "tone"]
+SHIFT_BINS = np.linspace(-1.0, 1.0, 41)
+PROB_BINS = np.linspace(0.0, 1.0, 21)
+# Per-group running totals; every reported rate is a ratio of two of these
+STATS = [
+    "n", "approved_current", "approved_candidate", "flipped_to_denied", "flipped_to_approved",
+    "shift_sum", "abs_shift_sum", "repaid", "repaid_approved_current", "repaid_approved_candidate"
+]
+
+class BacktestReplay:
+    """
+    Replays logged decisions from the audit store against the served version
+    and a candidate version before promotion.
+
+    History is streamed oldest-first in keyset-paginated chunks (the next chunk
+    is fetched and parsed on a background thread while the current one is
+    scored). Each chunk is engineered once and scored by both versions in one
+    call each, as served (calibrated) probabilities and verdicts. Only
+    fixed-size accumulators are kept: decision flips, probability and shift
+    histograms, per-group STATS for every segment and fairness grouping, plus
+    scores of labelled decisions for AUC / Brier. Memory therefore stays flat
+    however many months are replayed.
+    """
+
+    def __init__(self, config: Dict[str, Any], candidate_dir: str, current_dir: Optional[str] = None,
+                 store_path: str = "logs/audit.db"):
+        self.config = config
+        self.settings = config.get('backtest', {})
+        self.registry = ModelRegistry()
+        with open(os.path.join(candidate_dir, "metadata.json")) as f:
+            self.model_name = json.load(f)['model_name']
+        self.candidate_dir = candidate_dir
+        self.current_dir = current_dir or self.registry.get_latest_dir(self.model_name)
+        if self.current_dir is None:
+            raise ValueError(f"No served version of {self.model_name} to compare against")
+        self.current, self.current_calibrator = self._load(self.current_dir)
+        self.candidate, self.candidate_calibrator = self._load(candidate_dir)
+
+        self.engineer = FeatureEngineer(config)
+        if not self.engineer.load_artifacts():
+            raise RuntimeError("Feature encoders are not persisted; run eda_runner first")
+        self.store = AuditStore(store_path)
+        self.auditor = FairnessAuditor(config)
+        self.segments = self.settings.get('segments', ["loan_grade", "loan_intent", "person_age_band", "model_version"])
+        self.chunk_size = self.settings.get('chunk_size', 20000)
+
+    def _load(self, model_dir: str):
+        model = self.registry.load_version(model_dir)
+        if model is None:
+            raise ValueError(f"No model stored in {model_dir}")
+        if isinstance(model, MLPClassifier):
+            payload = self.registry.load_artifact(self.model_name, MLP_FORWARD_ARTIFACT, model_dir=model_dir)
+            if payload is not None:
+                model = CompiledMLP.from_dict(payload, estimator=model)
+        # Each version is replayed with its own calibration map, as it would be served
+        calibration = self.registry.load_artifact(self.model_name, CALIBRATION_ARTIFACT, model_dir=model_dir)
+        return model, ProbabilityCalibrator.from_dict(calibration) if calibration else None
+
+    @staticmethod
+    def _accumulate(totals: Dict[str, np.ndarray], labels: np.ndarray, values: np.ndarray):
+        """Adds per-row STATS (n x len(STATS)) into totals keyed by group label."""
+        groups, codes = np.unique(labels, return_inverse=True)
+        sums = np.stack([np.bincount(codes, weights=col, minlength=len(groups)) for col in values.T], axis=1)
+        for group, row in zip(groups, sums):
+            key = str(group)
+            if key in totals:
+                totals[key] += row
+            else:
+                totals[key] = row
+
+    def _labels(self, frame: pd.DataFrame, chunk) -> Dict[str, np.ndarray]:
+        labels = {}
+        for name in self.segments:
+            if name == 'person_age_band':
+                labels[name] = self.auditor.age_band_labels(frame['person_age'])
+            elif name == 'model_version':
+                labels[name] = np.array([str(row['model_version']) for row in chunk])
+            elif name in frame.columns:
+                labels[name] = frame[name].astype(str).to_numpy()
+        return labels
+
+    def run(self, start: Optional[str] = None, end: Optional[str] = None, **filters) -> Dict[str, Any]:
+        started = time.perf_counter()
+        current_version = os.path.basename(self.current_dir)
+        n_total = 0
+        shift_hist = np.zeros(len(SHIFT_BINS) - 1, dtype=np.int64)
+        prob_hist = {"current": np.zeros(len(PROB_BINS) - 1, dtype=np.int64), "candidate": np.zeros(len(PROB_BINS) - 1, dtype=np.int64)}
+        transitions = np.zeros((2, 2), dtype=np.int64)  # [current denied][candidate denied]
+        segments = {name: {} for name in self.segments}
+        fairness = {}
+        consistency = np.zeros(2, dtype=np.int64)  # [replayed under the served version, verdict matched log]
+        labelled = {"y": [], "current": [], "candidate": []}
+
+        chunks = self.store.iter_decisions(start=start, end=end, chunk_size=self.chunk_size, **filters)
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            pending = prefetch.submit(next, chunks, None)
+            while True:
+                chunk = pending.result()
+                if chunk is None:
+                    break
+                pending = prefetch.submit(next, chunks, None)
+
+                frame = pd.DataFrame([row['input'] for row in chunk]).drop(columns=META_FIELDS, errors='ignore')
+                X = self.engineer.process_pipeline(frame)
+                p_cur = served_probability(self.current.predict_proba(X)[:, 1].astype(np.float64), self.current_calibrator)
+                p_cand = served_probability(self.candidate.predict_proba(X)[:, 1].astype(np.float64), self.candidate_calibrator)
+                denied_cur, denied_cand = p_cur > DECISION_THRESHOLD, p_cand > DECISION_THRESHOLD
+                shift = p_cand - p_cur
+                n_total += len(chunk)
+
+                np.add.at(transitions, (denied_cur.astype(int), denied_cand.astype(int)), 1)
+                shift_hist += np.histogram(np.clip(shift, -1.0, 1.0), bins=SHIFT_BINS)[0]
+                prob_hist["current"] += np.histogram(p_cur, bins=PROB_BINS)[0]
+                prob_hist["candidate"] += np.histogram(p_cand, bins=PROB_BINS)[0]
+
+                label = np.array([row['label'] if row['label'] is not None else -1 for row in chunk])
+                repaid = label == 0
+                values = np.column_stack([
+                    np.ones(len(chunk)), ~denied_cur, ~denied_cand, ~denied_cur & denied_cand, denied_cur & ~denied_cand,
+                    shift, np.abs(shift), repaid, repaid & ~denied_cur, repaid & ~denied_cand
+                ]).astype(np.float64)
+                for name, labels in self._labels(frame, chunk).items():
+                    self._accumulate(segments[name], labels, values)
+                for name, labels in self.auditor.groupings(frame).items():
+                    self._accumulate(fairness.setdefault(name, {}), labels, values)
+
+                served = np.array([row['model_version'] == current_version for row in chunk])
+                logged_denied = np.array([row['prediction'] == "Denied" for row in chunk])
+                consistency += [served.sum(), (served & (logged_denied == denied_cur)).sum()]
+
+                known = label >= 0
+                labelled["y"].append(label[known])
+                labelled["current"].append(p_cur[known])
+                labelled["candidate"].append(p_cand[known])
+
+        report = {
+            "model_name": self.model_name,
+            "current_version": self.current_dir,
+            "candidate_version": self.candidate_dir,
+            "window": {"start": start, "end": end, "filters": {k: v for k, v in filters.items() if v is not None}},
+            "n_decisions": int(n_total),
+            "flips": self._flips(transitions, n_total),
+            "probability_shift": {
+                "bins": SHIFT_BINS.tolist(),
+                "counts": shift_hist.tolist()
+            },
+            "probability_histograms": {
+                "bins": PROB_BINS.tolist(),
+                "current": prob_hist["current"].tolist(),
+                "candidate": prob_hist["candidate"].tolist()
+            },
+            "segments": {name: {g: self._segment(t) for g, t in sorted(groups.items())} for name, groups in segments.items()},
+            "fairness": {name: self._fairness(groups) for name, groups in fairness.items()},
+            "labelled_performance": self._performance(labelled),
+            # Served-version rows should replay to the logged verdict; a gap means input drift in the pipeline
+            "replay_consistency": {
+                "served_version_decisions": int(consistency[0]),
+                "verdict_match_rate": float(consistency[1] / consistency[0]) if consistency[0] else None
+            },
+            "elapsed_s": time.perf_counter() - started
+        }
+        report["decisions_per_s"] = n_total / report["elapsed_s"] if report["elapsed_s"] > 0 else None
+        return report
+
+    @staticmethod
+    def _flips(transitions: np.ndarray, n: int) -> Dict[str, Any]:
+        to_denied, to_approved = int(transitions[0, 1]), int(transitions[1, 0])
+        return {
+            "flip_rate": (to_denied + to_approved) / n if n else None,
+            "approved_to_denied": to_denied,
+            "denied_to_approved": to_approved,
+            "approval_rate_current": float(transitions[0].sum() / n) if n else None,
+            "approval_rate_candidate": float(transitions[:, 0].sum() / n) if n else None
+        }
+
+    @staticmethod
+    def _segment(totals: np.ndarray) -> Dict[str, Any]:
+        t = dict(zip(STATS, totals))
+        n = t["n"]
+        return {
+            "n": int(n),
+            "approval_rate_current": t["approved_current"] / n,
+            "approval_rate_candidate": t["approved_candidate"] / n,
+            "approval_rate_delta": (t["approved_candidate"] - t["approved_current"]) / n,
+            "flip_rate": (t["flipped_to_denied"] + t["flipped_to_approved"]) / n,
+            "mean_shift": t["shift_sum"] / n,
+            "mean_abs_shift": t["abs_shift_sum"] / n
+        }
+
+    def _fairness(self, groups: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Approval-rate gap, disparate impact and (labelled) equal-opportunity gap, current vs candidate."""
+        totals = np.array(list(groups.values()))
+        comparable = totals[:, STATS.index("n")] >= self.auditor.min_group_size
+        result = {"groups_compared": int(comparable.sum())}
+        for version in ("current", "candidate"):
+            approval = totals[comparable, STATS.index(f"approved_{version}")] / totals[comparable, STATS.index("n")]
+            repaid = totals[comparable, STATS.index("repaid")]
+            tpr = totals[comparable, STATS.index(f"repaid_approved_{version}")][repaid > 0] / repaid[repaid > 0]
+            result[version] = {
+                "demographic_parity_diff": float(approval.max() - approval.min()) if len(approval) else None,
+                "disparate_impact": float(approval.min() / approval.max()) if len(approval) and approval.max() > 0 else None,
+                "equal_opportunity_diff": float(tpr.max() - tpr.min()) if len(tpr) > 1 else None
+            }
+        result["delta"] = {
+            metric: result["candidate"][metric] - result["current"][metric]
+            if result["candidate"][metric] is not None and result["current"][metric] is not None else None
+            for metric in result["current"]
+        }
+        return result
+
+    @staticmethod
+    def _performance(labelled: Dict[str, list]) -> Dict[str, Any]:
+        y = np.concatenate(labelled["y"]) if labelled["y"] else np.empty(0)
+        result = {"n_labelled": int(len(y))}
+        if len(np.unique(y)) < 2:
+            return result
+        for version in ("current", "candidate"):
+            prob = np.concatenate(labelled[version])
+            result[version] = {"auc_roc": float(roc_auc_score(y, prob)), "brier_score": float(brier_score_loss(y, prob))}
+        return result
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("src.data_science.engineer").setLevel(logging.WARNING)
+    with open("config/config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    parser = argparse.ArgumentParser(description="Replay logged decisions against a candidate model version")
+    parser.add_argument("candidate", help="candidate version directory, e.g. models/xgboost_20251223_205231")
+    parser.add_argument("--current", default=None, help="version to compare against (default: the served latest)")
+    parser.add_argument("--start", default=None, help="ISO-8601 start of the replay window")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--model-version", default=None, help="only replay decisions logged under this version")
+    parser.add_argument("--store", default="logs/audit.db")
+    parser.add_argument("--save", action="store_true", help=f"store the report as {BACKTEST_ARTIFACT} next to the candidate")
+    args = parser.parse_args()
+
+    replay = BacktestReplay(config, args.candidate, args.current, args.store)
+    report = replay.run(start=args.start, end=args.end, model_version=args.model_version)
+    flips = report['flips']
+    print(f"\n--- Backtest: {report['candidate_version']} vs {report['current_version']} ---")
+    print(f"Decisions replayed: {report['n_decisions']} in {report['elapsed_s']:.1f}s")
+    if report['n_decisions']:
+        print(f"Flip rate: {flips['flip_rate']:.2%} ({flips['approved_to_denied']} approved->denied, {flips['denied_to_approved']} denied->approved)")
+        print(f"Approval rate: {flips['approval_rate_current']:.2%} -> {flips['approval_rate_candidate']:.2%}")
+        for name, result in report['fairness'].items():
+            di = result['delta']['disparate_impact']
+            print(f"Fairness {name}: disparate impact delta {di:+.4f}" if di is not None else f"Fairness {name}: not comparable")
+        if 'candidate' in report['labelled_performance']:
+            perf = report['labelled_performance']
+            print(f"Labelled AUC: {perf['current']['auc_roc']:.4f} -> {perf['candidate']['auc_roc']:.4f} ({perf['n_labelled']} outcomes)")
+    if args.save:
+        replay.registry.save_artifact(args.candidate, BACKTEST_ARTIFACT, report)
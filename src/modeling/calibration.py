@@ -0,0 +1,96 @@
+import numpy as np
+import logging
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss
+from sklearn.model_selection import StratifiedKFold
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_ARTIFACT = "calibration_map.json"
+
+# Denied when the served default probability exceeds this, so the verdict always agrees with the displayed number
+DECISION_THRESHOLD = 0.5
+
+def served_probability(raw_probs, calibrator=None):
+    """Default probability shown to users: calibrated, or raw clamped to [0.01, 0.99] for versions without a map."""
+    if calibrator is not None:
+        return calibrator.transform(raw_probs)
+    return np.clip(raw_probs, 0.01, 0.99)
+
+class ProbabilityCalibrator:
+    """
+    Post-hoc probability calibration compiled into a monotone lookup table.
+    Isotonic and Platt maps are both fitted on the held-out split; the one with
+    the lower cross-fitted Brier score is served through np.interp, so a
+    single row and a whole batch cost the same vectorized lookup.
+    """
+
+    def __init__(self, method: str, x: list, y: list, brier_score: float, candidates: dict = None):
+        self.method = method
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.brier_score = brier_score
+        self.candidates = candidates or {}
+
+    @staticmethod
+    def _fit_isotonic(y_true, y_prob):
+        iso = IsotonicRegression(out_of_bounds="clip", y_min=0.0, y_max=1.0)
+        iso.fit(y_prob, y_true)
+        return iso.X_thresholds_, iso.y_thresholds_
+
+    @staticmethod
+    def _fit_platt(y_true, y_prob, grid_size: int = 129):
+        eps = 1e-6
+        logit = lambda p: np.log(np.clip(p, eps, 1 - eps) / (1 - np.clip(p, eps, 1 - eps)))
+        lr = LogisticRegression()
+        lr.fit(logit(y_prob).reshape(-1, 1), y_true)
+        # Knots are dense where the scores actually are, plus a uniform backbone
+        grid = np.unique(np.concatenate([np.linspace(0, 1, grid_size), np.quantile(y_prob, np.linspace(0, 1, grid_size))]))
+        return grid, lr.predict_proba(logit(grid).reshape(-1, 1))[:, 1]
+
+    @classmethod
+    def fit(cls, y_true, y_prob, n_splits: int = 5):
+        y_true = np.asarray(y_true).astype(int).ravel()
+        y_prob = np.asarray(y_prob, dtype=float).ravel()
+        fitters = {"isotonic": cls._fit_isotonic, "platt": cls._fit_platt}
+
+        # Cross-fitted Brier so the isotonic map is not scored on its own training rows
+        oof = {name: np.zeros_like(y_prob) for name in fitters}
+        folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+        for train_idx, val_idx in folds.split(y_prob.reshape(-1, 1), y_true):
+            for name, fitter in fitters.items():
+                x, y = fitter(y_true[train_idx], y_prob[train_idx])
+                oof[name][val_idx] = np.interp(y_prob[val_idx], x, y)
+
+        candidates = {"uncalibrated": {"brier_score": float(brier_score_loss(y_true, y_prob))}}
+        for name, fitter in fitters.items():
+            x, y = fitter(y_true, y_prob)
+            # Bound the map away from 0/1 by the resolution of the calibration set
+            bound = 1.0 / (len(y_true) + 1)
+            candidates[name] = {
+                "brier_score": float(brier_score_loss(y_true, oof[name])),
+                "x": np.asarray(x).tolist(),
+                "y": np.clip(y, bound, 1 - bound).tolist()
+            }
+
+        best = min(fitters, key=lambda name: candidates[name]["brier_score"])
+        logger.info(f"Calibration: {best} selected (Brier {candidates[best]['brier_score']:.4f} vs raw {candidates['uncalibrated']['brier_score']:.4f})")
+        return cls(best, candidates[best]["x"], candidates[best]["y"], candidates[best]["brier_score"], candidates)
+
+    @classmethod
+    def from_dict(cls, payload: dict):
+        return cls(payload['method'], payload['x'], payload['y'], payload['brier_score'], payload.get('candidates'))
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "x": self.x.tolist(),
+            "y": self.y.tolist(),
+            "brier_score": self.brier_score,
+            "candidates": self.candidates
+        }
+
+    def transform(self, probs):
+        """Calibrates a scalar or an array of raw probabilities."""
+        return np.interp(probs, self.x, self.y)
@@ -0,0 +1,127 @@
+import copy
+import logging
+import pandas as pd
+from xgboost import XGBClassifier
+from sklearn.metrics import roc_auc_score, brier_score_loss
+from sklearn.model_selection import train_test_split
+from src.modeling.trainer import ModelTrainer
+from src.data_science.engineer import FeatureEngineer
+from src.accountability.audit_store import AuditStore
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_ARTIFACT = "incremental_update.json"
+
+class IncrementalTrainer(ModelTrainer):
+    """
+    Warm-start refresh of registered models from newly labelled decisions.
+
+    Outcomes recorded against audit IDs are joined with the logged inputs in
+    the audit store. Only labels recorded after the previous refresh (the
+    watermark stored with each version) are used: XGBoost continues boosting
+    from the registered booster and the MLP takes a few partial_fit epochs.
+    A candidate is registered only if it does not regress against the version
+    it started from on a holdout of the original test split plus a slice of
+    the new labels, so refresh cost grows with the new data only.
+    """
+
+    UPDATERS = {"xgboost": "_update_xgboost", "mlp_baseline": "_update_mlp"}
+
+    def __init__(self, config_path: str, store_path: str = "logs/audit.db"):
+        super().__init__(config_path)
+        self.settings = self.config.get('incremental', {})
+        self.store = AuditStore(store_path)
+        self.engineer = FeatureEngineer(self.config)
+        if not self.engineer.load_artifacts():
+            raise RuntimeError("Feature encoders are not persisted; run eda_runner first")
+
+    def new_labels(self, model_name: str):
+        """Engineered features and labels recorded since this model's last refresh."""
+        previous = self.registry.load_artifact(model_name, INCREMENTAL_ARTIFACT) or {}
+        watermark = previous.get('labelled_through')
+        rows = self.store.labelled_decisions(since=watermark)
+        if not rows:
+            return None, None, watermark
+        X = self.engineer.process_pipeline(pd.DataFrame([row['input'] for row in rows]))
+        y = pd.Series([row['label'] for row in rows], name=self.target)
+        return X, y, rows[-1]['recorded_at']
+
+    def _update_xgboost(self, model, X_new, y_new):
+        params = {**model.get_params(), "n_estimators": self.settings.get('xgb_extra_rounds', 25)}
+        candidate = XGBClassifier(**params)
+        # Continue boosting: new trees fit the residuals of the registered booster
+        candidate.fit(X_new, y_new, xgb_model=model.get_booster())
+        return candidate, {**params, "warm_start_rounds": params['n_estimators']}
+
+    def _update_mlp(self, model, X_new, y_new):
+        candidate = copy.deepcopy(model)
+        epochs = self.settings.get('mlp_epochs', 5)
+        for _ in range(epochs):
+            candidate.partial_fit(X_new, y_new)
+        return candidate, {"hidden_layers": candidate.hidden_layer_sizes, "partial_fit_epochs": epochs}
+
+    @staticmethod
+    def _score(model, X, y):
+        y_prob = model.predict_proba(X)[:, 1]
+        return {"auc_roc": float(roc_auc_score(y, y_prob)), "brier_score": float(brier_score_loss(y, y_prob))}
+
+    def refresh(self, model_name: str):
+        """Updates one model from new labels; returns the update report (registered or not)."""
+        if model_name not in self.UPDATERS:
+            raise ValueError(f"{model_name} has no incremental update path; retrain it with ModelTrainer")
+
+        base_dir = self.registry.get_latest_dir(model_name)
+        model = self.registry.load_latest(model_name)
+        X_new, y_new, labelled_through = self.new_labels(model_name)
+        report = {"model_name": model_name, "base_version": base_dir, "new_labels": 0 if X_new is None else len(X_new)}
+        if X_new is None or len(X_new) < self.settings.get('min_new_labels', 50) or y_new.nunique() < 2:
+            logger.info(f"{model_name}: {report['new_labels']} new labels, below the refresh minimum; skipped")
+            return {**report, "registered": False, "reason": "insufficient_new_labels"}
+
+        # Holdout = original test split + a slice of the new labels (so drift is judged too)
+        X_test = pd.read_csv("data/processed/test_features.csv")
+        y_test = pd.read_csv("data/processed/test_target.csv")[self.target]
+        X_fit, X_new_hold, y_fit, y_new_hold = train_test_split(
+            X_new, y_new, test_size=self.settings.get('holdout_fraction', 0.2), stratify=y_new, random_state=42
+        )
+        X_te = X_test.drop(columns=['person_gender'], errors='ignore')
+        X_hold = pd.concat([X_te, X_new_hold[X_te.columns]], ignore_index=True)
+        y_hold = pd.concat([y_test, y_new_hold], ignore_index=True)
+
+        candidate, params = getattr(self, self.UPDATERS[model_name])(model, X_fit[X_te.columns], y_fit)
+        previous_scores = self._score(model, X_hold, y_hold)
+        candidate_scores = self._score(candidate, X_hold, y_hold)
+        accepted = (
+            candidate_scores['auc_roc'] >= previous_scores['auc_roc'] - self.settings.get('max_auc_drop', 0.005)
+            and candidate_scores['brier_score'] <= previous_scores['brier_score'] + self.settings.get('max_brier_increase', 0.005)
+        )
+        report.update({
+            "fit_rows": len(X_fit),
+            "holdout_rows": len(X_hold),
+            "previous": previous_scores,
+            "candidate": candidate_scores,
+            "labelled_through": labelled_through,
+            "registered": bool(accepted)
+        })
+        if not accepted:
+            logger.warning(f"{model_name}: candidate regressed on holdout ({candidate_scores} vs {previous_scores}); not registered")
+            return {**report, "reason": "holdout_regression"}
+
+        y_prob = candidate.predict_proba(X_te)[:, 1]
+        metrics = self._evaluate(y_test, y_prob)
+        model_dir = self.registry.save_model(candidate, model_name, metrics, {**params, "warm_start_from": base_dir}, publish=False)
+        self._register_artifacts(model_name, model_dir, X_test, y_test, y_prob)
+        self.registry.save_artifact(model_dir, INCREMENTAL_ARTIFACT, report)
+        self.registry.publish(model_name, model_dir)
+        return {**report, "version": model_dir}
+
+if __name__ == "__main__":
+    trainer = IncrementalTrainer("config/config.yaml")
+    print("\n--- Incremental Refresh ---")
+    for name in IncrementalTrainer.UPDATERS:
+        result = trainer.refresh(name)
+        if result['registered']:
+            print(f"{name}: registered {result['version']} from {result['new_labels']} new labels "
+                  f"(AUC {result['previous']['auc_roc']:.4f} -> {result['candidate']['auc_roc']:.4f})")
+        else:
+            print(f"{name}: not registered ({result['reason']}, {result['new_labels']} new labels)")
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MLP_FORWARD_ARTIFACT = "mlp_forward.json"
+# Largest |p_compiled - p_sklearn| a version may register with
+VERIFY_TOLERANCE = 1e-9
+
+ACTIVATIONS = {
+    "relu": lambda h: np.maximum(h, 0, out=h),
+    "tanh": lambda h: np.tanh(h, out=h),
+    "logistic": lambda h: _sigmoid(h, out=h),
+    "identity": lambda h: h,
+}
+
+def _sigmoid(z, out):
+    np.negative(z, out=out)
+    # exp overflows to inf for very negative logits, which correctly yields probability 0
+    with np.errstate(over='ignore'):
+        np.exp(out, out=out)
+    out += 1.0
+    return np.reciprocal(out, out=out)
+
+class CompiledMLP:
+    """
+    Drop-in predict_proba for a fitted binary MLPClassifier that skips sklearn's
+    per-call input validation. Weights are held as contiguous float64 arrays,
+    the dtype sklearn computes in, so served probabilities match it; float32
+    moved them on a few percent of rows. The forward pass (matmul, bias,
+    activation) runs in place on per-thread buffers that are reused across
+    calls of the same batch size, so single rows and large batches both go
+    straight to BLAS.
+    """
+
+    def __init__(self, coefs, intercepts, activation: str, feature_names, estimator=None, max_abs_error: float = None):
+        # Own copies: the estimator's arrays are already float64 and would otherwise be shared
+        self.coefs = [np.array(w, dtype=np.float64, order='C') for w in coefs]
+        self.intercepts = [np.array(b, dtype=np.float64, order='C') for b in intercepts]
+        self.activation = activation
+        self.feature_names = list(feature_names)
+        self.feature_names_in_ = np.array(self.feature_names, dtype=object)
+        self.classes_ = np.array([0, 1])
+        self.estimator = estimator
+        self.max_abs_error = max_abs_error
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Scratch buffers are per thread and per process; never pickled or copied
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @classmethod
+    def from_sklearn(cls, model, feature_names=None):
+        if model.out_activation_ != "logistic" or model.n_outputs_ != 1:
+            raise ValueError("CompiledMLP only supports binary MLPClassifier models")
+        if feature_names is None:
+            feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is None:
+            raise ValueError("Feature names are required when the model was not fitted on a DataFrame")
+        return cls(model.coefs_, model.intercepts_, model.activation, feature_names, estimator=model)
+
+    @classmethod
+    def from_dict(cls, payload: dict, estimator=None):
+        error = payload.get('max_abs_error')
+        if estimator is not None and (error is None or error > VERIFY_TOLERANCE):
+            # Stored before float64 weights (or never verified): rebuild from the estimator instead
+            logger.warning(f"Stored MLP forward pass deviates by {error}; recompiling from the estimator")
+            return cls.from_sklearn(estimator, payload['feature_names'])
+        return cls(
+            [np.asarray(w, dtype=np.float64) for w in payload['coefs']],
+            [np.asarray(b, dtype=np.float64) for b in payload['intercepts']],
+            payload['activation'], payload['feature_names'],
+            estimator=estimator, max_abs_error=payload.get('max_abs_error')
+        )
+
+    def to_dict(self):
+        return {
+            "activation": self.activation,
+            "feature_names": self.feature_names,
+            "coefs": [w.tolist() for w in self.coefs],
+            "intercepts": [b.tolist() for b in self.intercepts],
+            "max_abs_error": self.max_abs_error
+        }
+
+    def _buffers(self, n_rows: int):
+        """Per-thread hidden/output buffers for a batch size (a few sizes are kept)."""
+        cache = getattr(self._local, "buffers", None)
+        if cache is None:
+            cache = self._local.buffers = {}
+        buffers = cache.get(n_rows)
+        if buffers is None:
+            if len(cache) >= 8:
+                cache.pop(next(iter(cache)))
+            buffers = [np.empty((n_rows, w.shape[1]), dtype=np.float64) for w in self.coefs]
+            cache[n_rows] = buffers
+        return buffers
+
+    def _as_matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            # Reindexing a frame costs more than the forward pass; skip it when already aligned
+            if list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float64)
+        return np.ascontiguousarray(X, dtype=np.float64).reshape(-1, self.coefs[0].shape[0])
+
+    def decision_logit(self, X) -> np.ndarray:
+        """Output-layer pre-activation, computed in place in reused buffers."""
+        h = self._as_matrix(X)
+        buffers = self._buffers(h.shape[0])
+        activate = ACTIVATIONS[self.activation]
+        last = len(self.coefs) - 1
+        for i, (w, b, out) in enumerate(zip(self.coefs, self.intercepts, buffers)):
+            np.matmul(h, w, out=out)
+            out += b
+            h = out if i == last else activate(out)
+        return h[:, 0]
+
+    def predict_proba(self, X, out: np.ndarray = None) -> np.ndarray:
+        """[n, 2] class probabilities; pass `out` (float64 [n, 2]) to reuse a caller-owned buffer."""
+        logit = self.decision_logit(X)
+        if out is None:
+            out = np.empty((len(logit), 2), dtype=np.float64)
+        _sigmoid(logit, out=out[:, 1])
+        np.subtract(1.0, out[:, 1], out=out[:, 0])
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        return (self.decision_logit(X) > 0).astype(int)
+
+    def verify(self, X, tolerance: float = VERIFY_TOLERANCE) -> float:
+        """Max |p_compiled - p_sklearn| on X; raises if it exceeds the tolerance."""
+        if self.estimator is None:
+            raise ValueError("No sklearn estimator attached to verify against")
+        reference = self.estimator.predict_proba(X)[:, 1]
+        error = float(np.max(np.abs(self.predict_proba(X)[:, 1] - reference))) if len(reference) else 0.0
+        if error > tolerance:
+            raise ValueError(f"Compiled MLP deviates from sklearn by {error:.2e} (tolerance {tolerance:.0e})")
+        self.max_abs_error = error
+        return error
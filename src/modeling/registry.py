@@ -11,7 +11,12 @@ class ModelRegistry:
         self.base_path = base_path
         os.makedirs(base_path, exist_ok=True)
 
-    def save_model(self, model, model_name: str, metrics: dict, params: dict):
+    def save_model(self, model, model_name: str, metrics: dict, params: dict, publish: bool = True):
+        """
+        Stores a new version. With publish=False the 'latest' pointer is left
+        alone; call publish() once the version's artifacts are written so no
+        reader (e.g. a serving worker reloading on the pointer) sees it half-built.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         model_dir = os.path.join(self.base_path, f"{model_name}_{timestamp}")
         os.makedirs(model_dir, exist_ok=True)
@@ -29,28 +34,70 @@ class ModelRegistry:
         }
         with open(os.path.join(model_dir, "metadata.json"), "w") as f:
             json.dump(metadata, f, indent=4)
-            
-        # Update 'latest' pointer
+
+        logger.info(f"Model {model_name} saved to {model_dir}")
+        if publish:
+            self.publish(model_name, model_dir)
+        return model_dir
+
+    def publish(self, model_name: str, model_dir: str):
+        """Points 'latest' at a stored version; the last step of registering it."""
         latest_path = os.path.join(self.base_path, f"{model_name}_latest")
         if os.path.exists(latest_path):
             os.remove(latest_path) if not os.path.isdir(latest_path) else None # Safety
-        
-        # On some systems symlinks might fail, so we'll just write a pointer file
-        with open(os.path.join(self.base_path, f"{model_name}_latest_pointer.txt"), "w") as f:
+
+        # On some systems symlinks might fail, so we'll just write a pointer file.
+        # Written aside and renamed so readers see either the old or the new version
+        pointer_path = os.path.join(self.base_path, f"{model_name}_latest_pointer.txt")
+        with open(pointer_path + ".tmp", "w") as f:
             f.write(model_dir)
-            
-        logger.info(f"Model {model_name} saved to {model_dir}")
-        return model_dir
+        os.replace(pointer_path + ".tmp", pointer_path)
+        logger.info(f"Model {model_name} latest -> {model_dir}")
 
-    def load_latest(self, model_name: str):
+    def get_latest_dir(self, model_name: str):
+        """Resolves the directory of the latest registered version of a model."""
         pointer_path = os.path.join(self.base_path, f"{model_name}_latest_pointer.txt")
         if not os.path.exists(pointer_path):
             logger.error(f"No latest pointer found for {model_name}")
             return None
-            
+
         with open(pointer_path, "r") as f:
-            model_dir = f.read().strip()
+            return f.read().strip()
+
+    def save_artifact(self, model_dir: str, artifact_name: str, payload: dict):
+        """Stores a JSON artifact (e.g. precomputed explanations) next to a model version."""
+        artifact_path = os.path.join(model_dir, artifact_name)
+        with open(artifact_path, "w") as f:
+            json.dump(payload, f, indent=4)
+        logger.info(f"Artifact {artifact_name} saved to {model_dir}")
+        return artifact_path
+
+    def load_artifact(self, model_name: str, artifact_name: str, model_dir: str = None):
+        """Loads a JSON artifact from a model version (latest by default), if it was stored."""
+        model_dir = model_dir or self.get_latest_dir(model_name)
+        if model_dir is None:
+            return None
+
+        artifact_path = os.path.join(model_dir, artifact_name)
+        if not os.path.exists(artifact_path):
+            return None
+
+        with open(artifact_path, "r") as f:
+            return json.load(f)
+
+    def load_latest(self, model_name: str):
+        model_dir = self.get_latest_dir(model_name)
+        if model_dir is None:
+            return None
             
         model = joblib.load(os.path.join(model_dir, "model.joblib"))
         logger.info(f"Loaded latest {model_name} from {model_dir}")
         return model
+
+    def load_version(self, model_dir: str):
+        """Loads a specific registered version (e.g. a candidate that is not the latest)."""
+        model_path = os.path.join(model_dir, "model.joblib")
+        if not os.path.exists(model_path):
+            logger.error(f"No model stored in {model_dir}")
+            return None
+        return joblib.load(model_path)
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 import numpy as np
 import logging
@@ -8,6 +9,11 @@ from sklearn.metrics import classification_report, roc_auc_score, precision_reca
 from sklearn.calibration import calibration_curve
 from sklearn.ensemble import RandomForestClassifier
 from src.modeling.registry import ModelRegistry
+from src.xai.shap_explainer import SHAPExplainer, GLOBAL_SUMMARY_ARTIFACT
+from src.accountability.confidence import ConformalPredictor, CONFORMAL_ARTIFACT
+from src.modeling.calibration import ProbabilityCalibrator, CALIBRATION_ARTIFACT, served_probability
+from src.accountability.fairness_audit import FairnessAuditor, FAIRNESS_ARTIFACT
+from src.modeling.mlp_scorer import CompiledMLP, MLP_FORWARD_ARTIFACT
 import yaml
 
 logging.basicConfig(level=logging.INFO)
@@ -47,7 +53,9 @@ class ModelTrainer:
         y_prob = model.predict_proba(X_te)[:, 1]
         metrics = self._evaluate(y_test, y_prob)
         
-        self.registry.save_model(model, "xgboost", metrics, params)
+        model_dir = self.registry.save_model(model, "xgboost", metrics, params, publish=False)
+        self._register_artifacts("xgboost", model_dir, X_test, y_test, y_prob)
+        self.registry.publish("xgboost", model_dir)
         return model, metrics
 
     def train_baseline_dl(self, X_train, y_train, X_test, y_test):
@@ -63,7 +71,9 @@ class ModelTrainer:
         y_prob = model.predict_proba(X_te)[:, 1]
         metrics = self._evaluate(y_test, y_prob)
         
-        self.registry.save_model(model, "mlp_baseline", metrics, {"hidden_layers": (64, 32)})
+        model_dir = self.registry.save_model(model, "mlp_baseline", metrics, {"hidden_layers": (64, 32)}, publish=False)
+        self._register_artifacts("mlp_baseline", model_dir, X_test, y_test, y_prob)
+        self.registry.publish("mlp_baseline", model_dir)
         return model, metrics
 
     def train_rf(self, X_train, y_train, X_test, y_test):
@@ -79,9 +89,44 @@ class ModelTrainer:
         y_prob = model.predict_proba(X_te)[:, 1]
         metrics = self._evaluate(y_test, y_prob)
         
-        self.registry.save_model(model, "random_forest", metrics, {"n_estimators": 100})
+        model_dir = self.registry.save_model(model, "random_forest", metrics, {"n_estimators": 100}, publish=False)
+        self._register_artifacts("random_forest", model_dir, X_test, y_test, y_prob)
+        self.registry.publish("random_forest", model_dir)
         return model, metrics
 
+    def _register_artifacts(self, model_name: str, model_dir: str, X_test: pd.DataFrame, y_test, y_prob):
+        """Precomputes serving-time artifacts once so no request pays for them."""
+        X_te = X_test.drop(columns=['person_gender'], errors='ignore')
+
+        # Split-conformal calibration on the held-out split (never seen during fitting)
+        alpha = self.config['thresholds'].get('conformal_alpha', 0.1)
+        conformal = ConformalPredictor.fit(y_test, y_prob, alpha=alpha)
+        self.registry.save_artifact(model_dir, CONFORMAL_ARTIFACT, conformal.to_dict())
+
+        # Isotonic / Platt calibration compiled to an interpolation table
+        calibrator = ProbabilityCalibrator.fit(y_test, y_prob)
+        self.registry.save_artifact(model_dir, CALIBRATION_ARTIFACT, calibrator.to_dict())
+
+        # Intersectional fairness audit with bootstrap intervals (sensitive columns kept for grouping),
+        # on the served probabilities so its approvals are the ones the API would grant
+        fairness = FairnessAuditor(self.config).audit(X_test, y_test, served_probability(y_prob, calibrator))
+        self.registry.save_artifact(model_dir, FAIRNESS_ARTIFACT, fairness)
+
+        # MLP weights as contiguous arrays for the native forward pass; registration fails if it deviates from sklearn
+        model = self.registry.load_version(model_dir)
+        if isinstance(model, MLPClassifier):
+            compiled = CompiledMLP.from_sklearn(model, X_te.columns)
+            error = compiled.verify(X_te)
+            self.registry.save_artifact(model_dir, MLP_FORWARD_ARTIFACT, compiled.to_dict())
+            logger.info(f"Compiled MLP forward pass verified (max |dp| {error:.2e})")
+
+        try:
+            explainer = SHAPExplainer(model_name, model_dir=model_dir)
+            summary = explainer.compute_global_summary(X_te)
+            self.registry.save_artifact(model_dir, GLOBAL_SUMMARY_ARTIFACT, summary)
+        except Exception as e:
+            logger.error(f"Global explanation summary failed for {model_name}: {e}")
+
     def _evaluate(self, y_true, y_prob):
         y_pred = (y_prob > 0.5).astype(int)
         precision, recall, _ = precision_recall_curve(y_true, y_prob)
@@ -104,18 +149,31 @@ class ModelTrainer:
         return metrics
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and register models")
+    parser.add_argument("--models", nargs="*", default=["xgboost", "mlp_baseline", "random_forest"],
+                        help="models to train (none: only write the test split)")
+    parser.add_argument("--no-split", action="store_true", help="do not (re)write the test split files")
+    args = parser.parse_args()
+
     trainer = ModelTrainer("config/config.yaml")
     X_train, X_test, y_train, y_test = trainer.prepare_data("data/processed/cleaned_risk_data.csv")
     
-    xgb_model, xgb_metrics = trainer.train_interpretable(X_train, y_train, X_test, y_test)
-    mlp_model, mlp_metrics = trainer.train_baseline_dl(X_train, y_train, X_test, y_test)
-    rf_model, rf_metrics = trainer.train_rf(X_train, y_train, X_test, y_test)
+    train_fns = {
+        "xgboost": ("XGBoost", trainer.train_interpretable),
+        "mlp_baseline": ("MLP", trainer.train_baseline_dl),
+        "random_forest": ("Random Forest", trainer.train_rf)
+    }
+    results = {}
+    for name in args.models:
+        label, train_fn = train_fns[name]
+        _, results[label] = train_fn(X_train, y_train, X_test, y_test)
     
     # Save the test set for auditing and XAI later
-    X_test.to_csv("data/processed/test_features.csv", index=False)
-    y_test.to_csv("data/processed/test_target.csv", index=False)
+    if not args.no_split:
+        X_test.to_csv("data/processed/test_features.csv", index=False)
+        y_test.to_csv("data/processed/test_target.csv", index=False)
     
-    print("\n--- Model Comparison ---")
-    print(f"XGBoost AUC-ROC: {xgb_metrics['auc_roc']:.4f}")
-    print(f"MLP AUC-ROC: {mlp_metrics['auc_roc']:.4f}")
-    print(f"Random Forest AUC-ROC: {rf_metrics['auc_roc']:.4f}")
+    if results:
+        print("\n--- Model Comparison ---")
+        for label, metrics in results.items():
+            print(f"{label} AUC-ROC: {metrics['auc_roc']:.4f}")
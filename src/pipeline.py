@@ -0,0 +1,245 @@
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import yaml
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("Pipeline")
+
+STATE_DIR = "logs/pipeline"
+STATE_FILE = os.path.join(STATE_DIR, "state.json")
+
+# The offline flow as a DAG. Each stage runs an existing entry point as a subprocess.
+# Its cache key covers: the source of its module and every src/ module it imports
+# (transitively), the listed config.yaml sections, and the content of every input
+# file (outputs of upstream stages included).
+STAGES = {
+    "generate_data": {
+        "module": "src.data_science.generate_data",
+        "deps": [],
+        "config": [],
+        "inputs": [],
+        "outputs": ["data/raw/credit_risk_dataset.csv"]
+    },
+    "eda": {
+        "module": "src.data_science.eda_runner",
+        "deps": ["generate_data"],
+        "config": ["data"],
+        "inputs": ["data/raw/credit_risk_dataset.csv"],
+        "outputs": ["data/processed/cleaned_risk_data.csv", "data/processed/audit_report.json", "models/feature_encoders.joblib"]
+    },
+    "split": {
+        "module": "src.modeling.trainer",
+        "args": ["--models"],
+        "deps": ["eda"],
+        "config": ["data"],
+        "inputs": ["data/processed/cleaned_risk_data.csv"],
+        "outputs": ["data/processed/test_features.csv", "data/processed/test_target.csv"]
+    },
+    **{
+        f"train_{name}": {
+            "module": "src.modeling.trainer",
+            "args": ["--models", name, "--no-split"],
+            "deps": ["eda"],
+            "config": ["data", "model", "thresholds", "fairness"],
+            "inputs": ["data/processed/cleaned_risk_data.csv"],
+            "outputs": [f"models/{name}_latest_pointer.txt"]
+        }
+        for name in ["xgboost", "mlp_baseline", "random_forest"]
+    },
+    "audit": {
+        "module": "src.accountability.audit_runner",
+        "deps": ["split", "train_xgboost"],
+        "config": ["data", "thresholds", "fairness"],
+        "inputs": ["data/processed/test_features.csv", "data/processed/test_target.csv", "models/xgboost_latest_pointer.txt"],
+        "outputs": []
+    },
+    "xai": {
+        "module": "src.xai.xai_runner",
+        "deps": ["split", "train_xgboost"],
+        "config": [],
+        "inputs": ["data/processed/test_features.csv", "models/xgboost_latest_pointer.txt"],
+        "outputs": []
+    }
+}
+
+def module_path(module: str) -> str:
+    return module.replace(".", os.sep) + ".py"
+
+def code_closure(module: str) -> List[str]:
+    """Source files of a module and every src/ module it imports, transitively."""
+    seen, stack = set(), [module]
+    while stack:
+        path = module_path(stack.pop())
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        with open(path) as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("src."):
+                stack.append(node.module)
+            elif isinstance(node, ast.Import):
+                stack.extend(alias.name for alias in node.names if alias.name.startswith("src."))
+    return sorted(seen)
+
+class PipelineRunner:
+    """
+    Content-addressed runner for the offline stages. A stage is skipped when
+    its cache key matches the last successful run and its outputs still hold
+    the content recorded then; otherwise it reruns, which changes its outputs'
+    hashes and so the keys of everything downstream. Stages whose dependencies
+    are done run concurrently (e.g. the three model trainings, or audit and xai).
+    File hashes are cached by (size, mtime) so unchanged inputs are not re-read.
+    """
+
+    def __init__(self, config_path: str = "config/config.yaml", jobs: Optional[int] = None):
+        self.config_path = config_path
+        with open(config_path) as f:
+            self.config = yaml.safe_load(f)
+        self.jobs = jobs or min(4, os.cpu_count() or 1)
+        os.makedirs(STATE_DIR, exist_ok=True)
+        self.state = {"stages": {}, "files": {}}
+        if os.path.exists(STATE_FILE):
+            with open(STATE_FILE) as f:
+                self.state = json.load(f)
+
+    def _save_state(self):
+        tmp = STATE_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=4)
+        os.replace(tmp, STATE_FILE)
+
+    def file_hash(self, path: str) -> Optional[str]:
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        cached = self.state["files"].get(path)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+            return cached["sha256"]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.state["files"][path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    def stage_key(self, name: str) -> str:
+        stage = STAGES[name]
+        payload = {
+            "stage": name,
+            "args": stage.get("args", []),
+            "code": {path: self.file_hash(path) for path in code_closure(stage["module"])},
+            "config": {section: self.config.get(section) for section in stage["config"]},
+            "inputs": {path: self.file_hash(path) for path in stage["inputs"]}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_fresh(self, name: str, key: str) -> bool:
+        record = self.state["stages"].get(name)
+        if record is None or record.get("key") != key:
+            return False
+        # Outputs deleted or edited by hand since the recorded run invalidate it
+        return all(self.file_hash(path) == digest for path, digest in record.get("outputs", {}).items())
+
+    def _execute(self, name: str) -> Dict[str, Any]:
+        stage = STAGES[name]
+        log_path = os.path.join(STATE_DIR, f"{name}.log")
+        started = time.perf_counter()
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+        with open(log_path, "w") as log:
+            proc = subprocess.run(
+                [sys.executable, "-m", stage["module"], *stage.get("args", [])],
+                stdout=log, stderr=subprocess.STDOUT, env=env
+            )
+        return {"returncode": proc.returncode, "elapsed_s": time.perf_counter() - started, "log": log_path}
+
+    def run(self, targets: Optional[List[str]] = None, force: Optional[List[str]] = None, dry_run: bool = False) -> Dict[str, str]:
+        """Brings targets (default: every stage) up to date; returns each stage's status."""
+        selected = self._with_upstream(targets or list(STAGES))
+        force = set(force or [])
+        status = {}
+        pending = [name for name in STAGES if name in selected]
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    deps = STAGES[name]["deps"]
+                    if any(status.get(d) == "failed" or status.get(d) == "blocked" for d in deps):
+                        status[name] = "blocked"
+                        pending.remove(name)
+                    elif all(status.get(d) in ("skipped", "ran", "would_run") for d in deps if d in selected):
+                        pending.remove(name)
+                        # Keys are computed only once upstream outputs are final
+                        key = self.stage_key(name)
+                        upstream_reran = any(status.get(d) == "would_run" for d in deps)
+                        if name not in force and not upstream_reran and self.is_fresh(name, key):
+                            status[name] = "skipped"
+                            logger.info(f"[{name}] up to date, skipped")
+                        elif dry_run:
+                            status[name] = "would_run"
+                            logger.info(f"[{name}] would run")
+                        else:
+                            logger.info(f"[{name}] running {STAGES[name]['module']} {' '.join(STAGES[name].get('args', []))}")
+                            running[pool.submit(self._execute, name)] = (name, key)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    result = future.result()
+                    if result["returncode"] != 0:
+                        status[name] = "failed"
+                        logger.error(f"[{name}] failed after {result['elapsed_s']:.1f}s; see {result['log']}")
+                        continue
+                    status[name] = "ran"
+                    # Recorded under the pre-run key: if an input changed while the stage ran,
+                    # the next run sees a different key and redoes it
+                    self.state["stages"][name] = {
+                        "key": key,
+                        "outputs": {path: self.file_hash(path) for path in STAGES[name]["outputs"]},
+                        "completed": datetime.now().isoformat(),
+                        "elapsed_s": result["elapsed_s"]
+                    }
+                    self._save_state()
+                    logger.info(f"[{name}] done in {result['elapsed_s']:.1f}s")
+        self._save_state()
+        return status
+
+    @staticmethod
+    def _with_upstream(targets: List[str]) -> set:
+        unknown = [t for t in targets if t not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown stages {unknown}; expected some of {list(STAGES)}")
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(STAGES[name]["deps"])
+        return selected
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memoized offline pipeline (generate_data -> eda -> train -> audit/xai)")
+    parser.add_argument("targets", nargs="*", help=f"stages to bring up to date (default: all of {list(STAGES)})")
+    parser.add_argument("--force", nargs="*", default=[], help="rerun these stages even if unchanged")
+    parser.add_argument("--jobs", type=int, default=None, help="stages run concurrently")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    status = PipelineRunner(jobs=args.jobs).run(args.targets, force=args.force, dry_run=args.dry_run)
+    print(f"\n--- Pipeline ({time.perf_counter() - started:.1f}s) ---")
+    for name, outcome in status.items():
+        print(f"{name}: {outcome}")
+    sys.exit(1 if any(outcome in ("failed", "blocked") for outcome in status.values()) else 0)
@@ -0,0 +1,214 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Sequence
+import joblib
+import numpy as np
+import pandas as pd
+import shap
+from src.modeling.registry import ModelRegistry
+from src.xai.shap_explainer import SHAPExplainer
+from src.xai.tree_counterfactuals import TreeCounterfactualSolver
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+FEATURES_FILE = "features.npy"
+SHAP_FILE = "shap.f32"
+ROW_IDS_FILE = "row_ids.npy"
+DONE_FILE = "chunks_done.u8"
+
+# Per-process state of pool workers (set once by the initializer)
+_worker = {}
+
+def _init_worker(model_dir: str, features_path: str, shap_path: str, shape):
+    model = joblib.load(os.path.join(model_dir, "model.joblib"))
+    _worker['explainer'] = shap.TreeExplainer(model)
+    # Input is mapped read-only: every worker shares the same page-cache pages
+    _worker['features'] = np.load(features_path, mmap_mode='r')
+    _worker['shap'] = np.memmap(shap_path, dtype=np.float32, mode='r+', shape=tuple(shape))
+
+def _explain_chunk(chunk: int, start: int, stop: int):
+    X = np.asarray(_worker['features'][start:stop])
+    shap_raw = _worker['explainer'].shap_values(X)
+    _worker['shap'][start:stop] = SHAPExplainer._positive_class_matrix(shap_raw, stop - start)
+    _worker['shap'].flush()
+    return chunk
+
+class BulkExplanationJob:
+    """
+    Offline SHAP for a whole portfolio. Engineered features are converted once
+    to a read-only .npy mapped by every pool worker; each worker runs a
+    TreeExplainer on its chunk and writes straight into a shared float32
+    memmap (rows x features). A per-chunk completion map is flushed after
+    every chunk, so an interrupted job resumes where it stopped.
+    """
+
+    def __init__(self, model_name: str = "xgboost", input_path: str = "data/processed/test_features.csv",
+                 output_root: str = "data/explanations", chunk_size: int = 10000, workers: Optional[int] = None,
+                 id_column: Optional[str] = None):
+        self.registry = ModelRegistry()
+        self.model_name = model_name
+        self.model_dir = self.registry.get_latest_dir(model_name)
+        if self.model_dir is None:
+            raise ValueError(f"No registered model named {model_name}")
+        self.model = self.registry.load_latest(model_name)
+        if not TreeCounterfactualSolver.supports(self.model):
+            raise ValueError(f"{model_name} is not a tree ensemble; bulk explanation uses TreeExplainer")
+
+        self.input_path = input_path
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count()
+        self.id_column = id_column
+        self.output_dir = os.path.join(output_root, os.path.basename(self.model_dir))
+        self.feature_names = list(getattr(self.model, "feature_names_in_", []))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _fingerprint(self):
+        stat = os.stat(self.input_path)
+        return {
+            "model_name": self.model_name,
+            "model_dir": self.model_dir,
+            "input_path": os.path.abspath(self.input_path),
+            "input_size": stat.st_size,
+            "input_mtime": stat.st_mtime,
+            "chunk_size": self.chunk_size
+        }
+
+    def _prepare(self):
+        """Writes features.npy and row ids in one streaming pass over the CSV; returns the manifest."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        n_rows = sum(len(c) for c in pd.read_csv(self.input_path, usecols=[0], chunksize=100_000))
+        features = np.lib.format.open_memmap(
+            self._path(FEATURES_FILE), mode='w+', dtype=np.float64, shape=(n_rows, len(self.feature_names))
+        )
+        row_ids = np.empty(n_rows, dtype=np.int64)
+        offset = 0
+        for frame in pd.read_csv(self.input_path, chunksize=100_000):
+            stop = offset + len(frame)
+            features[offset:stop] = frame[self.feature_names].to_numpy(dtype=np.float64)
+            row_ids[offset:stop] = frame[self.id_column].to_numpy() if self.id_column else np.arange(offset, stop)
+            offset = stop
+        features.flush()
+        del features
+        np.save(self._path(ROW_IDS_FILE), row_ids)
+
+        n_chunks = -(-n_rows // self.chunk_size)
+        np.memmap(self._path(SHAP_FILE), dtype=np.float32, mode='w+', shape=(n_rows, len(self.feature_names))).flush()
+        np.memmap(self._path(DONE_FILE), dtype=np.uint8, mode='w+', shape=(max(n_chunks, 1),)).flush()
+
+        base_value = shap.TreeExplainer(self.model).expected_value
+        if isinstance(base_value, (list, np.ndarray)):
+            base_value = base_value[1] if len(base_value) > 1 else base_value[0]
+        manifest = {
+            **self._fingerprint(),
+            "model_version": os.path.basename(self.model_dir),
+            "n_rows": int(n_rows),
+            "n_chunks": int(n_chunks),
+            "features": self.feature_names,
+            "dtype": "float32",
+            "base_value": float(base_value),
+            "id_column": self.id_column,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        with open(self._path(MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=4)
+        return manifest
+
+    def _load_manifest(self, restart: bool):
+        path = self._path(MANIFEST)
+        if restart or not os.path.exists(path):
+            return self._prepare()
+        with open(path) as f:
+            manifest = json.load(f)
+        fingerprint = self._fingerprint()
+        if any(manifest.get(k) != v for k, v in fingerprint.items()):
+            raise ValueError(
+                f"{self.output_dir} holds a job for different inputs or settings; rerun with restart=True to overwrite it"
+            )
+        return manifest
+
+    def run(self, restart: bool = False):
+        manifest = self._load_manifest(restart)
+        n_rows, n_chunks = manifest['n_rows'], manifest['n_chunks']
+        done = np.memmap(self._path(DONE_FILE), dtype=np.uint8, mode='r+', shape=(max(n_chunks, 1),))
+        pending = [c for c in range(n_chunks) if not done[c]]
+        if not pending:
+            logger.info(f"All {n_chunks} chunks already explained in {self.output_dir}")
+            return manifest
+        logger.info(f"Explaining {len(pending)}/{n_chunks} chunks of {self.chunk_size} rows on {self.workers} workers")
+
+        started = time.perf_counter()
+        shape = (n_rows, len(manifest['features']))
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(self.model_dir, self._path(FEATURES_FILE), self._path(SHAP_FILE), shape)
+        ) as pool:
+            futures = [
+                pool.submit(_explain_chunk, c, c * self.chunk_size, min((c + 1) * self.chunk_size, n_rows))
+                for c in pending
+            ]
+            for completed, future in enumerate(as_completed(futures), 1):
+                # Marked done only after the worker flushed its rows
+                done[future.result()] = 1
+                done.flush()
+                if completed % 10 == 0 or completed == len(futures):
+                    logger.info(f"{completed}/{len(futures)} chunks done ({time.perf_counter() - started:.1f}s)")
+        return manifest
+
+class ExplanationStore:
+    """Read-only view over a finished (or partially finished) bulk explanation job."""
+
+    def __init__(self, output_dir: str):
+        with open(os.path.join(output_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.features = self.manifest['features']
+        self.base_value = self.manifest['base_value']
+        shape = (self.manifest['n_rows'], len(self.features))
+        self.shap = np.memmap(os.path.join(output_dir, SHAP_FILE), dtype=np.float32, mode='r', shape=shape)
+        self.row_ids = np.load(os.path.join(output_dir, ROW_IDS_FILE), mmap_mode='r')
+        self._order = np.argsort(self.row_ids, kind='stable')
+        done = np.memmap(os.path.join(output_dir, DONE_FILE), dtype=np.uint8, mode='r')
+        self.complete = bool(done[:self.manifest['n_chunks']].all())
+
+    def positions(self, row_ids: Sequence[int]) -> np.ndarray:
+        """Matrix positions of the given row ids (binary search over the sorted index)."""
+        row_ids = np.asarray(row_ids)
+        sorted_ids = self.row_ids[self._order]
+        idx = np.searchsorted(sorted_ids, row_ids)
+        found = (idx < len(sorted_ids)) & (sorted_ids[np.minimum(idx, len(sorted_ids) - 1)] == row_ids)
+        if not found.all():
+            raise KeyError(f"Unknown row ids: {row_ids[~found][:10].tolist()}")
+        return self._order[idx]
+
+    def rows(self, row_ids: Sequence[int]) -> pd.DataFrame:
+        positions = self.positions(row_ids)
+        return pd.DataFrame(self.shap[positions], columns=self.features, index=np.asarray(row_ids))
+
+    def slice(self, start: int, stop: int) -> pd.DataFrame:
+        return pd.DataFrame(self.shap[start:stop], columns=self.features, index=np.asarray(self.row_ids[start:stop]))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Resumable bulk SHAP explanations into a memory-mapped store")
+    parser.add_argument("--model", default="xgboost")
+    parser.add_argument("--input", default="data/processed/test_features.csv")
+    parser.add_argument("--output", default="data/explanations")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--id-column", default=None)
+    parser.add_argument("--restart", action="store_true", help="discard any partial job and start over")
+    args = parser.parse_args()
+
+    job = BulkExplanationJob(args.model, args.input, args.output, args.chunk_size, args.workers, args.id_column)
+    manifest = job.run(restart=args.restart)
+    store = ExplanationStore(job.output_dir)
+    print(f"\n--- Bulk Explanations ({manifest['model_version']}) ---")
+    print(f"Rows: {manifest['n_rows']}, complete: {store.complete}, stored at {job.output_dir}")
+    print("Mean |SHAP| (first 10k rows):")
+    print(np.abs(store.slice(0, 10000)).mean().sort_values(ascending=False).head(5).to_string())
@@ -1,13 +1,19 @@
 import pandas as pd
 import numpy as np
 import logging
+from src.modeling.calibration import DECISION_THRESHOLD, served_probability
 
 logger = logging.getLogger(__name__)
 
 class CounterfactualEngine:
-    def __init__(self, model, engineer):
+    def __init__(self, model, engineer, calibrator=None):
         self.model = model
         self.engineer = engineer
+        # Approval is judged on the served (calibrated) probability, as in /predict
+        self.calibrator = calibrator
+
+    def _prob(self, df: pd.DataFrame) -> float:
+        return float(served_probability(self.model.predict_proba(self.engineer.process_pipeline(df))[:, 1], self.calibrator)[0])
 
     def find_path_to_approval(self, raw_input: dict, steps: int = 10):
         """
@@ -15,9 +21,9 @@ class CounterfactualEngine:
         Focuses on: loan_amnt, person_income, person_emp_length.
         """
         base_df = pd.DataFrame([raw_input])
-        base_prob = self.model.predict_proba(self.engineer.process_pipeline(base_df))[:, 1][0]
+        base_prob = self._prob(base_df)
         
-        if base_prob <= 0.5:
+        if base_prob <= DECISION_THRESHOLD:
             return {"message": "Already approved", "suggestion": None}
 
         recommendations = []
@@ -27,8 +33,8 @@ class CounterfactualEngine:
         for i in range(1, steps + 1):
             modified = raw_input.copy()
             modified['loan_amnt'] = max(0, raw_input['loan_amnt'] - (loan_step * i))
-            prob = self.model.predict_proba(self.engineer.process_pipeline(pd.DataFrame([modified])))[:, 1][0]
-            if prob <= 0.5:
+            prob = self._prob(pd.DataFrame([modified]))
+            if prob <= DECISION_THRESHOLD:
                 recommendations.append({
                     "feature": "Loan Amount",
                     "current": raw_input['loan_amnt'],
@@ -43,8 +49,8 @@ class CounterfactualEngine:
         for i in range(1, steps + 1):
             modified = raw_input.copy()
             modified['person_income'] = raw_input['person_income'] + (income_step * i)
-            prob = self.model.predict_proba(self.engineer.process_pipeline(pd.DataFrame([modified])))[:, 1][0]
-            if prob <= 0.5:
+            prob = self._prob(pd.DataFrame([modified]))
+            if prob <= DECISION_THRESHOLD:
                 recommendations.append({
                     "feature": "Annual Income",
                     "current": raw_input['person_income'],
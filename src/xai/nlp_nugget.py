@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +24,8 @@ class NLPNugget:
         "cb_person_default_on_file": "prior default history"
     }
 
-    def generate_narrative(self, explanation_data: Dict, tone: str = "executive"):
+    def generate_narrative(self, explanation_data: Dict, tone: str = "executive", global_summary: Optional[Dict] = None,
+                           is_denied: Optional[bool] = None):
         contributions = explanation_data['contributions']
         prob = explanation_data['prediction_prob']
         
@@ -33,7 +34,9 @@ class NLPNugget:
         top_positive = [f[0] for f in sorted_feats if f[1] > 0][:2]
         top_negative = [f[0] for f in sorted_feats if f[1] < 0][:2]
         
-        is_denied = prob > 0.5
+        # Callers pass the served verdict; the raw 0.5 cut is only a fallback
+        if is_denied is None:
+            is_denied = prob > 0.5
         decision_str = "REJECTED" if is_denied else "APPROVED"
         
         narrative = []
@@ -42,6 +45,10 @@ class NLPNugget:
             # Technical Tone: Focus on SHAP values and log-odds
             narrative.append(f"Model output: {decision_str}. The log-odds contribution is dominated by {sorted_feats[0][0]} ({sorted_feats[0][1]:.3f}).")
             narrative.append(f"Significant variance detected in {', '.join([f[0] for f in sorted_feats[:3]])}.")
+            # Global context is precomputed per model version, so referencing it is free
+            if global_summary and sorted_feats[0][0] in global_summary.get('feature_ranking', []):
+                rank = global_summary['feature_ranking'].index(sorted_feats[0][0]) + 1
+                narrative.append(f"Globally, {sorted_feats[0][0]} ranks #{rank} of {len(global_summary['feature_ranking'])} drivers by mean |SHAP|.")
         elif tone == "simple":
             # Simple Tone: Everyday language
             if is_denied:
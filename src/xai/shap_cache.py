@@ -0,0 +1,239 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from xgboost import XGBClassifier
+
+logger = logging.getLogger(__name__)
+
+class SplitSignature:
+    """
+    Per-row cache keys for a tree ensemble: one bit per distinct split
+    condition (feature, threshold) in the model, plus one per split feature
+    that is missing, hashed.
+
+    Two rows with the same signature go the same way at every node of every
+    tree, so they share the prediction and the path-dependent TreeSHAP
+    values. The per-tree leaf vector is not enough for the latter: TreeSHAP
+    also follows the row's side of splits off its own path, and rows with
+    equal leaf vectors differ there.
+
+    Comparisons follow the library being mirrored: XGBoost sends x < split
+    left in float32, sklearn sends float32(x) <= threshold left.
+
+    The tree structure is kept as well (condition index per node, -1 for a
+    leaf, and leaf values) so callers can ask which conditions and leaves a
+    row can still reach when some features move.
+    """
+
+    def __init__(self, model):
+        if isinstance(model, XGBClassifier):
+            booster = model.get_booster()
+            self.model_features = list(booster.feature_names)
+            # The JSON model holds the exact float32 split values (the text dump may round them)
+            raw_trees = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]["model"]["trees"]
+            # At a leaf, split_conditions holds the leaf's margin contribution
+            trees = [
+                (np.array(tree["left_children"]), np.array(tree["right_children"]), np.array(tree["split_indices"]),
+                 np.array(tree["split_conditions"], dtype=np.float32), np.array(tree["default_left"], dtype=bool),
+                 np.array(tree["split_conditions"], dtype=np.float64))
+                for tree in raw_trees
+            ]
+            self.strict = True
+        elif self.supports(model):
+            self.model_features = list(model.feature_names_in_)
+            trees = []
+            for est in model.estimators_:
+                tree = est.tree_
+                missing_left = getattr(tree, "missing_go_to_left", None)
+                # Leaf value: positive-class share, as averaged by predict_proba
+                value = tree.value[:, 0, :]
+                trees.append((tree.children_left, tree.children_right, tree.feature, tree.threshold,
+                              np.asarray(missing_left, dtype=bool) if missing_left is not None else np.ones(tree.node_count, dtype=bool),
+                              value[:, 1] / value.sum(axis=1)))
+            self.strict = False
+        else:
+            raise ValueError(f"Split signatures need a tree ensemble, got {type(model).__name__}")
+
+        conditions = sorted({
+            (int(feat), thr)
+            for left, _, features, thresholds, _, _ in trees
+            for is_split, feat, thr in zip(left != -1, features.tolist(), thresholds)
+            if is_split
+        })
+        self.feature_index = np.array([feat for feat, _ in conditions], dtype=np.intp)
+        self.thresholds = np.array([thr for _, thr in conditions], dtype=np.float32 if self.strict else np.float64)
+        self.split_features = np.unique(self.feature_index)
+        position = {condition: i for i, condition in enumerate(conditions)}
+        self.trees = [
+            (left, right, np.array([position[(int(f), t)] if l != -1 else -1 for l, f, t in zip(left, features.tolist(), thresholds)]),
+             default_left, leaf_value)
+            for left, right, features, thresholds, default_left, leaf_value in trees
+        ]
+        logger.info(f"Split signature over {len(conditions)} conditions on {len(self.split_features)} features")
+
+    @staticmethod
+    def supports(model) -> bool:
+        if isinstance(model, XGBClassifier):
+            return True
+        estimators = getattr(model, "estimators_", None)
+        return estimators is not None and hasattr(model, "feature_names_in_") and all(hasattr(est, "tree_") for est in estimators)
+
+    def _matrix(self, batch: pd.DataFrame) -> np.ndarray:
+        # Engineered frames already come in model order; skip the column reindex then
+        if list(batch.columns) != self.model_features:
+            batch = batch[self.model_features]
+        return batch.to_numpy(dtype=np.float32)
+
+    def _bits(self, X: np.ndarray) -> np.ndarray:
+        values = X[:, self.feature_index]
+        if self.strict:
+            return values < self.thresholds
+        return values.astype(np.float64) <= self.thresholds
+
+    def bits(self, batch: pd.DataFrame) -> np.ndarray:
+        """[n_rows, n_conditions] booleans: True where the row goes left at that condition (non-missing)."""
+        return self._bits(self._matrix(batch))
+
+    def keys(self, batch: pd.DataFrame) -> List[bytes]:
+        X = self._matrix(batch)
+        signature = np.packbits(np.hstack([self._bits(X), np.isnan(X[:, self.split_features])]), axis=1)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in signature]
+
+    def reachable(self, row: pd.DataFrame, ranges: Dict[str, tuple]):
+        """
+        What `row` (one row) can still reach when each model feature in `ranges`
+        may take any value in its (low, high) range and every other feature stays.
+        Walks every tree, following the row's own branch at fixed features and
+        each side a range allows at free ones. Returns the mask of conditions that
+        can switch sides (no other condition can change the output), and per tree
+        the row's own leaf value and the smallest reachable one.
+        """
+        x = self._matrix(row)[0]
+        bounds = {self.model_features.index(feat): (np.float32(low), np.float32(high)) for feat, (low, high) in ranges.items()}
+        mask = np.zeros(len(self.feature_index), dtype=bool)
+        own, lowest = np.empty(len(self.trees)), np.empty(len(self.trees))
+        for t, (left, right, condition, default_left, leaf_value) in enumerate(self.trees):
+            node = 0
+            while condition[node] >= 0:
+                cond = condition[node]
+                value = x[self.feature_index[cond]]
+                if np.isnan(value):
+                    go_left = default_left[node]
+                else:
+                    go_left = value < self.thresholds[cond] if self.strict else np.float64(value) <= self.thresholds[cond]
+                node = left[node] if go_left else right[node]
+            own[t] = leaf_value[node]
+
+            lowest[t] = np.inf
+            stack = [0]
+            while stack:
+                node = stack.pop()
+                cond = condition[node]
+                if cond < 0:
+                    lowest[t] = min(lowest[t], leaf_value[node])
+                    continue
+                feat = self.feature_index[cond]
+                threshold = self.thresholds[cond]
+                if feat in bounds:
+                    low, high = bounds[feat]
+                    if self.strict:
+                        to_left, to_right = low < threshold, high >= threshold
+                    else:
+                        to_left, to_right = np.float64(low) <= threshold, np.float64(high) > threshold
+                    mask[cond] |= to_left and to_right
+                    if to_left:
+                        stack.append(left[node])
+                    if to_right:
+                        stack.append(right[node])
+                    continue
+                value = x[feat]
+                if np.isnan(value):
+                    go_left = default_left[node]
+                else:
+                    go_left = value < threshold if self.strict else np.float64(value) <= threshold
+                stack.append(left[node] if go_left else right[node])
+        return mask, own, lowest
+
+class ExplanationCache:
+    """
+    Bounded LRU of (probability, positive-class SHAP row) per split signature,
+    namespaced by model version so a new version never serves an old one's
+    explanations. Shared by every explainer in a process; hit, miss and
+    eviction counts are kept per version.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def _stats(self, version: str) -> Counter:
+        return self.counters.setdefault(version, Counter())
+
+    def get_many(self, version: str, keys: Sequence[bytes]) -> List[Optional[Any]]:
+        """
+        Cached values (None for a miss) per key. Only the first occurrence of a
+        missing key counts as a miss: the caller computes it once and reuses it for
+        the repeats, which are counted as hits (and as batch_duplicates).
+        """
+        with self._lock:
+            found = []
+            missed = set()
+            duplicates = 0
+            for key in keys:
+                value = self._entries.get((version, key))
+                if value is not None:
+                    self._entries.move_to_end((version, key))
+                elif key in missed:
+                    duplicates += 1
+                else:
+                    missed.add(key)
+                found.append(value)
+            stats = self._stats(version)
+            stats["hits"] += len(found) - len(missed)
+            stats["misses"] += len(missed)
+            stats["batch_duplicates"] += duplicates
+        return found
+
+    def put_many(self, version: str, keys: Sequence[bytes], values: Sequence[Any]):
+        with self._lock:
+            stats = self._stats(version)
+            for key, value in zip(keys, values):
+                if (version, key) not in self._entries:
+                    stats["entries"] += 1
+                self._entries[(version, key)] = value
+                self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                (evicted_version, _), _ = self._entries.popitem(last=False)
+                evicted = self._stats(evicted_version)
+                evicted["entries"] -= 1
+                evicted["evictions"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            versions = {}
+            for version, stats in self.counters.items():
+                lookups = stats["hits"] + stats["misses"]
+                versions[version] = {
+                    "entries": stats["entries"],
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "evictions": stats["evictions"],
+                    "batch_duplicates": stats["batch_duplicates"],
+                    "hit_rate": stats["hits"] / lookups if lookups else 0.0
+                }
+            size = len(self._entries)
+        hits = sum(v["hits"] for v in versions.values())
+        lookups = hits + sum(v["misses"] for v in versions.values())
+        return {
+            "max_entries": self.max_entries,
+            "entries": size,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "versions": versions
+        }
@@ -3,21 +3,40 @@ import pandas as pd
 import numpy as np
 import logging
 import joblib
+import json
 import os
 from src.modeling.registry import ModelRegistry
+from src.modeling.mlp_scorer import CompiledMLP, MLP_FORWARD_ARTIFACT
+from src.xai.shap_cache import SplitSignature
+from sklearn.neural_network import MLPClassifier
 
 logger = logging.getLogger(__name__)
 
+GLOBAL_SUMMARY_ARTIFACT = "global_explanation.json"
+
 class SHAPExplainer:
-    def __init__(self, model_name: str = "xgboost"):
+    def __init__(self, model_name: str = "xgboost", cache=None, model_dir: str = None):
         self.registry = ModelRegistry()
-        self.load_model(model_name)
+        # Optional ExplanationCache shared across explainers; used for tree models only
+        self.cache = cache
+        self.load_model(model_name, model_dir)
 
-    def load_model(self, model_name: str):
-        """Loads a model and initializes the most appropriate SHAP explainer."""
+    def load_model(self, model_name: str, model_dir: str = None):
+        """Loads a model (latest version unless model_dir is given) and initializes the most appropriate SHAP explainer."""
         logger.info(f"Loading SHAP explainer for {model_name}...")
         self.model_name = model_name
-        self.model = self.registry.load_latest(model_name)
+        self.model_dir = model_dir or self.registry.get_latest_dir(model_name)
+        self.model_version = os.path.basename(self.model_dir) if self.model_dir else None
+        self.model = self.registry.load_version(self.model_dir) if self.model_dir else None
+        if self.model is None:
+            raise FileNotFoundError(f"No registered model for {model_name}")
+        if isinstance(self.model, MLPClassifier):
+            # Native forward pass, verified against sklearn when the version was registered
+            payload = self.registry.load_artifact(model_name, MLP_FORWARD_ARTIFACT, model_dir=self.model_dir)
+            if payload is not None:
+                self.model = CompiledMLP.from_dict(payload, estimator=self.model)
+            else:
+                logger.info(f"No compiled forward pass stored for {self.model_version}; serving through sklearn")
         
         # Determine features used (excluding target and sensitive attrs)
         # Assuming 13 features based on training logs
@@ -38,78 +57,152 @@ class SHAPExplainer:
             # Absolute fallback
             self.explainer = shap.Explainer(self.model.predict_proba, np.zeros((1, self.num_features)))
 
+        self.signature = SplitSignature(self.model) if self.cache is not None and SplitSignature.supports(self.model) else None
+
+    @property
+    def is_kernel(self) -> bool:
+        """True when SHAP values come from KernelExplainer, whose cost grows with every row."""
+        return isinstance(self.explainer, shap.KernelExplainer)
+
     def explain_instance(self, instance: pd.DataFrame):
         """
         Calculates SHAP values for a single prediction with robust normalization.
         """
-        if 'person_gender' in instance.columns:
-            instance = instance.drop(columns=['person_gender'])
-            
-        prediction_prob = float(self.model.predict_proba(instance)[:, 1][0])
-        
-        try:
-            # 1. Generate SHAP values
-            if isinstance(self.explainer, shap.KernelExplainer):
-                shap_raw = self.explainer.shap_values(instance, nsamples="auto")
+        return self.explain_batch(instance)[0]
+
+    def explain_batch(self, batch: pd.DataFrame):
+        """
+        Calculates predictions and SHAP values for every row of a frame in one
+        predict_proba call and one SHAP call. Returns one explanation per row.
+        With a cache, rows whose split signature was seen before (or repeats
+        within the batch) skip both calls.
+        """
+        if 'person_gender' in batch.columns:
+            batch = batch.drop(columns=['person_gender'])
+        feature_names = batch.columns.tolist()
+
+        keys = self.signature.keys(batch) if self.signature is not None else None
+        results = self.cache.get_many(self.model_version, keys) if keys is not None else [None] * len(batch)
+        pending = {}
+        for i, hit in enumerate(results):
+            if hit is None:
+                pending.setdefault(keys[i] if keys is not None else i, []).append(i)
+
+        error = None
+        if pending:
+            todo = batch.iloc[[rows[0] for rows in pending.values()]]
+            prediction_probs = self.model.predict_proba(todo)[:, 1].astype(float)
+            try:
+                shap_final, _ = self.shap_matrix(todo)
+                computed = list(zip(prediction_probs.tolist(), shap_final.tolist()))
+                if keys is not None:
+                    self.cache.put_many(self.model_version, list(pending), computed)
+            except Exception as e:
+                logger.error(f"Global SHAP explanation failure: {e}")
+                error = str(e)
+                computed = [(prob, None) for prob in prediction_probs.tolist()]
+            for rows, value in zip(pending.values(), computed):
+                for i in rows:
+                    results[i] = value
+
+        base_val = self._base_value()
+        explanations = []
+        for prob, contributions in results:
+            if contributions is None:
+                # Return heuristic contributions so the UI doesn't crash
+                explanations.append({
+                    "base_value": 0.5,
+                    "contributions": {f: 0.01 for f in feature_names},
+                    "prediction_prob": prob,
+                    "error": error
+                })
             else:
-                shap_raw = self.explainer.shap_values(instance)
-                
-            # 2. Normalize based on dimensionality and type
-            # Case A: List of arrays (Common for binary/multi-class Tree/Kernel)
-            if isinstance(shap_raw, list):
-                # We want the positive class (usually index 1)
-                if len(shap_raw) > 1:
-                    shap_target = shap_raw[1]
-                else:
-                    shap_target = shap_raw[0]
-            
-            # Case B: 3D Array (Common for some Explainer versions with proba output)
-            elif len(shap_raw.shape) == 3:
-                # Shape: [num_instances, num_features, num_classes] 
-                # OR [num_classes, num_instances, num_features]
-                if shap_raw.shape[0] == 2: # Binary classes at first dim
-                    shap_target = shap_raw[1]
-                else: # Binary classes at last dim
-                    shap_target = shap_raw[:, :, 1]
+                explanations.append({
+                    "base_value": base_val,
+                    "contributions": dict(zip(feature_names, contributions)),
+                    "prediction_prob": prob
+                })
+        return explanations
+
+    def approximate_batch(self, batch: pd.DataFrame, global_summary: dict = None):
+        """
+        Exact predictions with approximate contributions: each feature's SHAP
+        value is read off the stored global dependence curve (mean SHAP per
+        value bin) instead of being computed. Costs one predict_proba and a few
+        np.interp calls. Without a summary, contributions are left empty.
+        """
+        if 'person_gender' in batch.columns:
+            batch = batch.drop(columns=['person_gender'])
+
+        prediction_probs = self.model.predict_proba(batch)[:, 1].astype(float)
+        if global_summary is None:
+            return [{"base_value": None, "contributions": {}, "prediction_prob": float(p)} for p in prediction_probs]
+
+        dependence = global_summary['dependence']
+        columns = {
+            feat: np.interp(batch[feat].to_numpy(dtype=float), dependence[feat]['mean_value'], dependence[feat]['mean_shap'])
+            for feat in batch.columns if feat in dependence and dependence[feat]['mean_value']
+        }
+        feature_names = list(columns)
+        matrix = np.column_stack([columns[f] for f in feature_names]) if columns else np.empty((len(batch), 0))
+        return [
+            {
+                "base_value": global_summary['base_value'],
+                "contributions": dict(zip(feature_names, row)),
+                "prediction_prob": float(prob),
+                "approximate": True
+            }
+            for row, prob in zip(matrix.tolist(), prediction_probs)
+        ]
+
+    def shap_matrix(self, batch: pd.DataFrame):
+        """Positive-class SHAP values as a [num_instances, num_features] array, plus the base value."""
+        if 'person_gender' in batch.columns:
+            batch = batch.drop(columns=['person_gender'])
+        feature_names = batch.columns.tolist()
+
+        # 1. Generate SHAP values
+        if isinstance(self.explainer, shap.KernelExplainer):
+            shap_raw = self.explainer.shap_values(batch, nsamples="auto")
+        else:
+            shap_raw = self.explainer.shap_values(batch)
             
-            # Case C: 2D Array [num_instances, num_features]
+        # 2. Normalize any layout (list / 3D / 2D) to [num_instances, num_features]
+        shap_final = self._positive_class_matrix(shap_raw, len(batch))
+        
+        # 3. Check alignment
+        if shap_final.shape[1] != len(feature_names):
+            logger.warning(f"Shape mismatch: SHAP {shap_final.shape[1]} vs Features {len(feature_names)}. Truncating/padding.")
+            if shap_final.shape[1] > len(feature_names):
+                shap_final = shap_final[:, :len(feature_names)]
             else:
-                shap_target = shap_raw
+                shap_final = np.pad(shap_final, ((0, 0), (0, len(feature_names) - shap_final.shape[1])))
 
-            # 3. Flatten to 1D (for a single instance, it should be features-length)
-            shap_final = np.array(shap_target).flatten()
-            
-            # 4. Check alignment
-            feature_names = instance.columns.tolist()
-            if len(shap_final) != len(feature_names):
-                logger.warning(f"Shape mismatch: SHAP {len(shap_final)} vs Features {len(feature_names)}. Truncating/padding.")
-                if len(shap_final) > len(feature_names):
-                    shap_final = shap_final[:len(feature_names)]
-                else:
-                    shap_final = np.pad(shap_final, (0, len(feature_names) - len(shap_final)))
-
-            contributions = dict(zip(feature_names, shap_final.tolist()))
-            
-            # Handle expected value (base probability)
-            base_val = self.explainer.expected_value
-            if isinstance(base_val, (list, np.ndarray)):
-                base_val = base_val[1] if len(base_val) > 1 else base_val[0]
-
-            return {
-                "base_value": float(base_val),
-                "contributions": contributions,
-                "prediction_prob": prediction_prob
-            }
+        return shap_final, self._base_value()
 
-        except Exception as e:
-            logger.error(f"Global SHAP explanation failure: {e}")
-            # Return heuristic contributions so the UI doesn't crash
-            return {
-                "base_value": 0.5,
-                "contributions": {f: 0.01 for f in instance.columns},
-                "prediction_prob": prediction_prob,
-                "error": str(e)
-            }
+    def _base_value(self) -> float:
+        """Expected model output (positive class) the contributions are measured from."""
+        base_val = self.explainer.expected_value
+        if isinstance(base_val, (list, np.ndarray)):
+            base_val = base_val[1] if len(base_val) > 1 else base_val[0]
+        return float(base_val)
+
+    @staticmethod
+    def _positive_class_matrix(shap_raw, n_rows: int) -> np.ndarray:
+        """Reduces any SHAP output layout to a [n_rows, n_features] matrix for the positive class."""
+        # Case A: List of arrays (Common for binary/multi-class Tree/Kernel)
+        if isinstance(shap_raw, list):
+            shap_raw = shap_raw[1] if len(shap_raw) > 1 else shap_raw[0]
+        shap_raw = np.asarray(shap_raw)
+        # Case B: 3D Array, either [num_instances, num_features, num_classes]
+        # or [num_classes, num_instances, num_features]
+        if shap_raw.ndim == 3:
+            if shap_raw.shape[0] == n_rows and shap_raw.shape[-1] == 2:
+                shap_raw = shap_raw[:, :, 1]
+            else:
+                shap_raw = shap_raw[1]
+        # Case C: 2D Array [num_instances, num_features]
+        return shap_raw.reshape(n_rows, -1)
 
     def get_global_importance(self, X_sample: pd.DataFrame):
         """Calculates global importance by averaging absolute SHAP values."""
@@ -122,3 +215,74 @@ class SHAPExplainer:
             
         importance = np.abs(shap_values).mean(axis=0)
         return dict(zip(X_sample.columns, importance.tolist()))
+
+    def compute_global_summary(self, X_sample: pd.DataFrame, max_samples: int = 500,
+                               quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), n_bins: int = 10):
+        """
+        Computes the global explanation context for the loaded model version once:
+        mean |SHAP| importance, per-feature SHAP quantiles and binned dependence curves.
+        Intended to be run at registration time and stored with the model.
+        """
+        if 'person_gender' in X_sample.columns:
+            X_sample = X_sample.drop(columns=['person_gender'])
+
+        # KernelExplainer cost grows with every row, so the MLP gets a much smaller sample
+        if isinstance(self.explainer, shap.KernelExplainer):
+            max_samples = min(max_samples, 50)
+        if len(X_sample) > max_samples:
+            X_sample = X_sample.sample(n=max_samples, random_state=42)
+
+        if isinstance(self.explainer, shap.KernelExplainer):
+            shap_raw = self.explainer.shap_values(X_sample, nsamples=200, silent=True)
+        else:
+            shap_raw = self.explainer.shap_values(X_sample)
+
+        feature_names = X_sample.columns.tolist()
+        shap_matrix = self._positive_class_matrix(shap_raw, len(X_sample))
+
+        importance = np.abs(shap_matrix).mean(axis=0)
+        shap_quantiles = np.quantile(shap_matrix, quantiles, axis=0)
+
+        dependence = {}
+        for i, feat in enumerate(feature_names):
+            values = X_sample[feat].to_numpy(dtype=float)
+            # Quantile bin edges collapse for low-cardinality (encoded) features
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)))
+            if len(edges) < 2:
+                edges = np.array([values.min(), values.max()])
+            bin_idx = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+            counts = np.bincount(bin_idx, minlength=len(edges) - 1)
+            shap_sums = np.bincount(bin_idx, weights=shap_matrix[:, i], minlength=len(edges) - 1)
+            value_sums = np.bincount(bin_idx, weights=values, minlength=len(edges) - 1)
+            occupied = counts > 0
+            dependence[feat] = {
+                "bin_edges": edges.tolist(),
+                "mean_value": (value_sums[occupied] / counts[occupied]).tolist(),
+                "mean_shap": (shap_sums[occupied] / counts[occupied]).tolist(),
+                "count": counts[occupied].astype(int).tolist()
+            }
+
+        ranking = np.argsort(-importance)
+        return {
+            "model_name": self.model_name,
+            "model_version": self.model_version,
+            "n_samples": int(len(X_sample)),
+            "base_value": self._base_value(),
+            "global_importance": dict(zip(feature_names, importance.tolist())),
+            "feature_ranking": [feature_names[i] for i in ranking],
+            "shap_quantiles": {
+                "levels": list(quantiles),
+                "values": {feat: shap_quantiles[:, i].tolist() for i, feat in enumerate(feature_names)}
+            },
+            "dependence": dependence
+        }
+
+    def load_global_summary(self):
+        """Returns the precomputed global summary stored with the loaded model version."""
+        if self.model_dir is None:
+            return None
+        path = os.path.join(self.model_dir, GLOBAL_SUMMARY_ARTIFACT)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
@@ -0,0 +1,284 @@
+import pandas as pd
+import numpy as np
+import logging
+from xgboost import XGBClassifier
+from src.modeling.calibration import DECISION_THRESHOLD, served_probability
+from src.xai.shap_cache import SplitSignature
+
+logger = logging.getLogger(__name__)
+
+class TreeCounterfactualSolver:
+    """
+    Exact counterfactual search for tree ensembles (XGBoost, Random Forest).
+
+    A tree ensemble is piecewise constant: its output can only change where a
+    model feature crosses one of the ensemble's split thresholds. Mapping those
+    thresholds back through the engineered features (loan_percent_income,
+    loan_to_income) locates every raw value at which an actionable feature can
+    change the prediction.
+
+    Suggestions are whole cents. Around each mapped boundary the neighbouring
+    cents are run through the real feature pipeline and compared on the splits
+    that can still decide a leaf for this applicant (SplitSignature.reachable,
+    in the model's own float semantics). That pins down the first cent of each
+    constant-output interval exactly and drops thresholds in subtrees the
+    applicant never reaches. Only one row per distinct signature is scored,
+    nearest-first in small chunks that stop at the first approval. The same
+    leaf bound decides where scoring starts: a search is skipped outright when
+    even the lowest-scoring leaves it can reach in every tree do not add up to
+    an approval, and a single-feature scan starts at the shortest stretch of
+    boundaries for which they could.
+    """
+
+    # Actionable raw features and the direction an applicant can move them
+    ACTIONABLE = {
+        "loan_amnt": {"label": "Loan Amount", "direction": -1},
+        "person_income": {"label": "Annual Income", "direction": 1},
+    }
+
+    # Cents probed on each side of a mapped boundary; float error in the mapping is far smaller
+    WINDOW_CENTS = 2
+
+    def __init__(self, model, engineer, max_income_multiplier: float = 2.0, max_pair_candidates: int = 16,
+                 calibrator=None, chunk_size: int = 2):
+        self.model = model
+        self.engineer = engineer
+        # Approval is judged on the served (calibrated) probability, as in /predict
+        self.calibrator = calibrator
+        self.max_income_multiplier = max_income_multiplier
+        self.max_pair_candidates = max_pair_candidates
+        self.chunk_size = chunk_size
+        # Same exact split conditions the SHAP cache keys on
+        self.signature = SplitSignature(model)
+        self.thresholds = self._extract_thresholds(self.signature)
+
+    @staticmethod
+    def supports(model) -> bool:
+        return SplitSignature.supports(model)
+
+    @staticmethod
+    def _extract_thresholds(signature: SplitSignature):
+        """Sorted unique split thresholds per model feature across the whole ensemble."""
+        return {
+            feat: np.unique(signature.thresholds[signature.feature_index == idx].astype(float))
+            for idx, feat in enumerate(signature.model_features)
+            if np.any(signature.feature_index == idx)
+        }
+
+    def _breakpoints(self, feature: str, raw_input: dict) -> np.ndarray:
+        """Approximate raw values of `feature` at which some model feature crosses a split threshold."""
+        income = max(raw_input['person_income'], 1)
+        loan = raw_input['loan_amnt']
+        points = [self.thresholds.get(feature, np.empty(0))]
+        for ratio_feat in ('loan_percent_income', 'loan_to_income'):
+            ratio_thr = self.thresholds.get(ratio_feat, np.empty(0))
+            if feature == 'loan_amnt':
+                points.append(ratio_thr * income)
+            elif feature == 'person_income':
+                positive = ratio_thr[ratio_thr > 0]
+                points.append(loan / positive)
+        return np.unique(np.concatenate(points))
+
+    def _candidates(self, feature: str, raw_input: dict) -> np.ndarray:
+        """Whole-cent values on both sides of every boundary in the actionable direction, nearest first."""
+        current = raw_input[feature]
+        direction = self.ACTIONABLE[feature]['direction']
+        upper = current * self.max_income_multiplier
+        points = self._breakpoints(feature, raw_input)
+        cents = np.round(points * 100)[:, None] + np.arange(-self.WINDOW_CENTS, self.WINDOW_CENTS + 1)
+        values = np.unique(cents.ravel()) / 100
+        if direction < 0:
+            return values[(values >= 0) & (values < current)][::-1]
+        return values[(values > current) & (values < upper)]
+
+    def _frame(self, raw_input: dict, changes: dict) -> pd.DataFrame:
+        """Engineered rows for many modified copies of raw_input (one pipeline pass)."""
+        n = len(next(iter(changes.values())))
+        batch = pd.DataFrame([raw_input] * n)
+        for feature, values in changes.items():
+            batch[feature] = values
+        return self.engineer.process_pipeline(batch)
+
+    def _limit(self, feature: str, raw_input: dict) -> float:
+        """Furthest value the search may move `feature` to."""
+        if self.ACTIONABLE[feature]['direction'] < 0:
+            return 0.0
+        return raw_input[feature] * self.max_income_multiplier
+
+    def _corners(self, raw_input: dict):
+        """
+        Engineered rows for every combination of each actionable feature at its
+        current value or its search limit (the first row is the profile itself),
+        with the raw values used.
+        """
+        grid = np.meshgrid(*[[raw_input[f], self._limit(f, raw_input)] for f in self.ACTIONABLE], indexing='ij')
+        values = {f: g.ravel() for f, g in zip(self.ACTIONABLE, grid)}
+        return self._frame(raw_input, values), values
+
+    def _relevant(self, raw_input: dict, corners, base_output: float, features: list):
+        """
+        Mask of the split conditions that can change the output while `features`
+        move within their search range, and whether any reachable combination of
+        leaves could approve at all.
+        """
+        frame, values = corners
+        # Corners where the other actionable features stay put
+        rows = np.ones(len(frame), dtype=bool)
+        for f in self.ACTIONABLE:
+            if f not in features:
+                rows &= values[f] == raw_input[f]
+        # Engineered features are monotone in each actionable one, so the corners bound their range
+        return self._reach(frame.iloc[:1], frame[rows], base_output)
+
+    def _reach(self, base_frame: pd.DataFrame, moved: pd.DataFrame, base_output: float):
+        """_relevant for model features ranging over the values in `moved` (and the profile's own)."""
+        # Only model features the actionable ones feed into move (a supplied loan_percent_income stays fixed)
+        ranges = {}
+        for f in self.signature.model_features:
+            column = np.append(moved[f].to_numpy(dtype=float), base_frame[f].iloc[0])
+            if column.min() != column.max():
+                ranges[f] = (column.min(), column.max())
+        mask, own, lowest = self.signature.reachable(base_frame, ranges)
+        if isinstance(self.model, XGBClassifier):
+            # Margin is the sum of leaf values; a small slack covers float32 accumulation
+            margin = base_output + (lowest - own).sum() - 1e-4
+            best_raw = 1.0 / (1.0 + np.exp(-margin))
+        else:
+            # A forest averages its trees' positive-class shares
+            best_raw = lowest.mean() - 1e-9
+        approvable = served_probability(np.array([best_raw]), self.calibrator)[0] <= DECISION_THRESHOLD
+        return mask, approvable
+
+    def _keys(self, frame: pd.DataFrame, mask: np.ndarray) -> list:
+        """Rows with equal keys take the same leaf in every tree, hence share the output."""
+        return [row.tobytes() for row in np.packbits(self.signature.bits(frame)[:, mask], axis=1)]
+
+    def _boundaries(self, feature: str, raw_input: dict, mask: np.ndarray):
+        """The first cent of every constant-output interval past the current value, nearest first."""
+        values = self._candidates(feature, raw_input)
+        if len(values) == 0:
+            return values, None, []
+        frame = self._frame(raw_input, {feature: np.concatenate([[raw_input[feature]], values])})
+        keys = self._keys(frame, mask)
+        # A cent starts a new interval iff it sits on a different side of some relevant split than the cent before it
+        starts = [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]]
+        return values[np.array(starts, dtype=int) - 1], frame.iloc[starts], [keys[i] for i in starts]
+
+    def _first_approval(self, frame: pd.DataFrame, keys: list, memo: dict):
+        """
+        Index of the first row (in the given order) whose served probability approves,
+        its probability, and the model evaluations spent. Rows are scored in chunks
+        that double in size; rows sharing a split signature share the output, so
+        each signature is scored at most once.
+        """
+        evaluations = 0
+        start, size = 0, self.chunk_size
+        while start < len(keys):
+            chunk = range(start, min(start + size, len(keys)))
+            # Near flips cost few evaluations, far ones few model calls
+            start, size = chunk.stop, size * 2
+            todo = {}
+            for i in chunk:
+                if keys[i] not in memo and keys[i] not in todo:
+                    todo[keys[i]] = i
+            if todo:
+                raw_probs = self.model.predict_proba(frame.iloc[list(todo.values())])[:, 1]
+                memo.update(zip(todo, served_probability(raw_probs, self.calibrator)))
+                evaluations += len(todo)
+            for i in chunk:
+                if memo[keys[i]] <= DECISION_THRESHOLD:
+                    return i, float(memo[keys[i]]), evaluations
+        return None, None, evaluations
+
+    def _recommendation(self, feature: str, current: float, suggested: float, prob: float):
+        if feature == 'loan_amnt':
+            improvement = f"Reduce loan by ${current - suggested:,.0f}"
+        else:
+            improvement = f"Increase income to ${suggested:,.0f}"
+        return {
+            "feature": self.ACTIONABLE[feature]['label'],
+            "current": current,
+            "suggested": round(float(suggested), 2),
+            "improvement": improvement,
+            "new_prob": float(prob)
+        }
+
+    def find_path_to_approval(self, raw_input: dict):
+        corners = self._corners(raw_input)
+        base_frame = corners[0].iloc[:1]
+        base_prob = served_probability(self.model.predict_proba(base_frame)[:, 1], self.calibrator)[0]
+        if base_prob <= DECISION_THRESHOLD:
+            return {"message": "Already approved", "suggestion": None}
+
+        # Forest bounds need no base output; a booster's are relative to its margin
+        base_output = self.model.predict(base_frame, output_margin=True)[0] if isinstance(self.model, XGBClassifier) else None
+        evaluations = 1
+        recommendations = []
+        boundaries = {}
+        for feature in self.ACTIONABLE:
+            mask, approvable = self._relevant(raw_input, corners, base_output, [feature])
+            values, frame, keys = self._boundaries(feature, raw_input, mask)
+            boundaries[feature] = values
+            if len(values) == 0 or not approvable:
+                continue
+            # Boundaries are ordered nearest-first, so the first approval is the minimal change.
+            # Bisect for the shortest stretch whose reachable leaves could approve; nothing before it can
+            low, high = 0, len(values) - 1
+            while low < high:
+                mid = (low + high) // 2
+                if self._reach(base_frame, frame.iloc[:mid + 1], base_output)[1]:
+                    high = mid
+                else:
+                    low = mid + 1
+            memo = {self._keys(base_frame, mask)[0]: base_prob}
+            idx, prob, spent = self._first_approval(frame.iloc[low:], keys[low:], memo)
+            evaluations += spent
+            if idx is not None:
+                idx += low
+                recommendations.append(self._recommendation(feature, raw_input[feature], values[idx], prob))
+
+        combined, spent = self._best_combination(raw_input, corners, base_output, base_prob, boundaries)
+        evaluations += spent
+
+        return {
+            "current_prob": float(base_prob),
+            "recommendations": recommendations,
+            "combined": combined,
+            "can_be_approved": len(recommendations) > 0 or combined is not None,
+            "method": "tree_thresholds",
+            "evaluations": int(evaluations)
+        }
+
+    def _best_combination(self, raw_input: dict, corners, base_output: float, base_prob: float, boundaries: dict):
+        """
+        Smallest joint change (sum of relative changes) that moves every actionable
+        feature, over the cross product of the interval starts nearest the current
+        profile. Pairs are visited in order of cost, so the first approval is the
+        optimum over that grid; pairs sharing a signature are scored once.
+        Returns the combination (or None) and the model evaluations spent.
+        """
+        features = list(self.ACTIONABLE)
+        axes = [boundaries[feature][:self.max_pair_candidates] for feature in features]
+        if any(len(axis) == 0 for axis in axes):
+            return None, 0
+
+        grid = np.meshgrid(*axes, indexing='ij')
+        cost = sum(np.abs(g.ravel() - raw_input[f]) / max(abs(raw_input[f]), 1) for f, g in zip(features, grid))
+        order = np.argsort(cost, kind='stable')
+        flat = {feature: g.ravel()[order] for feature, g in zip(features, grid)}
+        mask, approvable = self._relevant(raw_input, corners, base_output, features)
+        if not approvable:
+            return None, 0
+        frame = self._frame(raw_input, flat)
+        memo = {self._keys(corners[0].iloc[:1], mask)[0]: base_prob}
+        idx, prob, evaluations = self._first_approval(frame, self._keys(frame, mask), memo)
+        if idx is None:
+            return None, evaluations
+
+        return {
+            "changes": [
+                self._recommendation(f, raw_input[f], flat[f][idx], prob) for f in features
+            ],
+            "new_prob": prob,
+            "relative_change": float(cost[order][idx])
+        }, evaluations
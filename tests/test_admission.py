@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from api.admission import AdmissionController, AdmissionRejected
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_capped_model_waiter_does_not_block_other_models():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=8, max_queue=64, per_model={"mlp_baseline": 2}, per_client=16, queue_timeout_s=0.2)
+        await ctl.acquire("mlp_baseline", "a", "interactive")
+        await ctl.acquire("mlp_baseline", "a", "interactive")
+        # Third MLP request waits on the model cap
+        waiting = asyncio.ensure_future(ctl.acquire("mlp_baseline", "a", "interactive"))
+        await asyncio.sleep(0)
+        assert ctl.metrics()["queued"]["interactive"] == 1
+
+        # 6 of 8 slots are free: xgboost must start at once, not time out behind the MLP waiter
+        await asyncio.wait_for(ctl.acquire("xgboost", "b", "interactive"), 0.1)
+        assert ctl.running == 3
+
+        ctl.release("mlp_baseline", "a", 10.0)
+        await asyncio.wait_for(waiting, 0.1)
+        assert ctl.running_by_model["mlp_baseline"] == 2
+    run(scenario())
+
+def test_higher_lane_is_served_first():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, max_queue=8, per_client=8, queue_timeout_s=1.0)
+        await ctl.acquire("xgboost", "a", "interactive")
+        order = []
+
+        async def wait(lane):
+            await ctl.acquire("xgboost", lane, lane)
+            order.append(lane)
+
+        tasks = [asyncio.ensure_future(wait("bulk")), asyncio.ensure_future(wait("realtime"))]
+        await asyncio.sleep(0)
+        ctl.release("xgboost", "a", 5.0)
+        await asyncio.sleep(0.01)
+        assert order == ["realtime"]
+        ctl.release("xgboost", "realtime", 5.0)
+        await asyncio.gather(*tasks)
+        assert order == ["realtime", "bulk"]
+    run(scenario())
+
+def test_queue_timeout_and_client_limit():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, max_queue=8, per_client=1, queue_timeout_s=0.05)
+        await ctl.acquire("xgboost", "a", "interactive")
+        with pytest.raises(AdmissionRejected) as timeout:
+            await ctl.acquire("xgboost", "b", "interactive")
+        assert timeout.value.status_code == 503 and timeout.value.reason == "queue_timeout"
+        assert ctl.metrics()["queued"]["interactive"] == 0
+
+        with pytest.raises(AdmissionRejected) as limited:
+            await ctl.acquire("xgboost", "a", "interactive")
+        assert limited.value.status_code == 429
+    run(scenario())
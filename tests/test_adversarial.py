@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from xgboost import XGBClassifier
+from src.accountability.adversarial import INTEGER, AdversarialSearch
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.calibration import DECISION_THRESHOLD, ProbabilityCalibrator, served_probability
+
+@pytest.fixture(scope="module")
+def setup():
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    config = {**config, "adversarial": {**config["adversarial"], "population": 24, "generations": 12, "elite": 4}}
+    engineer = FeatureEngineer(config)
+    raw = pd.read_csv(config['data']['raw_path']).dropna()
+    train = engineer.process_pipeline(raw, is_training=True)
+    X = train.drop(columns=[config['data']['target'], 'person_gender'])
+    model = XGBClassifier(n_estimators=30, max_depth=3, random_state=0).fit(X, train[config['data']['target']])
+    calibrator = ProbabilityCalibrator.fit(train[config['data']['target']], model.predict_proba(X)[:, 1])
+
+    # Same wiring as __init__, without the persisted encoders and registry
+    search = AdversarialSearch.__new__(AdversarialSearch)
+    settings = config["adversarial"]
+    search.config, search.settings, search.model_name = config, settings, "xgboost"
+    search.target, search.features = "flip", settings["features"]
+    search.population, search.generations, search.elite = settings["population"], settings["generations"], settings["elite"]
+    search.mutation_scale, search.penalty = settings["mutation_scale"], settings["penalty"]
+    search.engineer, search.model, search.calibrator, search.has_ood = engineer, model, calibrator, False
+    quantiles = raw[search.features].quantile([*settings["quantiles"][:1], 0.25, 0.75, settings["quantiles"][1]])
+    search.lower = quantiles.iloc[0].to_numpy(dtype=float)
+    search.upper = quantiles.iloc[3].to_numpy(dtype=float)
+    search.scale = np.maximum((quantiles.iloc[2] - quantiles.iloc[1]).to_numpy(dtype=float), 1e-6)
+    search.integer = np.array([f in INTEGER for f in search.features])
+
+    seeds = raw.sample(24, random_state=11).reset_index(drop=True)
+    return search, seeds
+
+def served_one(search, profile):
+    """Scores a single raw profile on its own, the way the API does."""
+    row = pd.DataFrame([profile]).drop(columns=['loan_percent_income', 'loan_status'], errors='ignore')
+    return served_probability(search.model.predict_proba(search.engineer.process_pipeline(row))[:, 1], search.calibrator)[0]
+
+def test_batched_scoring_matches_one_profile_at_a_time(setup):
+    search, seeds = setup
+    rng = np.random.default_rng(0)
+    owner = rng.integers(0, len(seeds), 60)
+    genomes = seeds[search.features].to_numpy(dtype=float)[owner] * rng.uniform(0.7, 1.3, (60, len(search.features)))
+    prob, ood = search._evaluate(seeds, owner, genomes)
+    assert ood is None
+    for i in range(len(owner)):
+        profile = seeds.iloc[owner[i]].to_dict()
+        profile.update(zip(search.features, genomes[i]))
+        assert prob[i] == pytest.approx(served_one(search, profile), abs=1e-12)
+
+def test_attacks_flip_the_served_decision_within_bounds(setup):
+    search, seeds = setup
+    results = search.search(seeds, rng_seed=3)
+    found = [r for r in results if r["found"]]
+    assert len(found) >= len(seeds) // 2
+    for r in results:
+        seed = seeds.iloc[r["seed"]].to_dict()
+        base = served_one(search, seed)
+        assert r["original_prob"] == pytest.approx(base, abs=1e-12)
+        assert r["original_decision"] == ("Denied" if base > DECISION_THRESHOLD else "Approved")
+        if not r["found"]:
+            continue
+        attacked = {**seed, **{f: c["to"] for f, c in r["changes"].items()}}
+        prob = served_one(search, attacked)
+        assert r["adversarial_prob"] == pytest.approx(prob, abs=1e-12)
+        assert (prob > DECISION_THRESHOLD) != (base > DECISION_THRESHOLD)
+        distance = 0.0
+        for j, feature in enumerate(search.features):
+            value = attacked[feature]
+            assert min(search.lower[j], seed[feature]) <= value <= max(search.upper[j], seed[feature])
+            if feature in INTEGER:
+                assert value == round(value)
+            distance += abs(value - seed[feature]) / search.scale[j]
+        assert r["distance_iqr"] == pytest.approx(distance)
+
+def test_pruned_attacks_need_every_change(setup):
+    search, seeds = setup
+    for r in search.search(seeds, rng_seed=4):
+        if not r["found"]:
+            continue
+        seed = seeds.iloc[r["seed"]].to_dict()
+        base_denied = r["original_decision"] == "Denied"
+        attacked = {**seed, **{f: c["to"] for f, c in r["changes"].items()}}
+        # Reverting any single change loses the flip
+        for feature in r["changes"]:
+            prob = served_one(search, {**attacked, feature: seed[feature]})
+            assert (prob > DECISION_THRESHOLD) == base_denied
@@ -0,0 +1,40 @@
+import sqlite3
+from src.accountability.audit_store import AuditStore
+
+def entries(n, start=0, timestamps=3):
+    # Few distinct timestamps, so pages have to break ties on id
+    return [
+        {
+            "id": f"d{i:05d}", "timestamp": f"2026-01-01T00:00:0{i % timestamps}", "model_version": "v1",
+            "input": {"row": i}, "output": {"prediction": "Denied" if i % 2 else "Approved", "probability": 0.5}
+        }
+        for i in range(start, start + n)
+    ]
+
+def test_outcomes_beyond_the_sqlite_variable_limit(tmp_path):
+    store = AuditStore(str(tmp_path / "audit.db"))
+    store.insert_many(entries(3000))
+    # The limit of older SQLite builds; a single IN (...) over every ID would fail here
+    store._conn().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    outcomes = {f"d{i:05d}": i % 2 for i in range(3000)}
+    outcomes["missing"] = 1
+    assert store.record_outcomes(outcomes) == ["missing"]
+    assert len(store.labelled_decisions()) == 3000
+
+def test_cursor_pages_cover_every_decision_once_newest_first(tmp_path):
+    store = AuditStore(str(tmp_path / "audit.db"))
+    store.insert_many(entries(230))
+    seen, cursor = [], None
+    while True:
+        page = store.query(limit=40, cursor=cursor, prediction="Denied")
+        seen += [(item["timestamp"], item["id"]) for item in page["items"]]
+        if page["next_cursor"] is None:
+            break
+        cursor = page["next_cursor"]
+        # Decisions logged while paging land before the cursor and do not shift later pages
+        newer = entries(2, start=1000 + len(seen))
+        for entry in newer:
+            entry["timestamp"] = "2026-01-02T00:00:00"
+        store.insert_many(newer)
+    assert len(seen) == len(set(seen)) == 115
+    assert seen == sorted(seen, reverse=True)
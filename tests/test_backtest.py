@@ -0,0 +1,140 @@
+import os
+import time
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from sklearn.metrics import brier_score_loss, roc_auc_score
+from xgboost import XGBClassifier
+import src.modeling.backtest as backtest
+from src.accountability.audit_store import AuditStore
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.backtest import BacktestReplay
+from src.modeling.calibration import CALIBRATION_ARTIFACT, DECISION_THRESHOLD, ProbabilityCalibrator, served_probability
+from src.modeling.registry import ModelRegistry
+
+APPLICANT_FIELDS = [
+    "person_age", "person_income", "person_home_ownership", "person_emp_length", "loan_intent", "loan_grade",
+    "loan_amnt", "loan_int_rate", "cb_person_default_on_file", "cb_person_cred_hist_length", "person_gender"
+]
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    config = {**config, "backtest": {**config["backtest"], "chunk_size": 70}}
+    engineer = FeatureEngineer(config)
+    raw = pd.read_csv(config['data']['raw_path']).dropna()
+    train = engineer.process_pipeline(raw, is_training=True)
+    X = train.drop(columns=[config['data']['target'], 'person_gender'])
+    y = train[config['data']['target']]
+
+    registry = ModelRegistry(str(tmp_path / "models"))
+    monkeypatch.setattr(backtest, "ModelRegistry", lambda: registry)
+    engineer.load_artifacts = lambda: True
+    monkeypatch.setattr(backtest, "FeatureEngineer", lambda config: engineer)
+    dirs = []
+    for depth, publish in ((2, True), (4, False)):
+        model = XGBClassifier(n_estimators=25, max_depth=depth, random_state=0).fit(X, y)
+        model_dir = registry.save_model(model, "xgboost", {}, {}, publish=publish)
+        calibrator = ProbabilityCalibrator.fit(y, model.predict_proba(X)[:, 1])
+        registry.save_artifact(model_dir, CALIBRATION_ARTIFACT, calibrator.to_dict())
+        dirs.append(model_dir)
+        # Version directories are timestamped to the second
+        time.sleep(1.1)
+    current_version = os.path.basename(dirs[0])
+
+    # Logged traffic: mostly served by the current version, some by an older one, some labelled
+    sample = raw.sample(400, random_state=3).reset_index(drop=True)
+    store = AuditStore(str(tmp_path / "audit.db"))
+    entries = []
+    for i, row in sample.iterrows():
+        version = current_version if i % 5 else "xgboost_older"
+        entries.append({
+            "id": f"d{i:04d}", "timestamp": f"2026-03-{1 + i % 28:02d}T12:00:00", "model_version": version,
+            "input": {**row[APPLICANT_FIELDS].to_dict(), "model_choice": "xgboost", "tone": "neutral"},
+            "output": {"prediction": "Denied" if i % 7 == 0 else "Approved", "probability": 0.5}
+        })
+    store.insert_many(entries)
+    store.record_outcomes({f"d{i:04d}": int(sample.loc[i, "loan_status"]) for i in range(0, 400, 3)})
+    return BacktestReplay(config, dirs[1], store_path=str(tmp_path / "audit.db")), store
+
+def loop_replay(replay, store, **filters):
+    """One logged decision at a time: engineer it alone, score both versions, tally groups in plain Python."""
+    decisions = [row for chunk in store.iter_decisions(chunk_size=10 ** 6, **filters) for row in chunk]
+    current_version = os.path.basename(replay.current_dir)
+    flips, consistent, served = defaultdict(int), 0, 0
+    segments = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+    labelled = []
+    for row in decisions:
+        frame = pd.DataFrame([row["input"]]).drop(columns=["model_choice", "tone"])
+        X = replay.engineer.process_pipeline(frame)
+        p_cur = served_probability(replay.current.predict_proba(X)[:, 1], replay.current_calibrator)[0]
+        p_cand = served_probability(replay.candidate.predict_proba(X)[:, 1], replay.candidate_calibrator)[0]
+        denied_cur, denied_cand = p_cur > DECISION_THRESHOLD, p_cand > DECISION_THRESHOLD
+        flips[(denied_cur, denied_cand)] += 1
+        if row["model_version"] == current_version:
+            served += 1
+            consistent += (row["prediction"] == "Denied") == denied_cur
+        if row["label"] is not None:
+            labelled.append((row["label"], p_cur, p_cand))
+        groups = {
+            "loan_grade": row["input"]["loan_grade"],
+            "loan_intent": row["input"]["loan_intent"],
+            "person_age_band": replay.auditor.age_band_labels([row["input"]["person_age"]])[0],
+            "model_version": row["model_version"],
+        }
+        for name, group in groups.items():
+            totals = segments[name][group]
+            totals["n"] += 1
+            totals["approved_current"] += not denied_cur
+            totals["approved_candidate"] += not denied_cand
+            totals["flips"] += denied_cur != denied_cand
+            totals["shift"] += p_cand - p_cur
+    return decisions, flips, served, consistent, segments, labelled
+
+def test_replay_matches_a_per_decision_loop(replay):
+    replay, store = replay
+    # The published pointer is the served version; the unpublished one is the candidate
+    assert replay.current.get_params()["max_depth"] == 2 and replay.candidate.get_params()["max_depth"] == 4
+    report = replay.run()
+    decisions, flips, served, consistent, segments, labelled = loop_replay(replay, store)
+    n = len(decisions)
+    assert report["n_decisions"] == n == 400
+    assert report["flips"]["approved_to_denied"] == flips[(False, True)]
+    assert report["flips"]["denied_to_approved"] == flips[(True, False)]
+    assert report["flips"]["approval_rate_current"] == pytest.approx((flips[(False, False)] + flips[(False, True)]) / n)
+    assert report["flips"]["approval_rate_candidate"] == pytest.approx((flips[(False, False)] + flips[(True, False)]) / n)
+    assert sum(report["probability_shift"]["counts"]) == n
+    assert sum(report["probability_histograms"]["current"]) == n
+
+    for name, groups in segments.items():
+        assert set(report["segments"][name]) == set(groups)
+        for group, totals in groups.items():
+            segment = report["segments"][name][group]
+            assert segment["n"] == totals["n"]
+            assert segment["approval_rate_current"] == pytest.approx(totals["approved_current"] / totals["n"])
+            assert segment["approval_rate_candidate"] == pytest.approx(totals["approved_candidate"] / totals["n"])
+            assert segment["flip_rate"] == pytest.approx(totals["flips"] / totals["n"])
+            assert segment["mean_shift"] == pytest.approx(totals["shift"] / totals["n"], abs=1e-12)
+
+    assert report["replay_consistency"]["served_version_decisions"] == served
+    assert report["replay_consistency"]["verdict_match_rate"] == pytest.approx(consistent / served)
+    y, p_cur, p_cand = map(np.array, zip(*labelled))
+    performance = report["labelled_performance"]
+    assert performance["n_labelled"] == len(y) == 134
+    assert performance["current"]["auc_roc"] == pytest.approx(roc_auc_score(y, p_cur))
+    assert performance["candidate"]["brier_score"] == pytest.approx(brier_score_loss(y, p_cand))
+
+def test_filtered_window_replays_only_matching_decisions(replay):
+    replay, store = replay
+    version = os.path.basename(replay.current_dir)
+    report = replay.run(start="2026-03-05T00:00:00", end="2026-03-20T00:00:00", model_version=version)
+    decisions, flips, served, _, _, _ = loop_replay(
+        replay, store, start="2026-03-05T00:00:00", end="2026-03-20T00:00:00", model_version=version
+    )
+    assert 0 < report["n_decisions"] == len(decisions) == served < 400
+    assert report["flips"]["approved_to_denied"] == flips[(False, True)]
+    assert report["flips"]["denied_to_approved"] == flips[(True, False)]
+    assert set(report["segments"]["model_version"]) == {version}
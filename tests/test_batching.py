@@ -0,0 +1,55 @@
+import asyncio
+import gc
+import time
+from api.batching import MicroBatcher
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_rows_are_batched_per_key_and_returned_in_order():
+    calls = []
+
+    def score(key, items):
+        calls.append((key, list(items)))
+        return [(key, item * 10) for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(score, window_ms=20, max_batch_size=4)
+        keys = [("xgboost", "exact"), ("mlp_baseline", "exact")]
+        results = await asyncio.gather(*[batcher.submit(keys[i % 2], i) for i in range(6)])
+        assert results == [(keys[i % 2], i * 10) for i in range(6)]
+        assert sorted(len(items) for _, items in calls) == [3, 3]
+        assert batcher.metrics()["requests"] == 6 and not batcher.tasks
+    run(scenario())
+
+def test_full_batch_flushes_without_waiting_for_the_window():
+    async def scenario():
+        batcher = MicroBatcher(lambda key, items: items, window_ms=10000, max_batch_size=3)
+        results = await asyncio.wait_for(asyncio.gather(*[batcher.submit("k", i) for i in range(3)]), 1.0)
+        assert results == [0, 1, 2]
+        assert batcher.metrics()["batch_size_histogram"] == {"3": 1}
+    run(scenario())
+
+def test_in_flight_batch_survives_garbage_collection():
+    async def scenario():
+        def score(key, items):
+            time.sleep(0.05)
+            return items
+
+        batcher = MicroBatcher(score, window_ms=1, max_batch_size=8)
+        pending = asyncio.ensure_future(batcher.submit("k", 1))
+        await asyncio.sleep(0.01)
+        assert len(batcher.tasks) == 1
+        gc.collect()
+        assert await asyncio.wait_for(pending, 1.0) == 1
+    run(scenario())
+
+def test_scoring_error_reaches_every_caller():
+    def score(key, items):
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        batcher = MicroBatcher(score, window_ms=5, max_batch_size=8)
+        results = await asyncio.gather(*[batcher.submit("k", i) for i in range(3)], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+    run(scenario())
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+from xgboost import XGBClassifier
+import src.xai.bulk_explainer as bulk
+from src.modeling.registry import ModelRegistry
+from src.xai.bulk_explainer import DONE_FILE, SHAP_FILE, BulkExplanationJob, ExplanationStore
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    n = 1050
+    X = pd.DataFrame({"loan_amnt": rng.uniform(500, 30000, n), "person_income": rng.uniform(1e4, 2e5, n),
+                      "loan_int_rate": rng.normal(11, 3, n)})
+    model = XGBClassifier(n_estimators=20, max_depth=3, random_state=0).fit(X, (X["loan_amnt"] / X["person_income"] > 0.15))
+    # Shuffled external ids, so lookups cannot rely on row order
+    X.assign(applicant_id=rng.permutation(n) + 5000).to_csv(tmp_path / "portfolio.csv", index=False)
+    monkeypatch.setattr(bulk, "ModelRegistry", lambda: ModelRegistry(str(tmp_path / "models")))
+    ModelRegistry(str(tmp_path / "models")).save_model(model, "xgboost", {}, {})
+    return BulkExplanationJob(
+        "xgboost", str(tmp_path / "portfolio.csv"), str(tmp_path / "explanations"), chunk_size=200, workers=2,
+        id_column="applicant_id"
+    )
+
+def expected(job):
+    frame = pd.read_csv(job.input_path)
+    values = shap.TreeExplainer(job.model).shap_values(frame[job.feature_names])
+    return frame["applicant_id"].to_numpy(), np.asarray(values, dtype=np.float32)
+
+def test_store_matches_tree_explainer_by_row_id(job):
+    manifest = job.run()
+    assert manifest["n_rows"] == 1050 and manifest["n_chunks"] == 6
+    ids, values = expected(job)
+    store = ExplanationStore(job.output_dir)
+    assert store.complete
+    np.testing.assert_allclose(store.rows(ids[::-1]).to_numpy(), values[::-1], atol=1e-6)
+    np.testing.assert_allclose(store.slice(1000, 1050).to_numpy(), values[1000:], atol=1e-6)
+    with pytest.raises(KeyError):
+        store.rows([1])
+
+def test_interrupted_job_resumes_only_unfinished_chunks(job):
+    job.run()
+    n_rows, width = 1050, len(job.feature_names)
+    shap_map = np.memmap(job._path(SHAP_FILE), dtype=np.float32, mode='r+', shape=(n_rows, width))
+    done = np.memmap(job._path(DONE_FILE), dtype=np.uint8, mode='r+', shape=(6,))
+    # Chunks 2 and 5 "never finished"; chunk 0 carries a marker a rerun would overwrite
+    done[[2, 5]] = 0
+    shap_map[400:600] = np.nan
+    shap_map[1000:] = np.nan
+    shap_map[:200] = 7.0
+    done.flush(), shap_map.flush()
+    assert not ExplanationStore(job.output_dir).complete
+
+    job.run()
+    store = ExplanationStore(job.output_dir)
+    _, values = expected(job)
+    assert store.complete
+    np.testing.assert_allclose(store.shap[200:], values[200:], atol=1e-6)
+    assert (store.shap[:200] == 7.0).all()
+
+def test_changed_input_is_not_silently_resumed(job):
+    job.run()
+    frame = pd.read_csv(job.input_path)
+    frame.iloc[:10].to_csv(job.input_path, index=False)
+    with pytest.raises(ValueError, match="restart=True"):
+        job.run()
+    assert job.run(restart=True)["n_rows"] == 10
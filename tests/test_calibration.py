@@ -0,0 +1,35 @@
+import numpy as np
+from src.modeling.calibration import ProbabilityCalibrator, DECISION_THRESHOLD, served_probability
+
+def fitted(seed=0, n=2000):
+    rng = np.random.default_rng(seed)
+    y_prob = rng.beta(2, 5, n)
+    # Labels drawn from a distorted version of the score so calibration has work to do
+    y_true = rng.random(n) < y_prob ** 0.7
+    return ProbabilityCalibrator.fit(y_true, y_prob)
+
+def test_table_and_map_are_monotone():
+    for seed in range(3):
+        cal = fitted(seed)
+        assert np.all(np.diff(cal.x) >= 0)
+        assert np.all(np.diff(cal.y) >= 0)
+        grid = np.linspace(0, 1, 1001)
+        assert np.all(np.diff(cal.transform(grid)) >= -1e-12)
+        assert cal.transform(grid).min() > 0 and cal.transform(grid).max() < 1
+
+def test_round_trip_and_batch_equals_scalar():
+    cal = fitted()
+    restored = ProbabilityCalibrator.from_dict(cal.to_dict())
+    probs = np.array([0.05, 0.3, 0.5, 0.8])
+    np.testing.assert_allclose(restored.transform(probs), cal.transform(probs))
+    assert [float(cal.transform(p)) for p in probs] == cal.transform(probs).tolist()
+
+def test_served_probability_decides_the_verdict():
+    # A flat isotonic step over the raw 0.5 cut: the verdict must follow the displayed value
+    cal = ProbabilityCalibrator("isotonic", [0.0, 0.3, 0.6, 1.0], [0.05, 0.625, 0.625, 0.95], 0.1)
+    served = served_probability(np.array([0.35, 0.45, 0.55]), cal)
+    assert np.all(served > DECISION_THRESHOLD)
+    # Without a map the raw score is clamped, which never moves it across the threshold
+    raw = np.array([0.0, 0.49, 0.51, 1.0])
+    np.testing.assert_allclose(served_probability(raw), [0.01, 0.49, 0.51, 0.99])
+    assert np.array_equal(served_probability(raw) > DECISION_THRESHOLD, raw > DECISION_THRESHOLD)
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from api.coalescing import RequestCoalescer
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_key_ignores_field_order_and_separates_versions():
+    assert RequestCoalescer.key({"a": 1, "b": 2}, "v1") == RequestCoalescer.key({"b": 2, "a": 1}, "v1")
+    assert RequestCoalescer.key({"a": 1}, "v1") != RequestCoalescer.key({"a": 1}, "v2")
+
+def test_duplicates_share_one_computation():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"probability": 0.3}
+
+        results = await asyncio.gather(*[coalescer.run("k", compute) for _ in range(5)])
+        assert len(calls) == 1
+        assert [leader for _, leader in results] == [True, False, False, False, False]
+        assert all(result is results[0][0] for result, _ in results)
+
+        metrics = coalescer.metrics()
+        assert (metrics["computed"], metrics["coalesced"], metrics["max_waiters"], metrics["in_flight"]) == (1, 4, 4, 0)
+        assert metrics["saved_compute_ms"] > 0
+
+        # The key is freed once done: a later identical request computes afresh
+        await coalescer.run("k", compute)
+        assert len(calls) == 2
+    run(scenario())
+
+def test_exception_fans_out_to_every_waiter():
+    async def scenario():
+        coalescer = RequestCoalescer()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("scoring failed")
+
+        results = await asyncio.gather(*[coalescer.run("k", compute) for _ in range(4)], return_exceptions=True)
+        assert all(isinstance(r, ValueError) and str(r) == "scoring failed" for r in results)
+        metrics = coalescer.metrics()
+        assert (metrics["computed"], metrics["coalesced"], metrics["failed"], metrics["in_flight"]) == (1, 3, 1, 0)
+        assert metrics["saved_compute_ms"] == 0.0
+    run(scenario())
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        coalescer = RequestCoalescer()
+
+        async def compute():
+            await asyncio.sleep(0.02)
+            return 42
+
+        leader = asyncio.ensure_future(coalescer.run("k", compute))
+        follower = asyncio.ensure_future(coalescer.run("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == (42, False)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+    run(scenario())
@@ -0,0 +1,90 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+import shap
+import yaml
+from xgboost import XGBClassifier
+from api.columnar import (
+    ARROW_STREAM, CATEGORICAL_COLUMNS, JSON, NPY, ColumnarFormatError, decode_batch, encode_result, negotiate, validate_columns
+)
+from src.data_science.engineer import FeatureEngineer
+from src.xai.shap_explainer import SHAPExplainer
+
+APPLICANT_FIELDS = [
+    "person_age", "person_income", "person_home_ownership", "person_emp_length", "loan_intent", "loan_grade",
+    "loan_amnt", "loan_int_rate", "cb_person_default_on_file", "cb_person_cred_hist_length", "person_gender"
+]
+
+@pytest.fixture(scope="module")
+def data():
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    engineer = FeatureEngineer(config)
+    raw = pd.read_csv(config['data']['raw_path']).dropna()
+    train = engineer.process_pipeline(raw, is_training=True)
+    X = train.drop(columns=[config['data']['target'], 'person_gender'])
+    model = XGBClassifier(n_estimators=30, max_depth=3, random_state=0).fit(X, train[config['data']['target']])
+    return engineer, model, raw.sample(64, random_state=3)[APPLICANT_FIELDS].reset_index(drop=True)
+
+def encode_request(frame, media_type):
+    if media_type == ARROW_STREAM:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if media_type == NPY:
+        records = frame.to_records(index=False, column_dtypes={c: "S32" for c in CATEGORICAL_COLUMNS if c in frame})
+        buffer = io.BytesIO()
+        np.save(buffer, records, allow_pickle=False)
+        return buffer.getvalue()
+    return json.dumps({c: frame[c].tolist() for c in frame.columns}).encode()
+
+@pytest.mark.parametrize("media_type", [ARROW_STREAM, NPY, JSON])
+def test_every_format_decodes_to_the_same_validated_frame(data, media_type):
+    applicants = data[2]
+    decoded = validate_columns(decode_batch(encode_request(applicants, media_type), media_type + "; charset=utf-8"))
+    pd.testing.assert_frame_equal(decoded[APPLICANT_FIELDS], validate_columns(applicants)[APPLICANT_FIELDS])
+
+def test_validation_reports_columns_not_rows(data):
+    applicants = data[2].drop(columns=["loan_grade"])
+    applicants.loc[[2, 5], "loan_amnt"] = np.nan
+    with pytest.raises(ColumnarFormatError) as raised:
+        validate_columns(applicants)
+    errors = {e["column"]: e for e in raised.value.errors}
+    assert errors["loan_grade"]["error"] == "missing"
+    assert errors["loan_amnt"]["rows"] == [2, 5] and errors["loan_amnt"]["count"] == 2
+    # The optional gender column falls back to the schema default
+    assert (validate_columns(data[2].drop(columns=["person_gender"]))["person_gender"] == "Male").all()
+
+@pytest.mark.parametrize("media_type", [ARROW_STREAM, NPY, JSON])
+def test_results_round_trip_in_the_negotiated_format(media_type):
+    result = pd.DataFrame({"prediction": ["Approved", "Denied"], "probability": [0.2, 0.7], "review_required": [False, True]})
+    assert negotiate(f"text/html, {media_type}", JSON) == media_type
+    payload, served = encode_result(result, media_type)
+    assert served == media_type
+    if media_type == ARROW_STREAM:
+        back = pa.ipc.open_stream(pa.py_buffer(payload)).read_all().to_pandas()
+    elif media_type == NPY:
+        back = pd.DataFrame(np.load(io.BytesIO(payload), allow_pickle=False))
+    else:
+        back = pd.DataFrame(json.loads(payload))
+    pd.testing.assert_frame_equal(back, result, check_dtype=False)
+
+def test_columnar_shap_equals_row_shap(data):
+    engineer, model, applicants = data
+    explainer = SHAPExplainer.__new__(SHAPExplainer)
+    explainer.model, explainer.model_version, explainer.cache, explainer.signature = model, "v1", None, None
+    explainer.explainer = shap.TreeExplainer(model)
+    frame = engineer.process_pipeline(validate_columns(applicants))
+    matrix, base_value = explainer.shap_matrix(frame)
+    features = frame.columns.drop('person_gender', errors='ignore').tolist()
+    for i in range(len(frame)):
+        row = explainer.explain_instance(engineer.process_pipeline(applicants.iloc[[i]]))
+        assert row["base_value"] == pytest.approx(base_value)
+        np.testing.assert_allclose(matrix[i], [row["contributions"][f] for f in features], rtol=1e-6, atol=1e-7)
+        # The batch endpoint ships float32 columns
+        np.testing.assert_allclose(matrix[i].astype(np.float32), [row["contributions"][f] for f in features], rtol=1e-6, atol=1e-6)
@@ -0,0 +1,40 @@
+import numpy as np
+from src.accountability.confidence import ConformalPredictor, ConfidenceEstimator
+
+def sample(rng, n):
+    y_prob = rng.beta(2, 3, n)
+    y_true = (rng.random(n) < y_prob).astype(int)
+    return y_true, y_prob
+
+def test_prediction_sets_reach_nominal_coverage():
+    rng = np.random.default_rng(0)
+    for alpha in (0.05, 0.1, 0.2):
+        conformal = ConformalPredictor.fit(*sample(rng, 2000), alpha=alpha)
+        y_test, p_test = sample(rng, 20000)
+        sets = conformal.estimate_batch(p_test)["prediction_sets"]
+        coverage = sets[np.arange(len(y_test)), y_test].mean()
+        # Marginal guarantee is >= 1 - alpha; allow for sampling noise on the test draw
+        assert coverage >= 1 - alpha - 0.01
+
+def test_p_values_and_review_flags():
+    rng = np.random.default_rng(1)
+    conformal = ConformalPredictor.fit(*sample(rng, 1000), alpha=0.1)
+    p_vals = conformal.p_values(np.linspace(0, 1, 101))
+    assert np.all((p_vals > 0) & (p_vals <= 1))
+    # A higher default probability makes Denied more and Approved less conforming
+    assert np.all(np.diff(p_vals[:, 1]) >= 0) and np.all(np.diff(p_vals[:, 0]) <= 0)
+
+    result = conformal.estimate_batch([0.5, 0.01, 0.99])
+    assert result["review_required"].tolist() == [True, False, False]
+    assert result["prediction_sets"][1].tolist() == [True, False]
+    assert result["prediction_sets"][2].tolist() == [False, True]
+
+def test_estimator_forms_agree():
+    rng = np.random.default_rng(2)
+    estimator = ConfidenceEstimator(conformal=ConformalPredictor.fit(*sample(rng, 1000), alpha=0.1))
+    probs = rng.random(50)
+    scores, review = estimator.estimate_arrays(probs)
+    rows = estimator.estimate_batch(probs)
+    assert np.allclose(scores, [row["score"] for row in rows])
+    assert review.tolist() == [row["review_required"] for row in rows]
+    assert estimator.estimate(float(probs[0]))["score"] == rows[0]["score"]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from api.degradation import LEVELS, DegradationController
+from src.xai.shap_explainer import SHAPExplainer
+
+def step(controller, total_ms, stages=None, n=10):
+    """A window of n finished requests, then the level the next request is served at."""
+    for _ in range(n):
+        controller.in_flight += 1
+        controller.end(total_ms, stages)
+    level = controller.begin()
+    controller.end(total_ms, stages)
+    return level
+
+def test_steps_one_level_per_window_and_recovers_when_the_stage_fits():
+    # window == min_samples: every step replaces the whole latency window
+    controller = DegradationController(target_p99_ms=100, window=10, min_samples=10, cooldown_s=0.0)
+    assert step(controller, 40, {"shap": 20, "counterfactuals": 30}) == 0
+    # Each change starts a fresh window, so a slow spell costs one level per window
+    assert [step(controller, 150) for _ in range(4)] == [1, 2, 3, 3]
+    # Back from verdict_only: 40 ms + 20 ms median SHAP fits under 100 * 0.7
+    assert step(controller, 40) == 2
+    assert step(controller, 40) == 1
+    # 40 ms + 30 ms counterfactuals does not; a faster window does
+    assert step(controller, 40) == 1
+    assert step(controller, 30) == 0
+    metrics = controller.metrics()
+    assert [t["to"] for t in metrics["transitions"]] == LEVELS[1:] + ["approximate_shap", "no_counterfactuals", "full"]
+
+def test_queue_depth_degrades_before_latency_does():
+    controller = DegradationController(target_p99_ms=100, max_in_flight=4, cooldown_s=60.0)
+    controller._last_change = -1e9
+    assert [controller.begin() for _ in range(6)] == [0, 0, 0, 0, 1, 1]
+    assert controller.metrics()["in_flight"] == 6
+
+def test_cooldown_limits_changes():
+    controller = DegradationController(target_p99_ms=100, min_samples=5, cooldown_s=60.0)
+    controller._last_change = -1e9
+    assert [step(controller, 500, n=5) for _ in range(3)] == [1, 1, 1]
+
+def test_approximate_contributions_come_from_the_stored_curves():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"loan_amnt": rng.uniform(1000, 20000, 200), "person_income": rng.uniform(2e4, 1e5, 200)})
+    model = LogisticRegression().fit(X, (X["loan_amnt"] / X["person_income"] > 0.2).astype(int))
+    explainer = SHAPExplainer.__new__(SHAPExplainer)
+    explainer.model = model
+    summary = {
+        "base_value": 0.3,
+        "dependence": {
+            "loan_amnt": {"mean_value": [1000, 20000], "mean_shap": [-0.2, 0.4]},
+            "person_income": {"mean_value": [], "mean_shap": []}
+        }
+    }
+    batch = X.iloc[:3].assign(person_gender="Male")
+    approximate = explainer.approximate_batch(batch, summary)
+    np.testing.assert_allclose([e["prediction_prob"] for e in approximate], model.predict_proba(X.iloc[:3])[:, 1])
+    expected = np.interp(X["loan_amnt"][:3], [1000, 20000], [-0.2, 0.4])
+    np.testing.assert_allclose([e["contributions"]["loan_amnt"] for e in approximate], expected)
+    assert all(set(e["contributions"]) == {"loan_amnt"} and e["approximate"] for e in approximate)
+    # Without a stored summary the verdict still comes back, with no contributions
+    assert explainer.approximate_batch(batch)[0]["contributions"] == {}
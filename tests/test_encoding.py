@@ -0,0 +1,43 @@
+import json
+import numpy as np
+import pytest
+import api.encoding as encoding
+from api.encoding import FastJSONResponse, dumps, pack_contributions
+from api.schemas.decision import DecisionResponse
+
+CONTRIBUTIONS = {"loan_amnt": np.float32(0.42), "person_income": -0.8, "loan_grade": np.float64(0.05), "person_age": -0.01}
+
+def response(compact=False, top_k=None):
+    return {
+        "decision_id": "abc", "prediction": "Denied", "probability": np.float64(0.73), "confidence_score": 0.46,
+        "confidence_status": "Moderate", "review_required": np.bool_(False), "narrative": "Loan too large.",
+        "contributions": pack_contributions(CONTRIBUTIONS, top_k=top_k, compact=compact), "fairness_warning": "ok",
+        "prediction_set": ["Denied"], "conformal_p_values": {"Approved": 0.04, "Denied": 0.61},
+        "uncertainty_breakdown": {"probabilities": np.array([0.73, 0.69])}
+    }
+
+def test_orjson_and_stdlib_encode_the_same_document(monkeypatch):
+    payload = response()
+    fast = json.loads(dumps(payload))
+    monkeypatch.setattr(encoding, "orjson", None)
+    assert json.loads(dumps(payload)) == fast
+    assert fast["uncertainty_breakdown"]["probabilities"] == [0.73, 0.69]
+    assert fast["review_required"] is False
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_encoded_body_matches_the_response_model(compact):
+    body = json.loads(FastJSONResponse(response(compact=compact)).body)
+    # The hand-built body is what pydantic would have produced from the same data
+    assert DecisionResponse.model_validate(body).model_dump(mode="json", exclude_unset=True) == body
+
+def test_contributions_top_k_and_compact():
+    top = pack_contributions(CONTRIBUTIONS, top_k=2)
+    assert [c["feature"] for c in top] == ["person_income", "loan_amnt"]
+    assert all(type(c["value"]) is float for c in top)
+    compact = pack_contributions(CONTRIBUTIONS, compact=True)
+    assert compact["features"] == list(CONTRIBUTIONS)
+    assert compact["values"] == pytest.approx([float(v) for v in CONTRIBUTIONS.values()])
+
+def test_pre_encoded_bytes_are_sent_untouched():
+    body = dumps(response())
+    assert FastJSONResponse(body).body == body
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from api.ensemble import ChallengerPool
+
+def run(coro):
+    return asyncio.run(coro)
+
+def result(probability):
+    return {"probability": probability, "prediction": "Denied" if probability > 0.5 else "Approved"}
+
+def test_agreement_measures_spread_and_verdicts():
+    champion = {"xgboost": result(0.62)}
+    assert ChallengerPool.agreement(champion, "xgboost")["model_agreement"] == "Unknown"
+    close = ChallengerPool.agreement({**champion, "mlp": result(0.58)}, "xgboost")
+    assert close["disagreement"] == pytest.approx(0.04) and close["model_agreement"] == "High"
+    wide = ChallengerPool.agreement({**champion, "mlp": result(0.9)}, "xgboost")
+    assert wide["verdict_agreement"] == 1.0 and wide["model_agreement"] == "Medium"
+    split = ChallengerPool.agreement({**champion, "mlp": result(0.3), "rf": result(0.7)}, "xgboost")
+    assert split["verdict_agreement"] == pytest.approx(2 / 3) and split["model_agreement"] == "Low"
+
+def test_challengers_run_in_parallel_and_late_ones_only_reach_the_log(tmp_path):
+    release = threading.Event()
+
+    def score(name, core_input):
+        if name == "slow":
+            release.wait(5)
+        else:
+            time.sleep(0.12)
+        return result({"fast_a": 0.6, "fast_b": 0.65, "slow": 0.2}[name])
+
+    async def scenario():
+        pool = ChallengerPool(score, latency_budget_ms=200, max_workers=3, log_path=str(tmp_path / "challengers.jsonl"))
+        started = time.perf_counter()
+        futures = pool.start(["fast_a", "fast_b", "slow"], {"loan_amnt": 1000})
+        summary = await pool.collect(futures, "xgboost", result(0.62), started)
+        waited = time.perf_counter() - started
+        # Both fast challengers (120 ms each) fit in the 200 ms budget only if they ran concurrently
+        assert set(summary["models"]) == {"xgboost", "fast_a", "fast_b"}
+        assert summary["pending"] == ["slow"] and summary["model_agreement"] == "High"
+        assert 0.15 < waited < 0.5
+        pool.log("d1", "xgboost", futures, summary)
+        release.set()
+        await asyncio.gather(*pool.log_tasks)
+        return pool
+
+    pool = run(scenario())
+    with open(tmp_path / "challengers.jsonl") as f:
+        record = json.loads(f.readline())
+    # The late verdict flips the agreement in the offline record
+    assert record["models"]["slow"]["late"] is True
+    assert record["model_agreement"] == "Low"
+    metrics = pool.metrics()
+    assert metrics["requests"] == 1 and metrics["budget_misses"] == 1 and metrics["challengers_scored"] == 2
+
+def test_failed_challenger_is_reported_not_raised(tmp_path):
+    def score(name, core_input):
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        pool = ChallengerPool(score, latency_budget_ms=200, log_path=str(tmp_path / "challengers.jsonl"))
+        summary = await pool.collect(pool.start(["mlp"], {}), "xgboost", result(0.4), time.perf_counter())
+        assert summary["failed"] == ["mlp"] and summary["model_agreement"] == "Unknown"
+        assert pool.metrics()["failures"] == 1
+    run(scenario())
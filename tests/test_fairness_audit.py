@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.accountability.fairness_audit import FairnessAuditor
+
+CONFIG = {
+    "data": {"sensitive_features": ["person_gender", "person_age"]},
+    "fairness": {"age_bands": [25, 35, 50], "min_group_size": 30, "n_bootstrap": 1500, "confidence_level": 0.9},
+}
+
+def sample(n=1200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "person_gender": rng.choice(["Female", "Male"], n, p=[0.4, 0.6]),
+        "person_age": rng.integers(20, 70, n),
+    })
+    y_true = (rng.random(n) < 0.25).astype(int)
+    # Older applicants and defaulters score riskier, so groups differ
+    y_prob = np.clip(rng.beta(2, 3, n) + 0.004 * (X["person_age"] - 45) + 0.15 * y_true, 0, 1)
+    return X, y_true, y_prob
+
+def loop_metrics(labels, y_true, y_pred, groups, comparable):
+    """The same metrics from a plain loop over groups, one boolean mask at a time."""
+    approval, tpr, treatment = [], [], []
+    for group, compared in zip(groups, comparable):
+        if not compared:
+            continue
+        member = labels == group
+        approved = member & (y_pred == 0)
+        qualified = member & (y_true == 0)
+        false_denials = np.sum(qualified & (y_pred == 1))
+        false_approvals = np.sum(member & (y_true == 1) & (y_pred == 0))
+        if member.sum():
+            approval.append(approved.sum() / member.sum())
+        if qualified.sum():
+            tpr.append(np.sum(approved & qualified) / qualified.sum())
+        if false_approvals:
+            treatment.append(false_denials / false_approvals)
+    spread = lambda v: max(v) - min(v) if v else np.nan
+    return {
+        "demographic_parity_diff": spread(approval),
+        "equal_opportunity_diff": spread(tpr),
+        "treatment_equality_diff": spread(treatment),
+        "disparate_impact": min(approval) / max(approval) if approval else np.nan
+    }
+
+def test_point_metrics_and_counts_match_a_per_group_loop():
+    auditor = FairnessAuditor(CONFIG)
+    X, y_true, y_prob = sample()
+    report = auditor.audit(X, y_true, y_prob)
+    y_pred = (y_prob > 0.5).astype(int)
+    for name, labels in auditor.groupings(X).items():
+        grouping = report["groupings"][name]
+        groups = np.array([g["group"] for g in grouping["groups"]])
+        for g in grouping["groups"]:
+            member = labels == g["group"]
+            assert g["n"] == member.sum()
+            assert g["approval_rate"] == pytest.approx(np.mean(y_pred[member] == 0))
+            assert g["false_denials"] == np.sum(member & (y_true == 0) & (y_pred == 1))
+            assert g["false_approvals"] == np.sum(member & (y_true == 1) & (y_pred == 0))
+        expected = loop_metrics(labels, y_true, y_pred, groups, [g["compared"] for g in grouping["groups"]])
+        for metric, value in expected.items():
+            assert grouping["metrics"][metric]["value"] == pytest.approx(value)
+
+def test_multinomial_bootstrap_matches_a_row_resampling_loop():
+    auditor = FairnessAuditor(CONFIG)
+    X, y_true, y_prob = sample()
+    report = auditor.audit(X, y_true, y_prob, seed=1)
+    y_pred = (y_prob > 0.5).astype(int)
+    rng = np.random.default_rng(2)
+    tail = (1 - auditor.confidence_level) / 2
+    for name in ("person_gender", "person_gender x person_age_band"):
+        labels = auditor.groupings(X)[name]
+        grouping = report["groupings"][name]
+        groups = [g["group"] for g in grouping["groups"]]
+        # Compared groups are fixed from the observed sample, as in the audit
+        comparable = [g["compared"] for g in grouping["groups"]]
+        replicates = {metric: [] for metric in grouping["metrics"]}
+        for _ in range(auditor.n_bootstrap):
+            rows = rng.integers(0, len(y_true), len(y_true))
+            for metric, value in loop_metrics(labels[rows], y_true[rows], y_pred[rows], groups, comparable).items():
+                replicates[metric].append(value)
+        for metric, values in replicates.items():
+            values = np.asarray(values)
+            values = values[np.isfinite(values)]
+            lo, hi = np.quantile(values, [tail, 1 - tail])
+            ci = grouping["metrics"][metric]["ci"]
+            # Two independent Monte Carlo estimates of the same interval
+            width = hi - lo
+            assert ci[0] == pytest.approx(lo, abs=0.1 * width)
+            assert ci[1] == pytest.approx(hi, abs=0.1 * width)
@@ -0,0 +1,64 @@
+import json
+import multiprocessing
+from src.accountability.governance import GovernanceAuditor, TAIL_SIZE
+
+RESPONSE = {"prediction": "Approved", "probability": 0.2, "confidence_score": 0.9, "review_required": False, "is_ood": False}
+
+def auditor(tmp_path, **kwargs):
+    return GovernanceAuditor(str(tmp_path / "audit_log.json"), str(tmp_path / "audit.db"), **kwargs)
+
+def test_outcomes_for_just_logged_decisions_are_recorded(tmp_path):
+    audit = auditor(tmp_path, batched=True)
+    try:
+        for i in range(50):
+            ids = audit.log_decisions([{"row": i}] * 4, [RESPONSE] * 4, "v1")
+            assert audit.record_outcomes({decision_id: 1 for decision_id in ids}) == []
+        assert audit.record_outcomes({"unknown-id": 0}) == ["unknown-id"]
+        assert len(audit.store.labelled_decisions()) == 200
+    finally:
+        audit.close()
+
+def test_flush_marker_commits_everything_queued_before_it(tmp_path):
+    audit = auditor(tmp_path, batched=True)
+    try:
+        ids = audit.log_decisions([{"row": i} for i in range(300)], [RESPONSE] * 300, "v1")
+        assert audit.flush(timeout=5.0)
+        assert audit.store.count() == 300
+        assert audit.store.query(limit=1)["total"] == len(set(ids))
+    finally:
+        audit.close()
+
+def test_json_tail_is_bounded_and_written_on_close(tmp_path):
+    audit = auditor(tmp_path, batched=True, tail_interval_s=60.0)
+    audit.log_decisions([{"row": i} for i in range(TAIL_SIZE + 20)], [RESPONSE] * (TAIL_SIZE + 20), "v1")
+    audit.close()
+    with open(tmp_path / "audit_log.json") as f:
+        tail = json.load(f)
+    assert len(tail) == TAIL_SIZE
+    assert tail[-1]["input"] == {"row": TAIL_SIZE + 19}
+
+def test_columns_and_rows_produce_the_same_entries(tmp_path):
+    audit = auditor(tmp_path)
+    columns = {key: [value, value] for key, value in RESPONSE.items()}
+    by_column = audit.log_columns([{"row": 0}, {"row": 1}], columns, "v1")
+    by_row = audit.log_decisions([{"row": 0}, {"row": 1}], [RESPONSE, RESPONSE], "v1")
+    items = {item.pop("id"): item for item in audit.store.query(limit=10)["items"]}
+    for a, b in zip(by_column, by_row):
+        items[a].pop("timestamp"), items[b].pop("timestamp")
+        assert items[a] == items[b]
+
+def test_shared_writer_process(tmp_path):
+    audit = auditor(tmp_path)
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    writer = ctx.Process(target=audit.serve_queue, args=(queue,))
+    writer.start()
+    audit.attach_queue(queue)
+    try:
+        ids = audit.log_decisions([{"row": i} for i in range(10)], [RESPONSE] * 10, "v1")
+        assert audit.record_outcomes({decision_id: 0 for decision_id in ids}) == []
+    finally:
+        queue.put(None)
+        writer.join(timeout=10)
+    assert writer.exitcode == 0
+    assert audit.store.count() == 10
@@ -0,0 +1,87 @@
+import time
+import pandas as pd
+import pytest
+import yaml
+from xgboost import XGBClassifier
+from src.accountability.audit_store import AuditStore
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.incremental import INCREMENTAL_ARTIFACT, IncrementalTrainer
+from src.modeling.registry import ModelRegistry
+
+APPLICANT_FIELDS = [
+    "person_age", "person_income", "person_home_ownership", "person_emp_length", "loan_intent", "loan_grade",
+    "loan_amnt", "loan_int_rate", "cb_person_default_on_file", "cb_person_cred_hist_length", "person_gender"
+]
+
+@pytest.fixture(scope="module")
+def data():
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    engineer = FeatureEngineer(config)
+    raw = pd.read_csv(config['data']['raw_path']).dropna()
+    engineer.process_pipeline(raw, is_training=True)
+    # A deliberately weak base model, so new labels have something to add
+    train = pd.read_csv(config['data']['processed_path']).sample(1000, random_state=0)
+    X = train.drop(columns=[config['data']['target'], 'person_gender'])
+    base = XGBClassifier(n_estimators=20, max_depth=2, random_state=0).fit(X, train[config['data']['target']])
+    return engineer, base, raw.sample(3000, random_state=11).reset_index(drop=True)
+
+@pytest.fixture
+def trainer(tmp_path, data):
+    engineer, base, _ = data
+    trainer = IncrementalTrainer.__new__(IncrementalTrainer)
+    with open("config/config.yaml") as f:
+        trainer.config = yaml.safe_load(f)
+    trainer.target = trainer.config['data']['target']
+    trainer.settings = {**trainer.config.get('incremental', {}), "min_new_labels": 50}
+    trainer.registry = ModelRegistry(str(tmp_path / "models"))
+    trainer.store = AuditStore(str(tmp_path / "audit.db"))
+    trainer.engineer = engineer
+    # Serving artifacts are covered by the registry tests
+    trainer._register_artifacts = lambda *args: None
+    trainer.registry.save_model(base, "xgboost", {}, {})
+    return trainer
+
+def label(trainer, applicants, recorded_at, flip=False):
+    entries = [
+        {"id": f"{recorded_at}-{i}", "timestamp": recorded_at, "model_version": "v1",
+         "input": {f: row[f] for f in APPLICANT_FIELDS}, "output": {"prediction": "Approved"}}
+        for i, row in applicants.iterrows()
+    ]
+    trainer.store.insert_many(entries)
+    labels = applicants["loan_status"].astype(int)
+    trainer.store.record_outcomes(
+        {e["id"]: int(1 - y if flip else y) for e, y in zip(entries, labels)}, recorded_at=recorded_at
+    )
+
+def test_only_labels_after_the_watermark_are_used(trainer, data):
+    applicants = data[2]
+    label(trainer, applicants[:100], "2026-01-01T00:00:00")
+    label(trainer, applicants[100:160], "2026-02-01T00:00:00")
+    X, y, through = trainer.new_labels("xgboost")
+    assert len(X) == 160 and through == "2026-02-01T00:00:00"
+    trainer.registry.save_artifact(trainer.registry.get_latest_dir("xgboost"), INCREMENTAL_ARTIFACT,
+                                   {"labelled_through": "2026-01-01T00:00:00"})
+    X, y, through = trainer.new_labels("xgboost")
+    assert len(X) == 60 and list(X.columns) == list(data[1].get_booster().feature_names)
+
+def test_accepted_refresh_continues_boosting_and_moves_the_watermark(trainer, data):
+    base_dir = trainer.registry.get_latest_dir("xgboost")
+    label(trainer, data[2], "2026-03-01T00:00:00")
+    # Version directories are named by the second
+    time.sleep(1.1)
+    report = trainer.refresh("xgboost")
+    assert report["registered"], report
+    assert trainer.registry.get_latest_dir("xgboost") == report["version"] != base_dir
+    candidate = trainer.registry.load_latest("xgboost")
+    assert candidate.get_booster().num_boosted_rounds() == 20 + trainer.settings['xgb_extra_rounds']
+    assert trainer.registry.load_artifact("xgboost", INCREMENTAL_ARTIFACT)["labelled_through"] == "2026-03-01T00:00:00"
+    # Nothing new since the watermark: the next refresh has nothing to learn from
+    assert trainer.refresh("xgboost")["reason"] == "insufficient_new_labels"
+
+def test_regressing_candidate_is_not_registered(trainer, data):
+    base_dir = trainer.registry.get_latest_dir("xgboost")
+    label(trainer, data[2], "2026-03-01T00:00:00", flip=True)
+    report = trainer.refresh("xgboost")
+    assert not report["registered"] and report["reason"] == "holdout_regression"
+    assert trainer.registry.get_latest_dir("xgboost") == base_dir
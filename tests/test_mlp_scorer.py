@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.neural_network import MLPClassifier
+from src.modeling.mlp_scorer import CompiledMLP
+
+def fitted(seed=0, n=3000):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "person_income": rng.lognormal(10.5, 0.6, n),
+        "loan_amnt": rng.integers(500, 35000, n).astype(float),
+        "loan_int_rate": rng.normal(11, 3, n),
+        "loan_grade": rng.integers(0, 7, n).astype(float),
+    })
+    y = (rng.random(n) < 1 / (1 + np.exp(-(X["loan_amnt"] / X["person_income"] * 4 + X["loan_grade"] * 0.3 - 2)))).astype(int)
+    model = MLPClassifier(hidden_layer_sizes=(32, 16), max_iter=200, random_state=seed).fit(X, y)
+    return model, X
+
+def test_probabilities_match_sklearn_on_every_row():
+    model, X = fitted()
+    compiled = CompiledMLP.from_sklearn(model)
+    reference = model.predict_proba(X)[:, 1]
+    served = compiled.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(served, reference, rtol=0, atol=1e-12)
+    # Shown to four decimals and compared to the threshold exactly as sklearn's would be
+    assert np.array_equal(np.round(served, 4), np.round(reference, 4))
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+    # Single rows, reused buffers and a serialised round trip give the same numbers
+    restored = CompiledMLP.from_dict(compiled.to_dict())
+    np.testing.assert_array_equal(restored.predict_proba(X)[:, 1], served)
+    np.testing.assert_allclose([compiled.predict_proba(X.iloc[[i]])[0, 1] for i in range(20)], reference[:20], atol=1e-12)
+
+def test_verify_fails_registration_above_tolerance():
+    model, X = fitted()
+    compiled = CompiledMLP.from_sklearn(model)
+    assert compiled.verify(X) <= 1e-9
+    assert compiled.max_abs_error == compiled.to_dict()["max_abs_error"]
+    compiled.intercepts[-1] += 1e-3
+    with pytest.raises(ValueError, match="deviates from sklearn"):
+        compiled.verify(X)
@@ -0,0 +1,130 @@
+import os
+import shutil
+import pytest
+import yaml
+import src.pipeline as pipeline
+from src.pipeline import STAGES, PipelineRunner
+
+REPO = os.getcwd()
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """A copy of src/ and the config with tiny stand-ins for every stage's files."""
+    shutil.copytree(os.path.join(REPO, "src"), tmp_path / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copytree(os.path.join(REPO, "config"), tmp_path / "config")
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data/raw")
+    with open("data/raw/credit_risk_dataset.csv", "w") as f:
+        f.write("person_age,loan_status\n30,0\n")
+    executed = []
+
+    def execute(self, name):
+        # Each output is a function of the stage's code, config and inputs, as with the real entry points
+        executed.append(name)
+        key = self.stage_key(name)
+        for path in STAGES[name]["outputs"]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(f"{name}:{path}:{key}")
+        return {"returncode": 0, "elapsed_s": 0.0, "log": ""}
+
+    monkeypatch.setattr(PipelineRunner, "_execute", execute)
+    return executed
+
+def keys(runner=None):
+    runner = runner or PipelineRunner()
+    return {name: runner.stage_key(name) for name in STAGES}
+
+def test_keys_are_stable_across_runs_and_touches(workspace):
+    before = keys()
+    # Same content under a new mtime hashes the same
+    with open("data/raw/credit_risk_dataset.csv") as f:
+        content = f.read()
+    with open("data/raw/credit_risk_dataset.csv", "w") as f:
+        f.write(content)
+    os.utime("data/raw/credit_risk_dataset.csv", (1, 1))
+    assert keys() == before
+
+def test_keys_follow_inputs_config_sections_and_imported_code(workspace):
+    before = keys()
+
+    with open("data/raw/credit_risk_dataset.csv", "a") as f:
+        f.write("41,1\n")
+    changed = {name for name, key in keys().items() if key != before[name]}
+    assert changed == {"eda"}
+
+    before = keys()
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    config["model"]["params"]["max_depth"] = 99
+    with open("config/config.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+    changed = {name for name, key in keys().items() if key != before[name]}
+    assert changed == {"train_xgboost", "train_mlp_baseline", "train_random_forest"}
+
+    before = keys()
+    # A module the trainer imports, but not the eda runner or the audit
+    assert "src/modeling/registry.py" in pipeline.code_closure("src.modeling.trainer")
+    assert "src/modeling/registry.py" not in pipeline.code_closure("src.data_science.eda_runner")
+    with open("src/modeling/registry.py", "a") as f:
+        f.write("\n# edited\n")
+    changed = {name for name, key in keys().items() if key != before[name]}
+    expected = {name for name, stage in STAGES.items() if "src/modeling/registry.py" in pipeline.code_closure(stage["module"])}
+    assert "split" in changed and "eda" not in changed
+    assert changed == expected
+
+def test_runs_only_what_changed_and_its_downstream(workspace):
+    status = PipelineRunner().run()
+    assert set(status.values()) == {"ran"} and len(workspace) == len(STAGES)
+
+    workspace.clear()
+    assert set(PipelineRunner().run().values()) == {"skipped"}
+    assert workspace == []
+
+    # A different config section only reruns the stages that read it
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    config["model"]["params"]["max_depth"] = 99
+    with open("config/config.yaml", "w") as f:
+        yaml.safe_dump(config, f)
+    status = PipelineRunner().run()
+    assert {name for name, outcome in status.items() if outcome == "ran"} == {
+        "train_xgboost", "train_mlp_baseline", "train_random_forest", "audit", "xai"
+    }
+
+    # A new generator writes different raw data, which changes every key downstream
+    workspace.clear()
+    with open("src/data_science/generate_data.py", "a") as f:
+        f.write("\n# edited\n")
+    PipelineRunner().run()
+    assert set(workspace) == set(STAGES)
+
+    # Code only the audit imports reruns the audit alone
+    workspace.clear()
+    with open("src/accountability/audit_runner.py", "a") as f:
+        f.write("\n# edited\n")
+    PipelineRunner().run()
+    assert workspace == ["audit"]
+
+def test_edited_or_deleted_outputs_rerun_the_stage(workspace):
+    PipelineRunner().run()
+    os.remove("data/processed/test_target.csv")
+    status = PipelineRunner().run(["split"])
+    assert status == {"generate_data": "skipped", "eda": "skipped", "split": "ran"}
+
+    with open("models/xgboost_latest_pointer.txt", "w") as f:
+        f.write("models/xgboost_hand_edited")
+    status = PipelineRunner().run(["train_xgboost"])
+    assert status["train_xgboost"] == "ran"
+
+def test_dry_run_reports_downstream_without_running(workspace):
+    PipelineRunner().run()
+    workspace.clear()
+    with open("data/raw/credit_risk_dataset.csv", "a") as f:
+        f.write("41,1\n")
+    status = PipelineRunner().run(["eda"], dry_run=True)
+    assert workspace == []
+    # The hand-edited raw file invalidates the generator too
+    assert status == {"generate_data": "would_run", "eda": "would_run"}
+    status = PipelineRunner().run(dry_run=True)
+    assert set(status.values()) == {"would_run"}
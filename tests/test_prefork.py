@@ -0,0 +1,91 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import urllib.request
+from fastapi import FastAPI
+
+class Service:
+    """Stands in for api.main: serves the version loaded in the master and polls a version file."""
+
+    def __init__(self, version_file):
+        self.version_file = version_file
+        self.app = FastAPI()
+        self.app.get("/version")(lambda: {"version": self.loaded, "pid": os.getpid()})
+        self.auditor = Auditor()
+        self.load_runtime()
+
+    def registered_versions(self):
+        with open(self.version_file) as f:
+            return {"model": f.read().strip()}
+
+    def load_runtime(self):
+        versions = self.registered_versions()
+        if versions["model"] == "broken":
+            raise ValueError("artifacts missing")
+        self.loaded = versions["model"]
+        self.runtime_versions = versions
+
+class Auditor:
+    def attach_queue(self, queue):
+        pass
+
+    def serve_queue(self, queue):
+        while queue.get() is not None:
+            pass
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve(version_file, port):
+    from api.prefork import PreforkServer
+    PreforkServer(Service(version_file), {"host": "127.0.0.1", "port": port, "workers": 2, "model_poll_interval": 0.2}).run()
+
+def responses(port, n=12):
+    seen = []
+    for _ in range(n):
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/version", timeout=2) as r:
+            body = json.loads(r.read())
+        seen.append((body["version"], body["pid"]))
+    return seen
+
+def wait_for(port, condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            seen = responses(port)
+            if condition(seen):
+                return seen
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise AssertionError("condition not reached")
+
+def test_workers_are_replaced_when_a_new_version_is_registered(tmp_path):
+    version_file = str(tmp_path / "version")
+    with open(version_file, "w") as f:
+        f.write("v1")
+    port = free_port()
+    master = multiprocessing.get_context("fork").Process(target=serve, args=(version_file, port))
+    master.start()
+    try:
+        before = wait_for(port, lambda seen: all(v == "v1" for v, _ in seen))
+
+        # A reload that fails keeps the current workers serving
+        with open(version_file, "w") as f:
+            f.write("broken")
+        time.sleep(1.5)
+        assert all(v == "v1" for v, _ in responses(port))
+
+        with open(version_file, "w") as f:
+            f.write("v2")
+        after = wait_for(port, lambda seen: all(v == "v2" for v, _ in seen))
+        assert not {pid for _, pid in after} & {pid for _, pid in before}
+    finally:
+        os.kill(master.pid, signal.SIGTERM)
+        master.join(timeout=30)
+    assert master.exitcode == 0
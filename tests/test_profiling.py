@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import Counter
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from api.profiling import ProfileStore, RequestProfiler, SamplingProfiler
+
+def busy_scoring(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+def app_with(profiler):
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        if profiler.wants(request.url.path, request.headers):
+            return await profiler.profile(request, call_next)
+        return await call_next(request)
+
+    @app.post("/predict")
+    def predict():
+        # Sync endpoint: runs on a threadpool worker, not the event loop thread
+        busy_scoring(0.15)
+        return {"prediction": "Approved"}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+    return app
+
+def test_debug_header_profiles_work_on_other_threads(tmp_path):
+    profiler = RequestProfiler({"directory": str(tmp_path), "interval_ms": 1.0})
+    client = TestClient(app_with(profiler))
+    assert "X-Profile-Id" not in client.post("/predict").headers
+    response = client.post("/predict", headers={"X-Debug-Profile": "1"})
+    profile_id = response.headers["X-Profile-Id"]
+    collapsed = profiler.store.read(profile_id).decode()
+    assert "busy_scoring" in collapsed
+    # Every line is "frame;frame;... count"
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+    meta = profiler.store.list()[0]
+    assert meta["id"] == profile_id and meta["path"] == "/predict" and meta["status_code"] == 200
+    assert meta["samples"] > 10 and meta["duration_ms"] >= 150
+    # Paths outside the configured list are never profiled
+    assert "X-Profile-Id" not in client.get("/health", headers={"X-Debug-Profile": "1"}).headers
+
+def test_sampled_fraction(tmp_path):
+    profiler_all = RequestProfiler({"sample_rate": 1.0, "directory": str(tmp_path)})
+    profiler_none = RequestProfiler({"sample_rate": 0.0, "directory": str(tmp_path)})
+    assert profiler_all.wants("/predict", {}) and not profiler_none.wants("/predict", {})
+    assert not profiler_none.wants("/predict", {"x-debug-profile": "0"})
+
+def test_idle_threads_are_not_sampled():
+    release = threading.Event()
+    idle = threading.Thread(target=release.wait, name="idle-pool-worker")
+    idle.start()
+    profiler = SamplingProfiler(interval_ms=1.0)
+    profiler.start()
+    busy_scoring(0.2)
+    stacks = profiler.stop()
+    release.set()
+    idle.join()
+    assert profiler.samples > 5
+    assert any("busy_scoring" in stack for stack in stacks)
+    assert not any(stack.startswith("idle-pool-worker") for stack in stacks)
+
+def test_store_is_a_bounded_ring_buffer(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=3)
+    ids = [store.save(Counter({f"MainThread;f{i}": 1}), {"path": "/predict"}) for i in range(5)]
+    assert [meta["id"] for meta in store.list()] == ids[:1:-1]
+    assert store.read(ids[0]) is None and store.read(ids[-1]) == b"MainThread;f4 1\n"
+    with pytest.raises(ValueError):
+        store.read("../audit")
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.modeling.registry import ModelRegistry
+from src.modeling.trainer import ModelTrainer
+
+def split(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "person_income": rng.lognormal(10.5, 0.5, n),
+        "loan_amnt": rng.integers(500, 30000, n).astype(float),
+        "person_gender": rng.integers(0, 2, n),
+    })
+    y = pd.Series((X["loan_amnt"] / X["person_income"] + rng.normal(0, 0.1, n) > 0.3).astype(int))
+    return X[:200], X[200:], y[:200], y[200:]
+
+@pytest.fixture
+def trainer(tmp_path):
+    trainer = ModelTrainer("config/config.yaml")
+    trainer.registry = ModelRegistry(str(tmp_path))
+    return trainer
+
+def test_unpublished_versions_are_not_latest(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    model_dir = registry.save_model({"weights": [1, 2]}, "toy", {}, {}, publish=False)
+    assert registry.get_latest_dir("toy") is None
+    assert registry.load_version(model_dir) == {"weights": [1, 2]}
+    registry.publish("toy", model_dir)
+    assert registry.get_latest_dir("toy") == model_dir
+    assert registry.load_latest("toy") == {"weights": [1, 2]}
+    assert not (tmp_path / "toy_latest_pointer.txt.tmp").exists()
+
+def test_latest_pointer_is_written_after_the_artifacts(trainer, monkeypatch):
+    seen = []
+    monkeypatch.setattr(trainer, "_register_artifacts", lambda name, model_dir, *args: seen.append(
+        (trainer.registry.get_latest_dir(name), trainer.registry.load_version(model_dir) is not None)
+    ))
+    X_train, X_test, y_train, y_test = split()
+    trainer.train_interpretable(X_train, y_train, X_test, y_test)
+    # Artifacts were built against the stored version while latest still pointed at nothing
+    assert seen == [(None, True)]
+    assert trainer.registry.get_latest_dir("xgboost") is not None
+
+def test_failed_artifacts_leave_latest_alone(trainer, monkeypatch):
+    previous = trainer.registry.save_model({"old": True}, "xgboost", {}, {})
+
+    def fail(*args):
+        raise ValueError("Compiled forward pass deviates")
+    monkeypatch.setattr(trainer, "_register_artifacts", fail)
+    X_train, X_test, y_train, y_test = split()
+    with pytest.raises(ValueError):
+        trainer.train_interpretable(X_train, y_train, X_test, y_test)
+    assert trainer.registry.get_latest_dir("xgboost") == previous
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+from src.xai.shap_cache import ExplanationCache, SplitSignature
+from src.xai.shap_explainer import SHAPExplainer
+
+FEATURES = ["income", "loan", "rate", "history"]
+MODELS = {
+    "xgboost": lambda: XGBClassifier(n_estimators=30, max_depth=3, random_state=0),
+    "random_forest": lambda: RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0),
+}
+
+def training_frame(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "income": rng.lognormal(10.5, 0.5, n).round(2),
+        "loan": rng.integers(500, 30000, n).astype(float),
+        "rate": rng.normal(11, 3, n).round(2),
+        "history": rng.integers(2, 30, n).astype(float),
+    })
+    logit = 2.5 * X["loan"] / X["income"] + 0.2 * (X["rate"] - 11) - 0.05 * X["history"] - 0.3
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return X, y
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def model(request):
+    X, y = training_frame()
+    return MODELS[request.param]().fit(X, y)
+
+def probe_rows(signature, seed=1):
+    """Rows sitting exactly on split values and one float32 step either side of them."""
+    X, _ = training_frame(n=40, seed=seed)
+    rows = []
+    for i, (feat, thr) in enumerate(zip(signature.feature_index, signature.thresholds)):
+        for value in (thr, np.nextafter(np.float32(thr), np.float32(-np.inf)), np.nextafter(np.float32(thr), np.float32(np.inf))):
+            row = X.iloc[i % len(X)].copy()
+            row.iloc[feat] = float(value)
+            rows.append(row)
+    return pd.concat([X, pd.DataFrame(rows)], ignore_index=True)
+
+def direct_shap(model, batch):
+    return SHAPExplainer._positive_class_matrix(shap.TreeExplainer(model).shap_values(batch), len(batch))
+
+def cached_explainer(model, cache):
+    explainer = SHAPExplainer.__new__(SHAPExplainer)
+    explainer.model, explainer.model_version, explainer.cache = model, "v1", cache
+    explainer.explainer = shap.TreeExplainer(model)
+    explainer.signature = SplitSignature(model)
+    return explainer
+
+def test_same_signature_means_same_prediction_and_shap(model):
+    signature = SplitSignature(model)
+    batch = probe_rows(signature)
+    keys = signature.keys(batch)
+    probs = model.predict_proba(batch)[:, 1]
+    values = direct_shap(model, batch)
+    groups = pd.Series(range(len(keys))).groupby(keys).apply(list)
+    assert (groups.map(len) > 1).any()
+    for rows in groups:
+        np.testing.assert_array_equal(probs[rows], probs[rows[0]])
+        np.testing.assert_allclose(values[rows], np.repeat(values[rows[:1]], len(rows), axis=0), atol=1e-9)
+
+def test_opposite_sides_of_a_split_get_different_keys(model):
+    signature = SplitSignature(model)
+    X, _ = training_frame(n=1, seed=2)
+    for feat, thr in zip(signature.feature_index, signature.thresholds):
+        below, above = X.copy(), X.copy()
+        below.iloc[0, feat] = float(np.nextafter(np.float32(thr), np.float32(-np.inf)))
+        # On the split value itself: XGBoost (x < split) sends it right, sklearn (x <= threshold) left
+        above.iloc[0, feat] = float(thr) if signature.strict else float(np.nextafter(np.float32(thr), np.float32(np.inf)))
+        assert signature.keys(below) != signature.keys(above)
+
+def test_cached_explanations_match_a_direct_tree_explainer(model):
+    cache = ExplanationCache()
+    explainer = cached_explainer(model, cache)
+    batch = probe_rows(explainer.signature)
+    expected = direct_shap(model, batch)
+    probs = model.predict_proba(batch)[:, 1]
+    # Second pass is served from the cache and must not drift either
+    for _ in range(2):
+        explanations = explainer.explain_batch(batch)
+        np.testing.assert_allclose([[e["contributions"][f] for f in FEATURES] for e in explanations], expected, atol=1e-9)
+        np.testing.assert_allclose([e["prediction_prob"] for e in explanations], probs, atol=1e-12)
+    stats = cache.metrics()["versions"]["v1"]
+    assert stats["hits"] >= len(batch) and stats["misses"] == stats["entries"]
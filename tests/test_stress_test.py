@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from xgboost import XGBClassifier
+from src.accountability.stress_test import PortfolioStressTester
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.calibration import DECISION_THRESHOLD, ProbabilityCalibrator, served_probability
+
+SCENARIOS = {
+    "unchanged": [],
+    "income_down_15": [{"feature": "person_income", "scale": 0.85}],
+    "medical_up_20_rates_up": [
+        {"feature": "loan_amnt", "scale": 1.2, "where": {"loan_intent": ["MEDICAL", "DEBTCONSOLIDATION"]}},
+        {"feature": "loan_int_rate", "shift": 3.0, "max": 22.0}
+    ],
+}
+
+@pytest.fixture(scope="module")
+def tester():
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    engineer = FeatureEngineer(config)
+    raw = pd.read_csv(config['data']['raw_path']).dropna()
+    train = engineer.process_pipeline(raw, is_training=True)
+    X = train.drop(columns=[config['data']['target'], 'person_gender'])
+    model = XGBClassifier(n_estimators=30, max_depth=3, random_state=0).fit(X, train[config['data']['target']])
+    calibrator = ProbabilityCalibrator.fit(train[config['data']['target']], model.predict_proba(X)[:, 1])
+    book = raw.sample(600, random_state=5).reset_index(drop=True)
+    tester = PortfolioStressTester(config, book, engineer=engineer)
+    tester.load_model = lambda name: (model, calibrator)
+    return tester, book, model, calibrator
+
+def loop_report(tester, book, model, calibrator, shocks):
+    """One loan at a time: shock the raw application, engineer, score, then tally each group in plain Python."""
+    rows = []
+    for _, loan in book.iterrows():
+        row = loan.drop(labels=["loan_percent_income", "loan_status"]).to_dict()
+        for shock in shocks:
+            where = shock.get("where", {})
+            if all(str(row[column]) in values for column, values in where.items()):
+                value = row[shock["feature"]] * shock.get("scale", 1.0) + shock.get("shift", 0.0)
+                row[shock["feature"]] = min(max(value, shock.get("min", 0.0)), shock.get("max", np.inf))
+        rows.append(row)
+    features = tester.engineer.process_pipeline(pd.DataFrame(rows))
+    prob = served_probability(model.predict_proba(features)[:, 1], calibrator)
+    amounts = features["loan_amnt"].to_numpy()
+
+    def figures(members):
+        approved = [i for i in members if prob[i] <= DECISION_THRESHOLD]
+        return {
+            "n": len(members),
+            "approval_rate": len(approved) / len(members) if members else None,
+            "expected_default_rate": sum(prob[i] for i in approved) / len(approved) if approved else None,
+            "expected_default_amount": sum(prob[i] * amounts[i] for i in approved)
+        }
+
+    segments = {}
+    for name, (groups, codes) in tester.segments.items():
+        segments[name] = {str(g): figures([i for i in range(len(book)) if codes[i] == k]) for k, g in enumerate(groups)}
+    return {"portfolio": figures(list(range(len(book)))), "segments": segments}
+
+def assert_figures_equal(actual, expected):
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None
+        else:
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-9)
+
+def test_vectorized_scenarios_match_a_per_loan_loop(tester):
+    tester, book, model, calibrator = tester
+    report = tester.run(scenarios=SCENARIOS, max_workers=3)
+    for name, shocks in SCENARIOS.items():
+        expected = loop_report(tester, book, model, calibrator, shocks)
+        result = report["scenarios"][name]
+        assert_figures_equal(result["portfolio"], expected["portfolio"])
+        for segment, groups in expected["segments"].items():
+            for group, figures in groups.items():
+                assert_figures_equal(result["segments"][segment][group], figures)
+    # A scenario without shocks is the baseline, to the last digit: the book's rounded
+    # loan_percent_income is recomputed for the baseline as it is for every scenario
+    columns = tester.columns
+    np.testing.assert_array_equal(tester.apply([]), tester.base_matrix)
+    assert tester.base_matrix[:, columns["loan_percent_income"]] == pytest.approx(
+        book["loan_amnt"] / book["person_income"].clip(lower=1)
+    )
+    assert report["scenarios"]["unchanged"]["portfolio"] == report["baseline"]["portfolio"]
+    assert all(v == 0 for v in report["scenarios"]["unchanged"]["delta"]["portfolio"].values())
+    assert report["scenarios"]["income_down_15"]["delta"]["portfolio"]["approval_rate"] < 0
+
+def test_grid_and_bad_shocks(tester):
+    tester = tester[0]
+    grid = PortfolioStressTester.grid({"person_income": {"scale": [1.0, 0.9]}, "loan_int_rate": {"shift": [0, 3]}})
+    assert list(grid) == [
+        "person_income x1, loan_int_rate +0", "person_income x1, loan_int_rate +3",
+        "person_income x0.9, loan_int_rate +0", "person_income x0.9, loan_int_rate +3"
+    ]
+    with pytest.raises(ValueError):
+        tester.apply([{"feature": "loan_grade", "shift": 1}])
+    with pytest.raises(ValueError):
+        tester.apply([{"feature": "loan_amnt", "scale": 2, "where": {"person_income": [1]}}])
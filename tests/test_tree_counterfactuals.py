@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+from src.data_science.engineer import FeatureEngineer
+from src.modeling.calibration import DECISION_THRESHOLD, served_probability
+from src.xai.tree_counterfactuals import TreeCounterfactualSolver
+
+APPLICANT_FIELDS = [
+    "person_age", "person_income", "person_home_ownership", "person_emp_length", "loan_intent", "loan_grade",
+    "loan_amnt", "loan_int_rate", "cb_person_default_on_file", "cb_person_cred_hist_length", "person_gender"
+]
+MODELS = {
+    "xgboost": lambda: XGBClassifier(n_estimators=40, max_depth=3, random_state=0),
+    "random_forest": lambda: RandomForestClassifier(n_estimators=15, max_depth=5, random_state=0),
+}
+# Brute force scans every cent this close to a suggestion and a coarser grid over the rest of the way
+CENT_WINDOW = 5000
+MAX_GRID = 40000
+
+@pytest.fixture(scope="module")
+def data():
+    with open("config/config.yaml") as f:
+        config = yaml.safe_load(f)
+    engineer = FeatureEngineer(config)
+    raw = pd.read_csv(config['data']['raw_path']).dropna()
+    train = engineer.process_pipeline(raw, is_training=True)
+    X = train.drop(columns=[config['data']['target'], 'person_gender'])
+    y = train[config['data']['target']]
+    applicants = raw.sample(60, random_state=7)[APPLICANT_FIELDS].to_dict('records')
+    return engineer, X, y, applicants
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def solver(request, data):
+    engineer, X, y, _ = data
+    return TreeCounterfactualSolver(MODELS[request.param]().fit(X, y), engineer)
+
+def served(solver, applicant, changes):
+    n = len(next(iter(changes.values())))
+    batch = pd.DataFrame([applicant] * n)
+    for feature, values in changes.items():
+        batch[feature] = values
+    return served_probability(solver.model.predict_proba(solver.engineer.process_pipeline(batch))[:, 1])
+
+def values_between(current, suggested):
+    """Every whole cent just short of the suggestion, plus an even grid back to the current value."""
+    step = -np.sign(suggested - current) / 100
+    window = suggested + step * np.arange(1, CENT_WINDOW + 1)
+    grid = np.linspace(current, suggested, MAX_GRID)
+    values = np.round(np.concatenate([window, grid]), 2)
+    low, high = sorted((current, suggested))
+    return values[(values > low) & (values < high)]
+
+def test_single_feature_changes_match_brute_force(solver, data):
+    checked = 0
+    for applicant in data[3]:
+        result = solver.find_path_to_approval(applicant)
+        if "recommendations" not in result:
+            continue
+        suggested = {solver.ACTIONABLE[f]['label']: f for f in solver.ACTIONABLE}
+        found = {suggested[r['feature']]: r['suggested'] for r in result['recommendations']}
+        for feature in solver.ACTIONABLE:
+            current = applicant[feature]
+            if feature in found:
+                assert served(solver, applicant, {feature: [found[feature]]})[0] <= DECISION_THRESHOLD
+                between = values_between(current, found[feature])
+                # No smaller change approves
+                assert np.all(served(solver, applicant, {feature: between}) > DECISION_THRESHOLD)
+                checked += 1
+            else:
+                limit = 0.0 if solver.ACTIONABLE[feature]['direction'] < 0 else current * solver.max_income_multiplier
+                grid = np.arange(min(current, limit), max(current, limit), 0.5)
+                assert np.all(served(solver, applicant, {feature: grid}) > DECISION_THRESHOLD)
+    assert checked >= 10
+
+def test_combination_is_the_cheapest_on_its_grid(solver, data):
+    compared = 0
+    for applicant in data[3][:30]:
+        result = solver.find_path_to_approval(applicant)
+        if "recommendations" not in result:
+            continue
+        corners = solver._corners(applicant)
+        base_output = (float(solver.model.predict(corners[0].iloc[:1], output_margin=True)[0])
+                       if isinstance(solver.model, XGBClassifier) else None)
+        axes = [
+            solver._boundaries(f, applicant, solver._relevant(applicant, corners, base_output, [f])[0])[0]
+            [:solver.max_pair_candidates]
+            for f in solver.ACTIONABLE
+        ]
+        if any(len(axis) == 0 for axis in axes):
+            assert result['combined'] is None
+            continue
+        # Exhaustive scan of the same cross product
+        grid = [g.ravel() for g in np.meshgrid(*axes, indexing='ij')]
+        probs = served(solver, applicant, dict(zip(solver.ACTIONABLE, grid)))
+        cost = sum(np.abs(g - applicant[f]) / max(abs(applicant[f]), 1) for f, g in zip(solver.ACTIONABLE, grid))
+        approved = probs <= DECISION_THRESHOLD
+        if not approved.any():
+            assert result['combined'] is None
+            continue
+        combined = result['combined']
+        assert combined is not None
+        assert combined['relative_change'] == pytest.approx(cost[approved].min())
+        # Never more than the base row plus the exhaustive 1-D and joint scans
+        assert result['evaluations'] <= 1 + sum(len(axis) for axis in axes) + len(grid[0])
+        compared += 1
+    assert compared >= 1
+
+def test_evaluations_stay_small(solver, data):
+    evaluations = [
+        result['evaluations'] for result in map(solver.find_path_to_approval, data[3])
+        if "recommendations" in result
+    ]
+    assert evaluations
+    assert np.median(evaluations) <= 50